@@ -0,0 +1,317 @@
+"""
+Batch runner: parses and transforms many recipes on every core.
+
+A BatchRunner starts a process pool once. Each worker loads the spaCy model and compiles the
+vocabulary matcher and transform tables in its initializer, so that cost is paid once per worker
+instead of once per recipe or per call. Inputs (URLs, JSON-LD documents or JSON-LD strings) are
+sent to the workers in chunks: a chunk's URLs are fetched concurrently over the worker's pooled
+session and its step texts go through nlp.pipe together. Results come back in input order, and a
+recipe that fails to fetch, parse or transform is reported on its own without stopping the batch.
+
+On Linux the model and tables are instead loaded once in the parent process, which then forks the
+workers (preload). The workers share those pages copy-on-write rather than each holding a copy, and
+the loaded objects are moved out of the garbage collector's reach with gc.freeze, so collections in
+the workers don't write to (and so un-share) them. BatchRunner.worker_memory reports how much of each
+worker's memory is really its own (USS) and its proportional share of the shared pages (PSS).
+"""
+import gc
+import json
+import multiprocessing
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from itertools import islice
+
+import parse
+from frozen import freeze
+from transformation import TRANSFORMS, compile_plan, parse_transformations
+from vocabulary import get_matcher
+
+DEFAULT_CHUNK_SIZE = 16
+
+# small recipe every single-transform plan runs on when a worker starts, compiling its tables
+WARMUP_RECIPE = {
+    "title": "Warm-up",
+    "raw_ingredients": ["1 cup chicken broth", "2 tablespoons butter"],
+    "ingredients": [
+        {"name": "chicken broth", "quantity": "1", "measurement": "cup", "descriptor": None, "preparation": None, "amount": [1, 1], "unit": "cup"},
+        {"name": "butter", "quantity": "2", "measurement": "tablespoons", "descriptor": None, "preparation": None, "amount": [2, 1], "unit": "tablespoon"},
+    ],
+    "tools": ["oven"],
+    "methods": ["bake"],
+    "raw_steps": ["Bake the chicken in the oven for 30 minutes."],
+    "steps": [
+        {"step_number": 1, "text": "Bake the chicken in the oven for 30 minutes.", "ingredients": ["chicken broth"],
+         "tools": ["oven"], "methods": ["bake"], "time": {"duration": "30 minutes", "condition": None}},
+    ],
+}
+
+# set in each worker by warm_worker
+_parse_recipes = None
+
+def warm_worker(use_cache=False):
+    """
+    Process pool initializer: loads the segmentation pipeline (the spaCy model by default) and
+    compiles the matchers and transform tables, so the first recipe a worker handles doesn't pay
+    for them.
+    """
+    global _parse_recipes
+    parse.get_segmenter().split("Warm up.")
+    get_matcher().match("warm up")
+    for name in TRANSFORMS:
+        compile_plan((name,)).run(WARMUP_RECIPE)
+    if use_cache:
+        from recipe_cache import get_recipe_cache
+        _parse_recipes = get_recipe_cache().parse_recipes
+    else:
+        _parse_recipes = parse.parse_recipes
+
+def enable_gc():
+    # initializer for workers forked from a preloaded parent, which forks with the collector off
+    gc.enable()
+
+def worker_pid(_=None):
+    return os.getpid()
+
+def memory_usage(pid):
+    """
+    Returns the memory of a process (Linux only) as {"rss", "pss", "uss", "shared"} in bytes. USS is
+    the memory only this process uses, PSS adds its share of the pages it shares with others.
+    """
+    fields = {}
+    with open(f"/proc/{pid}/smaps_rollup") as file:
+        for line in file:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == "kB":
+                fields[parts[0].rstrip(":")] = int(parts[1]) * 1024
+    uss = fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0)
+    return {
+        "rss": fields.get("Rss", 0),
+        "pss": fields.get("Pss", 0),
+        "uss": uss,
+        "shared": fields.get("Shared_Clean", 0) + fields.get("Shared_Dirty", 0),
+    }
+
+def describe(error):
+    # exceptions don't always pickle, so workers report them as text
+    return f"{type(error).__name__}: {error}"
+
+# characters that can come before a JSON-LD document on an input line: whitespace and a byte order mark
+LEADING_CHARACTERS = "\ufeff \t\r\n"
+
+def is_url(item):
+    # anything that starts like JSON is a document, even if it turns out not to parse
+    return isinstance(item, str) and not item.lstrip(LEADING_CHARACTERS).startswith(("{", "["))
+
+def load_document(item):
+    """
+    Returns the Recipe JSON-LD for an input that is a JSON-LD document or a JSON-LD string.
+    """
+    if isinstance(item, str):
+        item = json.loads(item.lstrip(LEADING_CHARACTERS))
+    json_data = parse.find_recipe(item)
+    if not json_data:
+        raise ValueError("Could not find a valid recipe in the provided JSON-LD.")
+    return json_data
+
+def process_chunk(items, names):
+    """
+    Fetches, parses and transforms one chunk of inputs in a worker.
+
+    Args:
+        items (list): URLs, JSON-LD documents or JSON-LD strings.
+        names (tuple of str): transform names to apply; empty to return the parsed recipes.
+    Returns:
+        results (list of tuples): (recipe, error) for every item, in order. recipe is a frozen
+                                  recipe_to_json dict, or None if error (a string) is set.
+    """
+    results = [None] * len(items)
+    json_list = [None] * len(items)
+    urls = {}
+    for i, item in enumerate(items):
+        if is_url(item):
+            urls.setdefault(item.strip(), []).append(i)
+            continue
+        try:
+            json_list[i] = load_document(item)
+        except Exception as e:
+            results[i] = (None, describe(e))
+
+    if urls:
+        fetched = parse.fetch_recipes(urls, session=parse.get_session(), fetch=parse.fetch_recipe_json)
+        for url, json_data, error in fetched:
+            for i in urls[url]:
+                if error is not None:
+                    results[i] = (None, describe(error))
+                elif not json_data:
+                    results[i] = (None, "Could not find a valid recipe in the provided URL.")
+                else:
+                    json_list[i] = json_data
+
+    # parse the whole chunk in one nlp.pipe batch; if that fails, find the recipe that breaks it
+    ready = [i for i in range(len(items)) if results[i] is None]
+    try:
+        recipes = _parse_recipes([json_list[i] for i in ready])
+    except Exception:
+        recipes = []
+        for i in ready:
+            try:
+                recipes.append(_parse_recipes([json_list[i]])[0])
+            except Exception as e:
+                results[i] = (None, describe(e))
+                recipes.append(None)
+
+    plan = compile_plan(names) if names else None
+    for i, recipe in zip(ready, recipes):
+        if recipe is None:
+            continue
+        try:
+            recipe_json = freeze(parse.recipe_to_json(recipe))
+            results[i] = (plan.run(recipe_json) if plan else recipe_json, None)
+        except Exception as e:
+            results[i] = (None, describe(e))
+    return results
+
+class BatchRunner:
+    """
+    Runs parse_recipe and transform over many recipes in a pool of worker processes.
+
+    Args:
+        transformation (str, list of str or None): transforms to apply, as accepted by
+                                                   transformation.transform; None to only parse.
+        workers (int): number of worker processes, os.cpu_count() by default; 0 runs everything in
+                       this process, without a pool.
+        chunk_size (int): number of inputs sent to a worker at a time.
+        use_cache (bool): parse through the shared on-disk recipe cache (see recipe_cache.py).
+        mp_context: multiprocessing context for the pool, e.g. multiprocessing.get_context("spawn").
+        preload (bool): load the model and tables in this process and fork the workers from it, so
+                        they share that memory. By default on Linux, unless mp_context is given.
+    """
+    def __init__(self, transformation=None, workers=None, chunk_size=DEFAULT_CHUNK_SIZE, use_cache=False, mp_context=None,
+                 preload=None):
+        self.names = parse_transformations(transformation) if transformation else ()
+        if transformation and (not self.names or any(name not in TRANSFORMS for name in self.names)):
+            raise ValueError(f"Invalid transformation request: {transformation!r}")
+        self.workers = (os.cpu_count() or 1) if workers is None else workers
+        self.chunk_size = chunk_size
+        if preload is None:
+            preload = mp_context is None and sys.platform.startswith("linux")
+        self.preload = bool(preload and self.workers)
+        if self.preload:
+            if mp_context is not None and mp_context.get_start_method() != "fork":
+                raise ValueError("preload needs the fork start method")
+            self.executor = self.fork_workers(use_cache)
+        elif self.workers:
+            self.executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=mp_context,
+                                                initializer=warm_worker, initargs=(use_cache,))
+        else:
+            self.executor = None
+            warm_worker(use_cache)
+        self.stats = {"recipes": 0, "failed": 0, "seconds": 0.0, "recipes_per_second": 0.0}
+
+    def fork_workers(self, use_cache):
+        """
+        Loads everything in this process, then forks the pool's workers from it.
+        """
+        # no collections while loading, so the loaded objects are packed without freed holes
+        # between them; then freeze them so no collection (here or in a worker) touches them again.
+        # Reference counts are still written to when objects are used, so some pages do get copied.
+        gc.disable()
+        try:
+            warm_worker(use_cache)
+            gc.freeze()
+            executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("fork"),
+                                           initializer=enable_gc)
+            # a fork pool starts every worker on the first submit; do it now, while the parent is warm
+            list(executor.map(worker_pid, range(self.workers)))
+        finally:
+            gc.enable()
+        return executor
+
+    def worker_memory(self):
+        """
+        Returns memory_usage for every worker process, with its "pid" added (Linux only).
+        """
+        if self.executor is None:
+            return []
+        # ProcessPoolExecutor doesn't expose its workers other than through _processes
+        return [dict(memory_usage(pid), pid=pid) for pid in self.executor._processes]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown()
+
+    def submit(self, chunk):
+        if self.executor is not None:
+            return self.executor.submit(process_chunk, chunk, self.names)
+        future = Future()
+        try:
+            future.set_result(process_chunk(chunk, self.names))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def run(self, items):
+        """
+        Processes items in the pool, yielding results in input order as they become available.
+        At most two chunks per worker are in flight, so items can be a generator over a very
+        large input.
+
+        Args:
+            items (iterable): URLs, JSON-LD documents (dicts or lists) or JSON-LD strings.
+
+        Yields:
+            (index, recipe, error): index is the item's position in items. recipe is the
+                                    transformed (or parsed) recipe as a frozen recipe_to_json
+                                    dict, or None if processing failed, in which case error
+                                    describes what went wrong.
+        """
+        items = iter(items)
+        pending = deque()
+        next_index = 0
+        start = time.perf_counter()
+        seconds = self.stats["seconds"]
+
+        def submit_next():
+            nonlocal next_index
+            chunk = list(islice(items, self.chunk_size))
+            if not chunk:
+                return False
+            pending.append((next_index, len(chunk), self.submit(chunk)))
+            next_index += len(chunk)
+            return True
+
+        for _ in range(max(self.workers, 1) * 2):
+            if not submit_next():
+                break
+        while pending:
+            first, size, future = pending.popleft()
+            try:
+                results = future.result()
+            except Exception as e:
+                # the worker itself failed (e.g. it was killed); every item in the chunk is lost
+                results = [(None, describe(e))] * size
+            submit_next()
+            for offset, (recipe, error) in enumerate(results):
+                self.stats["recipes"] += 1
+                if error is not None:
+                    self.stats["failed"] += 1
+                self.stats["seconds"] = seconds + time.perf_counter() - start
+                self.stats["recipes_per_second"] = self.stats["recipes"] / self.stats["seconds"]
+                yield first + offset, recipe, error
+
+def run_batch(items, transformation=None, **options):
+    """
+    Processes items with a BatchRunner that is shut down once every result has been yielded.
+    Takes the same options as BatchRunner and yields the same (index, recipe, error) tuples.
+    """
+    with BatchRunner(transformation, **options) as runner:
+        yield from runner.run(items)
@@ -0,0 +1,53 @@
+"""
+Throughput benchmark for the process-pool batch runner in batch.py.
+
+Parses and transforms --copies copies of the fixture corpus twice: one recipe at a time in this
+process (parse_recipe, then the transform plan), and with a BatchRunner over --workers processes.
+Worker start-up, including each worker loading the spaCy model, is timed separately from the run.
+
+Usage (from the repository root):
+    python benchmarks/batch_bench.py [--copies 50] [--workers 4] [--transform "to vegetarian and double"]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from batch import DEFAULT_CHUNK_SIZE, BatchRunner
+from corpus import load_corpus
+from parse import find_recipe, get_segmenter, parse_recipe, recipe_to_json
+from transformation import compile_plan, parse_transformations
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--copies", type=int, default=50, help="number of copies of the fixture corpus to process")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="worker processes for the batch runner")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="recipes sent to a worker at a time")
+    parser.add_argument("--transform", default="to vegetarian and double", help="transform request to apply")
+    args = parser.parse_args()
+
+    items = [json_ld for _, json_ld in load_corpus()] * args.copies
+    plan = compile_plan(parse_transformations(args.transform))
+
+    get_segmenter().split("Warm up.")
+    start = time.perf_counter()
+    for json_ld in items:
+        plan.run(recipe_to_json(parse_recipe(find_recipe(json_ld))))
+    serial = time.perf_counter() - start
+
+    start = time.perf_counter()
+    with BatchRunner(args.transform, workers=args.workers, chunk_size=args.chunk_size) as runner:
+        # a trivial task per worker waits for the initializers (model load) to finish
+        list(runner.executor.map(int, range(args.workers)))
+        startup = time.perf_counter() - start
+        failed = sum(1 for _, _, error in runner.run(items) if error)
+        stats = runner.stats
+
+    print(f"{len(items)} recipes, transform {args.transform!r}")
+    print(f"{'serial':28} {len(items) / serial:10.1f} recipes/s")
+    print(f"{f'batch ({args.workers} workers)':28} {stats['recipes_per_second']:10.1f} recipes/s  (start-up {startup:.1f}s, {failed} failed)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Benchmark for the columnar scaling engine in columnar.py.
+
+Parses the fixture corpus once and builds a catalog of --copies copies of it. Scales every recipe
+in the catalog by a per-recipe factor two ways: one recipe at a time with the scale stage behind
+transformation.double_or_half, and as one batch with columnar.IngredientColumns. Checks that both
+give the same recipes and reports the time per recipe, with building the columns timed separately.
+
+Usage (from the repository root):
+    python benchmarks/columnar_bench.py [--copies 500]
+"""
+import argparse
+import os
+import sys
+import time
+from fractions import Fraction
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from columnar import IngredientColumns
+from corpus import load_corpus
+from frozen import freeze
+from parse import find_recipe, parse_recipe, recipe_to_json
+from pipeline import Plan
+from transformation import ScaleStage
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--copies", type=int, default=500, help="number of copies of the fixture corpus in the catalog")
+    args = parser.parse_args()
+
+    parsed = [freeze(recipe_to_json(parse_recipe(find_recipe(json_ld)))) for _, json_ld in load_corpus()]
+    catalog = parsed * args.copies
+    # e.g. rescaling 4-serving recipes to 1..12 servings
+    factors = [Fraction(1 + i % 12, 4) for i in range(len(catalog))]
+
+    start = time.perf_counter()
+    expected = [Plan([ScaleStage(factor)]).run(recipe) for recipe, factor in zip(catalog, factors)]
+    per_recipe = time.perf_counter() - start
+
+    start = time.perf_counter()
+    columns = IngredientColumns(catalog)
+    build = time.perf_counter() - start
+    start = time.perf_counter()
+    scaled = columns.scale(factors).to_recipes()
+    columnar = time.perf_counter() - start
+
+    if scaled != expected:
+        print("columnar output differs from the scale stage", file=sys.stderr)
+        sys.exit(1)
+    n = len(catalog)
+    print(f"{n} recipes, {len(columns)} ingredients")
+    print(f"{'approach':28} {'us/recipe':>10}")
+    print(f"{'scale stage, per recipe':28} {per_recipe / n * 1e6:10.1f}")
+    print(f"{'columnar build':28} {build / n * 1e6:10.1f}")
+    print(f"{'columnar scale + render':28} {columnar / n * 1e6:10.1f}")
+
+if __name__ == "__main__":
+    main()
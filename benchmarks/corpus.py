@@ -0,0 +1,44 @@
+"""
+Fixture corpus shared by the benchmarks.
+
+benchmarks/fixtures holds one JSON-LD document per recipe, named <allrecipes id>-<slug>.json,
+covering the pages listed in the README. render_page wraps a document in markup shaped like
+an allrecipes page (head scripts, a large body, the ld+json block in the head) so the HTML
+extraction paths can be benchmarked offline.
+"""
+import glob
+import json
+import os
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+def load_corpus():
+    """
+    Returns [(name, json_ld)] for every fixture, sorted by name.
+    """
+    corpus = []
+    for path in sorted(glob.glob(os.path.join(FIXTURES_DIR, "*.json"))):
+        with open(path) as file:
+            corpus.append((os.path.splitext(os.path.basename(path))[0], json.load(file)))
+    return corpus
+
+def render_page(json_ld, page_size=400 * 1024):
+    """
+    Renders a JSON-LD document into an HTML page of roughly page_size bytes.
+    """
+    head = (
+        "<!DOCTYPE html><html lang=\"en\"><head><meta charset=\"utf-8\">"
+        "<title>Recipe</title>"
+        "<link rel=\"stylesheet\" href=\"/static/app.css\">"
+        "<script>window.dataLayer = window.dataLayer || [];</script>"
+        "<script type=\"application/ld+json\">" + json.dumps(json_ld) + "</script>"
+        "</head><body>"
+    )
+    block = (
+        "<div class=\"card\"><a class=\"card__link\" href=\"/recipe/1/example/\">"
+        "<img src=\"/img/thumb.jpg\" alt=\"\"><span class=\"card__title\">Related recipe</span>"
+        "</a><p class=\"card__text\">Lorem ipsum dolor sit amet, consectetur adipiscing elit.</p></div>\n"
+    )
+    tail = "<script src=\"/static/app.js\"></script></body></html>"
+    body = block * max(0, (page_size - len(head) - len(tail)) // len(block))
+    return (head + body + tail).encode("utf-8")
@@ -0,0 +1,89 @@
+"""
+Benchmark for the memory-mapped corpus file (corpus_store.py).
+
+Writes --recipes recipes, each a random pick from the parsed fixture recipes, to a corpus file
+and to the one-batch binary encoding of serialization.py. Then reports the write time and size of
+each, how long each takes to open and how much resident memory that adds, the latency of reading
+random recipes by id, and the rate of iterating over the whole corpus. The recipes read back are
+checked against the ones written.
+
+Usage (from the repository root):
+    python benchmarks/corpus_store_bench.py [--recipes 100000] [--lookups 10000]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from corpus import load_corpus
+from corpus_store import CorpusStore, write_corpus
+from parse import find_recipe, parse_recipe, recipe_to_json
+from serialization import decode_recipes, encode_recipes
+
+MB = 2 ** 20
+
+def rss_bytes():
+    # current resident set size of this process
+    with open("/proc/self/statm") as file:
+        return int(file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+def timed(function):
+    start = time.perf_counter()
+    result = function()
+    return result, time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--recipes", type=int, default=100000, help="number of recipes in the corpus")
+    parser.add_argument("--lookups", type=int, default=10000, help="random recipes to read by id")
+    args = parser.parse_args()
+
+    parsed = [parse_recipe(find_recipe(json_ld)) for _, json_ld in load_corpus()]
+    random.seed(0)
+    picks = [random.randrange(len(parsed)) for _ in range(args.recipes)]
+    recipes = [parsed[pick] for pick in picks]
+    expected = [recipe_to_json(recipe) for recipe in parsed]
+    lookups = [random.randrange(args.recipes) for _ in range(args.lookups)]
+
+    with tempfile.TemporaryDirectory() as directory:
+        corpus_path = os.path.join(directory, "recipes.rcps")
+        batch_path = os.path.join(directory, "recipes.rcpb")
+        _, corpus_write = timed(lambda: write_corpus(corpus_path, recipes))
+        data, batch_write = timed(lambda: encode_recipes(recipes))
+        with open(batch_path, "wb") as file:
+            file.write(data)
+        del data
+
+        before = rss_bytes()
+        store, corpus_open = timed(lambda: CorpusStore(corpus_path))
+        corpus_rss = rss_bytes() - before
+        with store:
+            for recipe_id in lookups[:100]:
+                if recipe_to_json(store[recipe_id]) != expected[picks[recipe_id]]:
+                    print(f"corpus store returned the wrong recipe for id {recipe_id}")
+                    sys.exit(1)
+            _, corpus_lookup = timed(lambda: [store[recipe_id] for recipe_id in lookups])
+            count, corpus_iterate = timed(lambda: sum(1 for _ in store))
+
+        before = rss_bytes()
+        def load_batch():
+            with open(batch_path, "rb") as file:
+                return decode_recipes(file.read())
+        loaded, batch_open = timed(load_batch)
+        batch_rss = rss_bytes() - before
+        _, batch_lookup = timed(lambda: [loaded[recipe_id] for recipe_id in lookups])
+        sizes = os.path.getsize(corpus_path), os.path.getsize(batch_path)
+
+    print(f"{args.recipes} recipes, {args.lookups} random lookups")
+    print(f"{'format':28} {'write s':>8} {'bytes/rec':>10} {'open s':>8} {'open RSS MB':>12} {'lookup us':>10} {'iterate rec/s':>14}")
+    print(f"{'corpus store (mmap)':28} {corpus_write:8.2f} {sizes[0] / args.recipes:10.0f} {corpus_open:8.4f} "
+          f"{corpus_rss / MB:12.1f} {corpus_lookup / args.lookups * 1e6:10.1f} {count / corpus_iterate:14.0f}")
+    print(f"{'batch (decode all)':28} {batch_write:8.2f} {sizes[1] / args.recipes:10.0f} {batch_open:8.4f} "
+          f"{batch_rss / MB:12.1f} {batch_lookup / args.lookups * 1e6:10.1f} {'':>14}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Benchmark for JSON-LD extraction from recipe pages.
+
+Renders every fixture recipe into a full-size page (see corpus.py) and compares the DOM path
+used by fetch_recipe + extract_json_ld (BeautifulSoup over the whole page) against
+parse.extract_json_ld_from_html, reporting time and peak allocated memory per page.
+
+Usage (from the repository root):
+    python benchmarks/extract_bench.py [--page-kb 400] [--repeat 5]
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from corpus import load_corpus, render_page
+from parse import extract_json_ld, extract_json_ld_from_html
+
+def dom_path(page):
+    from bs4 import BeautifulSoup
+    return extract_json_ld(BeautifulSoup(page.decode("utf-8"), 'html.parser'))
+
+def measure(function, pages, repeat):
+    """
+    Returns (seconds per page, peak bytes allocated for one page) for function over pages.
+    """
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for page in pages:
+            function(page)
+    elapsed = (time.perf_counter() - start) / (repeat * len(pages))
+    tracemalloc.start()
+    function(pages[0])
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--page-kb", type=int, default=400, help="size of each rendered page")
+    parser.add_argument("--repeat", type=int, default=5, help="passes over the corpus")
+    args = parser.parse_args()
+
+    corpus = load_corpus()
+    pages = [render_page(json_ld, args.page_kb * 1024) for _, json_ld in corpus]
+    for (name, _), page in zip(corpus, pages):
+        if dom_path(page) != extract_json_ld_from_html(page):
+            print(f"mismatch on {name}")
+            sys.exit(1)
+
+    print(f"{len(pages)} pages of ~{args.page_kb} KB")
+    print(f"{'path':28} {'ms/page':>10} {'peak KB':>10}")
+    for label, function in [("BeautifulSoup DOM", dom_path), ("extract_json_ld_from_html", extract_json_ld_from_html)]:
+        elapsed, peak = measure(function, pages, args.repeat)
+        print(f"{label:28} {elapsed * 1000:10.2f} {peak / 1024:10.0f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Benchmark for fuzzy ingredient-mention detection (ingredient_matcher.py).
+
+Compares the old per-pair Levenshtein.ratio loop from parse_steps against
+IngredientMatcher.match_many on synthetic recipes, scaling the number of ingredients and the
+number of step sentences, and checks that both find the same ingredients.
+
+Usage (from the repository root):
+    python benchmarks/fuzzy_bench.py [--ingredients 5 10 20 40] [--sentences 10 40 160]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ingredient_matcher import IngredientMatcher
+
+NAMES = [
+    "all-purpose flour", "white sugar", "brown sugar", "butter", "eggs", "milk", "salt", "black pepper",
+    "olive oil", "garlic", "onion", "celery", "carrots", "chicken breasts", "ground beef", "pork belly",
+    "soy sauce", "rice wine", "star anise", "ginger", "green onions", "parmesan cheese", "mozzarella",
+    "ricotta", "lasagna noodles", "tomato sauce", "tomato paste", "basil", "oregano", "thyme",
+    "rosemary", "paprika", "cumin", "chili powder", "lemon juice", "honey", "baking soda",
+    "baking powder", "vanilla extract", "heavy cream", "sour cream", "shrimp", "grits", "bacon",
+]
+
+WORDS = [
+    "stir", "the", "into", "a", "large", "bowl", "and", "cook", "until", "golden", "minutes", "add",
+    "remaining", "heat", "over", "medium", "pan", "with", "mixture", "season", "to", "taste", "bake",
+    "oven", "drain", "serve", "warm", "sauce", "flour", "sugar", "chicken", "noodles", "cheese", "pork",
+]
+
+def legacy_match(sentence, ingredient_names):
+    # the loop parse_steps used before ingredient_matcher.py
+    import Levenshtein
+    ingredients = list(set(filter(lambda ingredient: ingredient.lower() in sentence.lower(), ingredient_names)))
+    for ingredient in ingredient_names:
+        for word in sentence.lower().split():
+            similarity = Levenshtein.ratio(word, ingredient.lower())
+            if similarity >= 0.6 and ingredient not in ingredients:
+                ingredients.append(ingredient)
+                break
+    return ingredients
+
+def make_recipe(rng, ingredient_count, sentence_count):
+    names = [rng.choice(NAMES) + ("" if i < len(NAMES) else f" {i}") for i in range(ingredient_count)]
+    sentences = [" ".join(rng.choice(WORDS + names) for _ in range(rng.randint(6, 18))).capitalize() + "."
+                 for _ in range(sentence_count)]
+    return names, sentences
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ingredients", type=int, nargs="+", default=[5, 10, 20, 40])
+    parser.add_argument("--sentences", type=int, nargs="+", default=[10, 40, 160])
+    parser.add_argument("--seed", type=int, default=337)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    print(f"{'ingredients':>11} {'sentences':>9} {'legacy ms':>10} {'matcher ms':>10} {'speedup':>8}")
+    for ingredient_count in args.ingredients:
+        for sentence_count in args.sentences:
+            names, sentences = make_recipe(rng, ingredient_count, sentence_count)
+
+            start = time.perf_counter()
+            expected = [legacy_match(sentence, names) for sentence in sentences]
+            legacy = time.perf_counter() - start
+
+            start = time.perf_counter()
+            actual = IngredientMatcher(names).match_many(sentences)
+            batched = time.perf_counter() - start
+
+            # substring hits come out of a set, so compare those as sets
+            if [sorted(found) for found in expected] != [sorted(found) for found in actual]:
+                print(f"mismatch with {ingredient_count} ingredients, {sentence_count} sentences")
+                sys.exit(1)
+            print(f"{ingredient_count:11} {sentence_count:9} {legacy * 1000:10.2f} {batched * 1000:10.2f} "
+                  f"{legacy / batched:7.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Benchmark for the inverted recipe index (recipe_index.py).
+
+Builds an index over --recipes recipes, each a random pick from the parsed fixture recipes,
+then reports the build rate, the size on disk per recipe, save and load times, and the latency of
+a few AND / OR queries against scanning every recipe's terms, which is what answering them takes
+without the index. Query results are checked against the scan.
+
+Usage (from the repository root):
+    python benchmarks/index_bench.py [--recipes 100000] [--queries 100]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from corpus import load_corpus
+from parse import find_recipe, parse_recipe, recipe_to_json
+from recipe_index import RecipeIndex, parse_term, recipe_terms
+
+def timed(function, repeat=1):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = function()
+    return result, (time.perf_counter() - start) / repeat
+
+def scan(term_sets, all_of=(), any_of=()):
+    all_of = {parse_term(term) for term in all_of}
+    any_of = {parse_term(term) for term in any_of}
+    return [recipe_id for recipe_id, terms in enumerate(term_sets)
+            if all_of <= terms and (not any_of or any_of & terms)]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--recipes", type=int, default=100000, help="number of recipes to index")
+    parser.add_argument("--queries", type=int, default=100, help="repetitions of each query")
+    args = parser.parse_args()
+
+    parsed = [recipe_to_json(parse_recipe(find_recipe(json_ld))) for _, json_ld in load_corpus()]
+    random.seed(0)
+    recipes = [random.choice(parsed) for _ in range(args.recipes)]
+
+    index = RecipeIndex()
+    _, build = timed(lambda: index.add_many(recipes))
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "recipes.idx")
+        _, save = timed(lambda: index.save(path))
+        size = os.path.getsize(path)
+        loaded, load = timed(lambda: RecipeIndex.load(path))
+
+    # the most common terms of each field, so the queries hit long postings lists
+    counts = {term: len(loaded.postings(term)) for term in loaded.terms()}
+    common = {field: sorted(loaded.terms(field), key=counts.get, reverse=True) for field in ("ingredient", "tool", "method")}
+    queries = [
+        ("AND ingredient+tool", [common["ingredient"][0], common["tool"][0]], []),
+        ("AND 3 fields", [common["ingredient"][1], common["tool"][0], common["method"][0]], []),
+        ("OR 3 ingredients", [], common["ingredient"][:3]),
+        ("AND + OR", [common["tool"][0]], common["ingredient"][2:5]),
+    ]
+
+    term_sets = [recipe_terms(recipe) for recipe in recipes]
+    print(f"{args.recipes} recipes, {len(counts)} terms")
+    print(f"build {args.recipes / build:.0f} recipes/s, save {save * 1000:.1f} ms, load {load * 1000:.1f} ms, "
+          f"{size / args.recipes:.1f} bytes/recipe on disk")
+    print(f"{'query':22} {'matches':>8} {'index ms':>9} {'scan ms':>9}")
+    for label, all_of, any_of in queries:
+        ids, seconds = timed(lambda: loaded.query(all_of, any_of), args.queries)
+        expected, scan_seconds = timed(lambda: scan(term_sets, all_of, any_of))
+        if ids.tolist() != expected:
+            print(f"{label}: index and scan disagree")
+            sys.exit(1)
+        print(f"{label:22} {len(ids):8} {seconds * 1000:9.3f} {scan_seconds * 1000:9.1f}")
+
+if __name__ == "__main__":
+    main()
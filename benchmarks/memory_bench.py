@@ -0,0 +1,90 @@
+"""
+Memory benchmark for the parsed-recipe classes in representation.py.
+
+Parses the fixture corpus once, then builds a corpus of --copies recipes from it twice: with
+plain __dict__ classes (the representation before slots and interning) and with the current
+representation.py classes. Every copy gets freshly allocated strings, as it would if each recipe
+had been parsed separately. Reports the bytes allocated per recipe for each.
+
+Usage (from the repository root):
+    python benchmarks/memory_bench.py [--copies 2000]
+"""
+import argparse
+import json
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import representation
+from corpus import load_corpus
+from parse import find_recipe, parse_recipe, recipe_to_json
+
+class PlainIngredient:
+    def __init__(self, name, quantity=None, measurement=None, descriptor=None, preparation=None):
+        self.name = name
+        self.quantity = quantity
+        self.measurement = measurement
+        self.descriptor = descriptor
+        self.preparation = preparation
+
+class PlainStep:
+    def __init__(self, step_number, text, ingredients=None, tools=None, methods=None, time=None):
+        self.step_number = step_number
+        self.text = text
+        self.ingredients = ingredients or []
+        self.tools = tools or []
+        self.methods = methods or []
+        self.time = time
+
+class PlainRecipe:
+    def __init__(self, title, raw_ingredients, ingredients, raw_steps, steps):
+        self.title = title
+        self.raw_ingredients = raw_ingredients
+        self.ingredients = ingredients
+        self.raw_steps = raw_steps
+        self.steps = steps
+
+def build(recipe_json, ingredient_class, step_class, recipe_class):
+    # json.loads gives every copy its own string objects, like a separate parse would
+    data = json.loads(recipe_json)
+    ingredients = [
+        ingredient_class(ing["name"], ing["quantity"], ing["measurement"], ing["descriptor"], ing["preparation"])
+        for ing in data["ingredients"]
+    ]
+    steps = [
+        step_class(step["step_number"], step["text"], step["ingredients"], step["tools"], step["methods"], step["time"])
+        for step in data["steps"]
+    ]
+    return recipe_class(data["title"], data["raw_ingredients"], ingredients, data["raw_steps"], steps)
+
+def measure(recipe_jsons, copies, classes):
+    """
+    Returns the bytes allocated per recipe for a corpus of copies recipes built with classes.
+    """
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    corpus = [build(recipe_jsons[i % len(recipe_jsons)], *classes) for i in range(copies)]
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del corpus
+    return (after - before) / copies
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--copies", type=int, default=2000, help="number of recipes in the built corpus")
+    args = parser.parse_args()
+
+    recipe_jsons = [json.dumps(recipe_to_json(parse_recipe(find_recipe(json_ld)))) for _, json_ld in load_corpus()]
+    plain = measure(recipe_jsons, args.copies, (PlainIngredient, PlainStep, PlainRecipe))
+    compact = measure(recipe_jsons, args.copies,
+                      (representation.Ingredient, representation.Step, representation.Recipe))
+    print(f"{args.copies} recipes")
+    print(f"{'representation':28} {'bytes/recipe':>12}")
+    print(f"{'plain __dict__ classes':28} {plain:12.0f}")
+    print(f"{'slots + interned strings':28} {compact:12.0f}")
+    print(f"saved: {1 - compact / plain:.0%}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+Benchmark for the fused transform pipeline in pipeline.py.
+
+Parses the fixture corpus once, then applies a transform combination to every recipe two ways:
+one transform after another (one pass over the recipe per transform), and as a single fused
+plan from transformation.compile_plan. Checks that both give the same output and reports the
+time per recipe for each.
+
+Usage (from the repository root):
+    python benchmarks/pipeline_bench.py [--transforms "to vegetarian,double,faster"] [--repeat 200]
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from corpus import load_corpus
+from frozen import freeze
+from parse import find_recipe, parse_recipe, recipe_to_json
+from pipeline import Plan
+from transformation import TRANSFORMS, compile_plan, parse_transformations
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--transforms", default="to vegetarian,double,faster,to healthy", help="comma-separated transform names, applied in order")
+    parser.add_argument("--repeat", type=int, default=200, help="number of passes over the corpus")
+    args = parser.parse_args()
+
+    names = parse_transformations([name.strip() for name in args.transforms.split(",")])
+    unknown = [name for name in names if name not in TRANSFORMS]
+    if unknown:
+        parser.error(f"unknown transforms: {', '.join(unknown)}")
+    recipes = [freeze(recipe_to_json(parse_recipe(find_recipe(json_ld)))) for _, json_ld in load_corpus()]
+    single_plans = [Plan([TRANSFORMS[name]]) for name in names]
+    fused_plan = compile_plan(names)
+
+    def sequential(recipe):
+        for plan in single_plans:
+            recipe = plan.run(recipe)
+        return recipe
+
+    # plans leave their (frozen) input untouched, so the same recipes are reused for every run
+    with contextlib.redirect_stdout(io.StringIO()):
+        for recipe in recipes:
+            if sequential(recipe) != fused_plan.run(recipe):
+                print(f"fused output differs for {recipe['title']!r}", file=sys.stderr)
+                sys.exit(1)
+        sequential_time = timeit.timeit(lambda: [sequential(recipe) for recipe in recipes], number=args.repeat)
+        fused_time = timeit.timeit(lambda: [fused_plan.run(recipe) for recipe in recipes], number=args.repeat)
+
+    per_recipe = args.repeat * len(recipes)
+    print(f"transforms: {' -> '.join(names)}")
+    print(f"{'approach':28} {'us/recipe':>10}")
+    print(f"{'one pass per transform':28} {sequential_time / per_recipe * 1e6:10.1f}")
+    print(f"{'fused plan':28} {fused_time / per_recipe * 1e6:10.1f}")
+    print(f"speedup: {sequential_time / fused_time:.2f}x")
+
+if __name__ == "__main__":
+    main()
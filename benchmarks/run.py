@@ -0,0 +1,191 @@
+"""
+Offline benchmark suite: per-stage throughput and peak memory over the fixture corpus.
+
+Times every stage a recipe goes through, one corpus item at a time:
+
+    extract_json_ld             BeautifulSoup over a rendered page + extract_json_ld (fetch_recipe)
+    extract_json_ld_from_html   the streaming extraction fetch_recipe_json uses
+    parse_ingredients
+    parse_steps                 including the spaCy pass over the step texts
+    recipe_to_json
+    transform:<name>            transformation.transform for each transform in TRANSFORMS
+
+Each stage runs for at least --min-time seconds after a warm-up pass; its peak memory is the
+largest tracemalloc peak over one pass. Results are written as JSON to --output. If a baseline
+file exists (see --save-baseline), every stage is compared with it and the run exits with status
+1 when a stage's throughput or peak memory is more than --threshold worse than the baseline.
+Baselines are only meaningful on the machine they were recorded on; a warning is printed when
+the Python version, machine or segmenter differ from the baseline's.
+
+benchmarks/baseline.json is committed, recorded with RECIPE_SEGMENTER=rules so parse_steps
+doesn't depend on the spaCy model being installed. CI runs the suite the same way on its
+benchmark runner; when that runner changes, or a change is meant to move the numbers, re-record
+the baseline there with --save-baseline and commit it with the change.
+
+Usage (from the repository root):
+    RECIPE_SEGMENTER=rules python benchmarks/run.py [--stages parse,transform] [--min-time 1.0] [--threshold 0.25]
+    RECIPE_SEGMENTER=rules python benchmarks/run.py --save-baseline     # record the current numbers as the baseline
+"""
+import argparse
+import contextlib
+import datetime
+import io
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from corpus import load_corpus, render_page
+from frozen import freeze
+from parse import extract_json_ld, extract_json_ld_from_html, find_recipe, get_segmenter, parse_ingredients, parse_recipe, parse_steps, recipe_to_json
+from transformation import TRANSFORMS, transform
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_OUTPUT = os.path.join(BENCHMARKS_DIR, "results.json")
+DEFAULT_BASELINE = os.path.join(BENCHMARKS_DIR, "baseline.json")
+RESULTS_VERSION = 1
+# peak memory differences below this are noise, whatever the relative change
+MEMORY_SLACK = 16 * 1024
+
+def soup_extract(page):
+    from bs4 import BeautifulSoup
+    return extract_json_ld(BeautifulSoup(page.decode("utf-8"), 'html.parser'))
+
+def quiet_transform(name):
+    # transform prints a message per transform; keep it out of the timings and the report
+    def run(recipe):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return transform([name], recipe)
+    return run
+
+def build_stages(corpus):
+    """
+    Returns [(stage name, function, inputs)] for the corpus; each function takes one input.
+    """
+    pages = [render_page(json_ld) for _, json_ld in corpus]
+    json_list = [find_recipe(json_ld) for _, json_ld in corpus]
+    step_inputs = [(json_data, [ing.name for ing in parse_ingredients(json_data)[1]]) for json_data in json_list]
+    recipes = [parse_recipe(json_data) for json_data in json_list]
+    recipe_jsons = [freeze(recipe_to_json(recipe)) for recipe in recipes]
+    stages = [
+        ("extract_json_ld", soup_extract, pages),
+        ("extract_json_ld_from_html", extract_json_ld_from_html, pages),
+        ("parse_ingredients", parse_ingredients, json_list),
+        ("parse_steps", lambda args: parse_steps(*args), step_inputs),
+        ("recipe_to_json", recipe_to_json, recipes),
+    ]
+    stages.extend((f"transform:{name}", quiet_transform(name), recipe_jsons) for name in TRANSFORMS)
+    return stages
+
+def measure(function, inputs, min_time):
+    """
+    Returns a stage's result: items per second, milliseconds per item and peak bytes allocated
+    while processing one item.
+    """
+    for item in inputs:
+        function(item)
+    count = 0
+    start = time.perf_counter()
+    while True:
+        for item in inputs:
+            function(item)
+        count += len(inputs)
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            break
+    peak = 0
+    for item in inputs:
+        tracemalloc.start()
+        function(item)
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    return {
+        "items_per_second": count / elapsed,
+        "ms_per_item": elapsed / count * 1000,
+        "peak_bytes": peak,
+    }
+
+def compare(results, baseline, threshold):
+    """
+    Returns [(stage, message)] for every stage that is more than threshold (a fraction) slower
+    or uses more than threshold more peak memory than in baseline.
+    """
+    regressions = []
+    for stage, result in results["stages"].items():
+        before = baseline["stages"].get(stage)
+        if before is None:
+            continue
+        slowdown = before["items_per_second"] / result["items_per_second"] - 1
+        if slowdown > threshold:
+            regressions.append((stage, f"throughput {result['items_per_second']:.1f}/s vs {before['items_per_second']:.1f}/s ({slowdown:+.0%} time)"))
+        growth = result["peak_bytes"] - before["peak_bytes"]
+        if growth > MEMORY_SLACK and growth > threshold * before["peak_bytes"]:
+            regressions.append((stage, f"peak memory {result['peak_bytes'] / 1024:.0f} KB vs {before['peak_bytes'] / 1024:.0f} KB"))
+    return regressions
+
+def write_json(path, data):
+    with open(path, "w") as file:
+        json.dump(data, file, indent=2)
+        file.write("\n")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--stages", help="comma-separated stage names or prefixes to run (default: all)")
+    parser.add_argument("--min-time", type=float, default=1.0, help="seconds each stage is timed for")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed regression against the baseline, as a fraction")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="where to write the results")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="baseline results to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="write the results to --baseline instead of comparing")
+    args = parser.parse_args()
+
+    corpus = load_corpus()
+    stages = build_stages(corpus)
+    if args.stages:
+        prefixes = [prefix.strip() for prefix in args.stages.split(",")]
+        stages = [stage for stage in stages if any(stage[0].startswith(prefix) for prefix in prefixes)]
+        if not stages:
+            parser.error(f"no stages match {args.stages!r}")
+
+    results = {
+        "version": RESULTS_VERSION,
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "segmenter": get_segmenter().name,
+        "recipes": len(corpus),
+        "stages": {},
+    }
+    print(f"{len(corpus)} fixture recipes")
+    print(f"{'stage':32} {'items/s':>10} {'ms/item':>10} {'peak KB':>10}")
+    for name, function, inputs in stages:
+        result = measure(function, inputs, args.min_time)
+        results["stages"][name] = result
+        print(f"{name:32} {result['items_per_second']:10.1f} {result['ms_per_item']:10.3f} {result['peak_bytes'] / 1024:10.0f}")
+    write_json(args.output, results)
+
+    if args.save_baseline:
+        write_json(args.baseline, results)
+        print(f"saved baseline to {args.baseline}")
+        return
+    if not os.path.exists(args.baseline):
+        print(f"no baseline at {args.baseline}; run with --save-baseline to record one")
+        return
+    with open(args.baseline) as file:
+        baseline = json.load(file)
+    for key in ("python", "machine", "segmenter"):
+        if baseline.get(key) != results[key]:
+            print(f"warning: baseline was recorded with {key} {baseline.get(key)}, this run uses {results[key]}")
+    regressions = compare(results, baseline, args.threshold)
+    if regressions:
+        print(f"{len(regressions)} regression(s) beyond {args.threshold:.0%} against {args.baseline}:")
+        for stage, message in regressions:
+            print(f"  {stage}: {message}")
+        sys.exit(1)
+    print(f"no regressions beyond {args.threshold:.0%} against {args.baseline}")
+
+if __name__ == "__main__":
+    main()
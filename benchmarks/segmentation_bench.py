@@ -0,0 +1,131 @@
+"""
+Benchmark for the sentence segmentation backends in segmentation.py.
+
+Each backend runs in its own process, so its memory is measured on its own: the process loads
+the backend, then segments every step text of the fixture corpus --repeat times in one batch.
+Reports, per backend, the load time, the resident memory added by loading and running it, the
+time per step text, and how closely its sentence boundaries match the reference backend's
+(the full model by default): boundary precision/recall, and the share of steps split exactly
+the same way. Backends that can't be loaded here (e.g. a model that isn't installed) are
+reported as unavailable.
+
+Usage (from the repository root):
+    python benchmarks/segmentation_bench.py [--backends model,senter,sentencizer,rules] [--reference model] [--repeat 50]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from corpus import load_corpus
+from parse import find_recipe, step_texts
+from segmentation import BACKENDS, create_segmenter
+
+def rss_bytes():
+    # current resident set size of this process
+    with open("/proc/self/statm") as file:
+        return int(file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+def corpus_texts():
+    return [text for _, json_ld in load_corpus() for text in step_texts(find_recipe(json_ld))]
+
+def run_backend(backend, repeat):
+    """
+    Loads and times one backend in this process; returns its measurements and splits.
+    """
+    texts = corpus_texts()
+    before = rss_bytes()
+    start = time.perf_counter()
+    segmenter = create_segmenter(backend)
+    segmenter.split("Warm up.")  # loads the pipeline
+    load_seconds = time.perf_counter() - start
+    splits = [segmenter.split(text) for text in texts]
+    start = time.perf_counter()
+    for _ in list(segmenter.split_many(texts * repeat)):
+        pass
+    seconds = time.perf_counter() - start
+    return {
+        "backend": backend,
+        "load_seconds": load_seconds,
+        "rss_bytes": rss_bytes() - before,
+        "ms_per_step": seconds / (len(texts) * repeat) * 1000,
+        "splits": splits,
+    }
+
+def boundaries(text, sentences):
+    # character offsets where a sentence other than the first starts
+    offsets = set()
+    position = 0
+    for sentence in sentences:
+        found = text.find(sentence, position)
+        if found == -1:
+            continue
+        if found:
+            offsets.add(found)
+        position = found + len(sentence)
+    return offsets
+
+def agreement(texts, splits, reference):
+    """
+    Returns (precision, recall, exact) of splits' sentence boundaries against reference's.
+    """
+    matched = predicted = expected = exact = 0
+    for text, sentences, reference_sentences in zip(texts, splits, reference):
+        found = boundaries(text, sentences)
+        wanted = boundaries(text, reference_sentences)
+        matched += len(found & wanted)
+        predicted += len(found)
+        expected += len(wanted)
+        exact += sentences == reference_sentences
+    precision = matched / predicted if predicted else 1.0
+    recall = matched / expected if expected else 1.0
+    return precision, recall, exact / len(texts)
+
+def measure(backend, repeat):
+    # a fresh interpreter per backend, so its memory isn't mixed up with the others'
+    process = subprocess.run([sys.executable, os.path.abspath(__file__), "--worker", backend, "--repeat", str(repeat)],
+                             capture_output=True, text=True)
+    if process.returncode != 0:
+        message = process.stderr.strip().splitlines()[-1] if process.stderr.strip() else f"exit status {process.returncode}"
+        return {"backend": backend, "error": message}
+    return json.loads(process.stdout)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", default=",".join(BACKENDS), help="comma-separated backends to compare")
+    parser.add_argument("--reference", default="model", help="backend whose splits count as correct")
+    parser.add_argument("--repeat", type=int, default=50, help="passes over the corpus step texts")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_backend(args.worker, args.repeat)))
+        return
+
+    backends = [backend.strip() for backend in args.backends.split(",")]
+    unknown = [backend for backend in backends + [args.reference] if backend not in BACKENDS]
+    if unknown:
+        parser.error(f"unknown backends: {', '.join(unknown)}")
+    results = {backend: measure(backend, args.repeat) for backend in dict.fromkeys(backends + [args.reference])}
+    reference = results[args.reference].get("splits")
+    texts = corpus_texts()
+
+    print(f"{len(texts)} step texts, reference: {args.reference}" + ("" if reference else " (unavailable, no accuracy)"))
+    print(f"{'backend':12} {'load s':>8} {'RSS MB':>8} {'ms/step':>9} {'precision':>10} {'recall':>8} {'exact':>7}")
+    for backend in backends:
+        result = results[backend]
+        if "error" in result:
+            print(f"{backend:12} unavailable: {result['error']}")
+            continue
+        line = f"{backend:12} {result['load_seconds']:8.2f} {result['rss_bytes'] / 2 ** 20:8.1f} {result['ms_per_step']:9.3f}"
+        if reference:
+            precision, recall, exact = agreement(texts, result["splits"], reference)
+            line += f" {precision:10.1%} {recall:8.1%} {exact:7.1%}"
+        print(line)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+Encode/decode throughput and size of the binary recipe format (serialization.py) against
+the indented JSON main.py writes, on a corpus built from the parsed fixture recipes.
+
+Usage (from the repository root):
+    python benchmarks/serialization_bench.py [--copies 500]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from corpus import load_corpus
+from parse import find_recipe, parse_recipe, recipe_to_json
+from serialization import decode_recipes, encode_recipes, json_to_recipe
+
+def timed(function):
+    start = time.perf_counter()
+    result = function()
+    return result, time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--copies", type=int, default=500, help="number of recipes in the benchmark batch")
+    args = parser.parse_args()
+
+    parsed = [parse_recipe(find_recipe(json_ld)) for _, json_ld in load_corpus()]
+    recipes = [parsed[i % len(parsed)] for i in range(args.copies)]
+
+    # check the round trips are lossless before timing anything
+    for original, decoded in zip(recipes, decode_recipes(encode_recipes(recipes))):
+        if recipe_to_json(original) != recipe_to_json(decoded):
+            print(f"binary round trip changed {original.title!r}")
+            sys.exit(1)
+        if recipe_to_json(json_to_recipe(recipe_to_json(original))) != recipe_to_json(original):
+            print(f"json_to_recipe round trip changed {original.title!r}")
+            sys.exit(1)
+
+    rows = []
+    for label, indent in [("json (indent=4)", 4), ("json (compact)", None)]:
+        text, encode = timed(lambda: json.dumps([recipe_to_json(recipe) for recipe in recipes], indent=indent))
+        _, decode = timed(lambda: [json_to_recipe(recipe) for recipe in json.loads(text)])
+        rows.append((label, len(text.encode("utf-8")), encode, decode))
+    data, encode = timed(lambda: encode_recipes(recipes))
+    _, decode = timed(lambda: decode_recipes(data))
+    rows.append(("binary (serialization.py)", len(data), encode, decode))
+
+    print(f"{args.copies} recipes")
+    print(f"{'format':28} {'bytes/recipe':>12} {'encode rec/s':>13} {'decode rec/s':>13}")
+    for label, size, encode, decode in rows:
+        print(f"{label:28} {size / args.copies:12.0f} {args.copies / encode:13.0f} {args.copies / decode:13.0f}")
+
+if __name__ == "__main__":
+    main()
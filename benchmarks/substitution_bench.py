@@ -0,0 +1,60 @@
+"""
+Microbenchmark for the substitution engine in substitution.py.
+
+Compares the old replace_items approach (one str.replace per mapping key, for every string)
+against a single SubstitutionTable pass as the mapping grows, using the vegetarian ingredient
+mapping and a set of sample recipe steps.
+
+Usage (from the repository root):
+    python benchmarks/substitution_bench.py [--repeat 200]
+"""
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from substitution import SubstitutionTable
+from veg_transform import ingredient_mapping
+
+STEPS = [
+    "Preheat the oven to 350 degrees F (175 degrees C).",
+    "Season the chicken breasts with salt and pepper, then sear in butter until golden.",
+    "Cook bacon in a large skillet until crisp; crumble and set aside.",
+    "Whisk eggs, milk, and parmesan cheese together in a mixing bowl until smooth.",
+    "Stir in the beef broth and worcestershire sauce and bring to a simmer.",
+    "Add the shrimp and cook until pink, about 3 minutes.",
+    "Layer the noodles, ground beef, ricotta cheese, and mozzarella cheese in the baking dish.",
+    "Drizzle with fish sauce and honey, then garnish with gelatin cubes and anchovies.",
+]
+
+def legacy_replace(strings, mappings):
+    # what each transform module did before substitution.py
+    updated_strings = []
+    for string in strings:
+        for mapping in mappings:
+            for old, new in mapping.items():
+                string = string.replace(old, new)
+        updated_strings.append(string)
+    return updated_strings
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=200, help="number of passes over the sample steps")
+    args = parser.parse_args()
+
+    items = list(ingredient_mapping.items())
+    sizes = sorted({size for size in (10, 50, 100, len(items)) if size <= len(items)})
+    per_step = args.repeat * len(STEPS)
+    print(f"{'keys':>6} {'str.replace us/step':>20} {'table us/step':>14} {'speedup':>8}")
+    for size in sizes:
+        mapping = dict(items[:size])
+        table = SubstitutionTable(mapping)
+        table.apply("")  # compile outside the timed region
+        legacy = timeit.timeit(lambda: legacy_replace(STEPS, [mapping]), number=args.repeat)
+        compiled = timeit.timeit(lambda: table.apply_all(STEPS), number=args.repeat)
+        print(f"{size:6d} {legacy / per_step * 1e6:20.2f} {compiled / per_step * 1e6:14.2f} {legacy / compiled:7.2f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Benchmark for the vector-table loading modes in spacy_model.py (Linux only).
+
+For each mode, starts --processes fresh interpreters at the same time. Each one loads the model
+with that mode and runs every step text of the fixture corpus through it, then waits while this
+process reads its memory from /proc/<pid>/smaps_rollup. Reports the load time, and per-process
+RSS, PSS (shared pages divided among the processes sharing them) and USS (pages only that
+process uses). With "mmap" the vector pages are shared through the page cache, so they show up in
+RSS but not in USS, and PSS drops as --processes grows.
+
+Usage (from the repository root):
+    python benchmarks/vectors_bench.py [--modes load,mmap] [--processes 4] [--model en_core_web_lg]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from batch import memory_usage
+from corpus import load_corpus
+from parse import MODEL_NAME, find_recipe, step_texts
+from spacy_model import VECTOR_MODES, load_pipeline
+
+MB = 2 ** 20
+
+def run_worker(model, mode):
+    start = time.perf_counter()
+    nlp = load_pipeline(model, vectors=mode)
+    load_seconds = time.perf_counter() - start
+    texts = [text for _, json_ld in load_corpus() for text in step_texts(find_recipe(json_ld))]
+    start = time.perf_counter()
+    sentences = sum(len(list(doc.sents)) for doc in nlp.pipe(texts))
+    print(json.dumps({"load_seconds": load_seconds, "parse_seconds": time.perf_counter() - start, "sentences": sentences}), flush=True)
+    sys.stdin.readline()  # stay alive until the parent has measured us
+
+def measure(model, mode, processes):
+    """
+    Returns a list of per-process results (timings plus memory_usage) for one mode.
+    """
+    workers = [subprocess.Popen([sys.executable, os.path.abspath(__file__), "--worker", mode, "--model", model],
+                                stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+               for _ in range(processes)]
+    results = []
+    try:
+        for worker in workers:
+            line = worker.stdout.readline()
+            if not line:
+                errors = worker.stderr.read().strip().splitlines()
+                raise RuntimeError(errors[-1] if errors else f"exit status {worker.wait()}")
+            results.append(json.loads(line))
+        for worker, result in zip(workers, results):
+            result.update(memory_usage(worker.pid))
+    finally:
+        for worker in workers:
+            worker.stdin.close()
+            worker.wait()
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modes", default="load,mmap", help=f"comma-separated vector modes ({', '.join(VECTOR_MODES)})")
+    parser.add_argument("--processes", type=int, default=4, help="processes loading the model at the same time")
+    parser.add_argument("--model", default=MODEL_NAME, help="spaCy package or path to load")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args.model, args.worker)
+        return
+
+    modes = [mode.strip() for mode in args.modes.split(",")]
+    unknown = [mode for mode in modes if mode not in VECTOR_MODES]
+    if unknown:
+        parser.error(f"unknown modes: {', '.join(unknown)}")
+    print(f"{args.model}, {args.processes} processes per mode")
+    print(f"{'mode':6} {'load s':>8} {'parse s':>8} {'RSS MB':>8} {'PSS MB':>8} {'USS MB':>8}  (means per process)")
+    for mode in modes:
+        try:
+            results = measure(args.model, mode, args.processes)
+        except RuntimeError as e:
+            print(f"{mode:6} failed: {e}")
+            continue
+        mean = {key: sum(result[key] for result in results) / len(results)
+                for key in ("load_seconds", "parse_seconds", "rss", "pss", "uss")}
+        print(f"{mode:6} {mean['load_seconds']:8.2f} {mean['parse_seconds']:8.3f} {mean['rss'] / MB:8.1f} "
+              f"{mean['pss'] / MB:8.1f} {mean['uss'] / MB:8.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Microbenchmark for the vocabulary matcher in vocabulary.py.
+
+Compares the per-sentence cost of the old approach (one regex alternation per word list,
+rebuilt inside the loop as parse.py used to do) against a single VocabularyMatcher pass,
+and checks that both find exactly the same terms.
+
+Usage (from the repository root):
+    python benchmarks/vocabulary_bench.py [--repeat 2000]
+"""
+import argparse
+import os
+import re
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from vocabulary import VOCABULARY, get_matcher
+
+SENTENCES = [
+    "Preheat the oven to 350 degrees F (175 degrees C).",
+    "Heat olive oil in a large skillet over medium-high heat.",
+    "Cook and stir onion and garlic in the hot oil until softened, about 5 minutes.",
+    "Whisk eggs, milk, and salt together in a mixing bowl until smooth.",
+    "Transfer to a baking pan lined with aluminum foil and bake until golden brown, 25 to 30 minutes.",
+    "Bring a large pot of lightly salted water to a boil.",
+    "Drain pasta in a colander and return to the pot.",
+    "Place pork belly in a pressure cooker with soy sauce, sugar, and star anise; braise for 1 hour.",
+    "Deep-fry the chicken in batches, then deep fry the potatoes until crisp.",
+    "Sear the steaks, deglaze the pan with wine, and simmer until reduced by half.",
+    "Use a slotted spoon to transfer the dumplings to a plate.",
+    "Roll out the dough with a rolling pin and score the top with a sharp knife.",
+]
+
+INGREDIENT_NAMES = [
+    "fresh basil leaves, finely chopped",
+    "boneless skinless chicken breasts, cubed",
+    "extra-virgin olive oil",
+    "canned diced tomatoes",
+    "large eggs, beaten",
+    "thick-cut bacon, sliced thinly",
+    "frozen peas",
+    "pork shoulder, trimmed and cut into chunks",
+]
+
+def legacy_match(text):
+    # what parse.py did before vocabulary.py: build and scan one pattern per word list
+    found = {}
+    for kind, terms in VOCABULARY.items():
+        pattern = r"\b(" + "|".join(terms) + r")\b"
+        found[kind] = re.findall(pattern, text)
+    return found
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=2000, help="number of passes over the sample texts")
+    args = parser.parse_args()
+
+    matcher = get_matcher()
+    texts = [text.lower() for text in SENTENCES + INGREDIENT_NAMES]
+    for text in texts:
+        if legacy_match(text) != matcher.match(text):
+            print(f"mismatch on {text!r}")
+            sys.exit(1)
+
+    legacy = timeit.timeit(lambda: [legacy_match(text) for text in texts], number=args.repeat)
+    compiled = timeit.timeit(lambda: [matcher.match(text) for text in texts], number=args.repeat)
+    per_text = args.repeat * len(texts)
+    print(f"{'approach':28} {'us/sentence':>12}")
+    print(f"{'regex per word list':28} {legacy / per_text * 1e6:12.2f}")
+    print(f"{'VocabularyMatcher':28} {compiled / per_text * 1e6:12.2f}")
+    print(f"speedup: {legacy / compiled:.2f}x")
+
+if __name__ == "__main__":
+    main()
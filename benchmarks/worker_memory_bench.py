@@ -0,0 +1,54 @@
+"""
+Memory benchmark for the batch runner's worker processes (Linux only).
+
+Starts a BatchRunner twice: with preload (model and tables loaded once in this process, workers
+forked from it) and without (every worker loads its own copy in its initializer). Each runs
+--copies copies of the fixture corpus through --workers workers, and then every worker's
+memory is read from /proc/<pid>/smaps_rollup. Reports RSS, PSS (RSS with shared pages divided
+among the processes sharing them) and USS (memory only that worker uses) per worker, and the
+PSS total over the workers, which is what they really cost together.
+
+Set RECIPE_SEGMENTER to measure another segmentation backend (see segmentation.py).
+
+Usage (from the repository root):
+    python benchmarks/worker_memory_bench.py [--workers 4] [--copies 10] [--transform "to vegetarian and double"]
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from batch import BatchRunner, memory_usage
+from corpus import load_corpus
+
+MB = 2 ** 20
+
+def measure(preload, workers, items, transformation):
+    """
+    Returns (worker memory_usage list, parent memory_usage, failed recipes) for one runner.
+    """
+    with BatchRunner(transformation, workers=workers, preload=preload) as runner:
+        failed = sum(error is not None for _, _, error in runner.run(items))
+        return runner.worker_memory(), memory_usage(os.getpid()), failed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=4, help="worker processes")
+    parser.add_argument("--copies", type=int, default=10, help="number of copies of the fixture corpus to process")
+    parser.add_argument("--transform", default="to vegetarian and double", help="transform request to apply")
+    args = parser.parse_args()
+
+    items = [json_ld for _, json_ld in load_corpus()] * args.copies
+    # without preload first: a preloaded parent would hand its loaded model to the other runner's workers
+    for label, preload in [("per-worker load", False), ("preload + fork", True)]:
+        workers, parent, failed = measure(preload, args.workers, items, args.transform)
+        print(f"{label}: {len(items)} recipes, {failed} failed")
+        print(f"  {'pid':>8} {'RSS MB':>8} {'PSS MB':>8} {'USS MB':>8} {'shared MB':>10}")
+        for usage in sorted(workers, key=lambda usage: usage["pid"]):
+            print(f"  {usage['pid']:8} {usage['rss'] / MB:8.1f} {usage['pss'] / MB:8.1f} {usage['uss'] / MB:8.1f} {usage['shared'] / MB:10.1f}")
+        print(f"  workers: PSS total {sum(usage['pss'] for usage in workers) / MB:.1f} MB, "
+              f"USS total {sum(usage['uss'] for usage in workers) / MB:.1f} MB; parent PSS {parent['pss'] / MB:.1f} MB")
+
+if __name__ == "__main__":
+    main()
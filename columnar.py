@@ -0,0 +1,351 @@
+"""
+Columnar batch engine for ingredient quantities.
+
+IngredientColumns lays the ingredients of a batch of recipes out as parallel NumPy arrays (one
+row per ingredient): the exact amount as numerator/denominator, a unit code, a name id into a
+shared name table, and the pieces of the raw ingredient line around its quantity and unit.
+recipe_offsets[r]:recipe_offsets[r + 1] are the rows of recipe r. Scaling by an arbitrary
+factor (one for the whole batch, or one per recipe), unit promotion (3 tsp -> 1 tbsp) and
+ingredient-name substitution are then array operations over the whole batch; string work is done
+once per distinct value (pandas.factorize) rather than once per row. to_recipes renders the
+result back into raw_ingredients and ingredient dicts.
+
+Scaling gives the same quantities and raw lines as transformation.double_or_half. Amounts are
+held in int64 columns; a row whose amount (or its product with a factor) doesn't fit is kept as
+an exact Fraction instead and scaled one row at a time, as ScaleStage does.
+"""
+import re
+from fractions import Fraction
+
+import numpy as np
+import pandas as pd
+
+from frozen import evolve, freeze
+from quantities import QUANTITY_PATTERN, UNITS, amount_from_json, format_amount, parse_amount
+from substitution import SubstitutionTable
+
+# quantity at the start of a raw ingredient line (as in transformation.LEADING_QUANTITY_REGEX)
+LEADING_QUANTITY_REGEX = re.compile(r"(" + QUANTITY_PATTERN + r")")
+
+# canonical units and their codes; -1 means no (known) unit
+UNIT_NAMES = sorted(set(UNITS.values()))
+UNIT_CODES = {unit: code for code, unit in enumerate(UNIT_NAMES)}
+NO_UNIT = -1
+
+# volume units promote_units moves between, as a number of teaspoons
+VOLUME_TEASPOONS = {"teaspoon": 1, "tablespoon": 3, "cup": 48}
+# smallest amount a unit is promoted to, and the largest denominator it may be written with
+PROMOTION_MINIMUM = {"tablespoon": Fraction(1), "cup": Fraction(1, 4)}
+PROMOTION_MAX_DENOMINATOR = 4
+
+INT64_MAX = int(np.iinfo(np.int64).max)
+
+# teaspoons per unit code (0 for units that aren't volumes), indexed by code
+_TEASPOONS = np.zeros(len(UNIT_NAMES), dtype=np.int64)
+for _unit, _teaspoons in VOLUME_TEASPOONS.items():
+    _TEASPOONS[UNIT_CODES[_unit]] = _teaspoons
+
+def _reduce(numerator, denominator):
+    divisor = np.gcd(numerator, denominator)
+    divisor[divisor == 0] = 1
+    return numerator // divisor, denominator // divisor
+
+def _fits(amount):
+    # whether an amount's numerator and denominator fit in the int64 columns
+    return abs(amount.numerator) <= INT64_MAX and amount.denominator <= INT64_MAX
+
+def _factor(value):
+    # exact Fraction for ints, Fractions and decimal strings; floats are rounded to a sensible fraction
+    if isinstance(value, float):
+        return Fraction(value).limit_denominator(1000)
+    return Fraction(value)
+
+def _split_line(raw_line, amount, measurement):
+    """
+    Splits a raw ingredient line into (lead, middle, tail): the written quantity, the written
+    measurement with the space before it, and the rest. lead is empty when the line doesn't start
+    with the ingredient's amount (the line can't be rewritten), middle when the measurement
+    doesn't follow the quantity.
+    """
+    match = LEADING_QUANTITY_REGEX.match(raw_line)
+    if amount is None or not match or parse_amount(match.group(1)) != amount:
+        return "", "", raw_line
+    lead, rest = raw_line[:match.end(1)], raw_line[match.end(1):]
+    if measurement:
+        unit_match = re.match(r"\s*" + re.escape(measurement) + r"\b", rest, re.IGNORECASE)
+        if unit_match:
+            return lead, rest[:unit_match.end()], rest[unit_match.end():]
+    return lead, "", rest
+
+class IngredientColumns:
+    """
+    The ingredients of a batch of recipes (recipe_to_json dicts) in columnar form. Build it with
+    from_recipes, apply scale / promote_units / substitute, then render with to_recipes.
+    """
+    def __init__(self, recipes):
+        self.recipes = [freeze(recipe) for recipe in recipes]
+        ingredients = [ingredient for recipe in self.recipes for ingredient in recipe["ingredients"]]
+        counts = np.array([len(recipe["ingredients"]) for recipe in self.recipes], dtype=np.int64)
+        self.recipe_offsets = np.concatenate([[0], np.cumsum(counts)])
+        rows = len(ingredients)
+
+        self.has_amount = np.zeros(rows, dtype=bool)
+        self.numerator = np.zeros(rows, dtype=np.int64)
+        self.denominator = np.ones(rows, dtype=np.int64)
+        self.unit_code = np.full(rows, NO_UNIT, dtype=np.int64)
+        # rows whose amount doesn't fit in int64, with the amount as a Fraction in self.exact
+        self.overflow = np.zeros(rows, dtype=bool)
+        self.exact = {}
+        leads, middles, tails = [], [], []
+        row = 0
+        for recipe in self.recipes:
+            raw_ingredients = recipe["raw_ingredients"]
+            for i, ingredient in enumerate(recipe["ingredients"]):
+                amount = amount_from_json(ingredient.get("amount"))
+                if amount is not None:
+                    self.has_amount[row] = True
+                    self._set_amount(row, amount)
+                self.unit_code[row] = UNIT_CODES.get(ingredient.get("unit"), NO_UNIT)
+                if i < len(raw_ingredients):
+                    lead, middle, tail = _split_line(raw_ingredients[i], amount, ingredient.get("measurement"))
+                else:
+                    lead, middle, tail = "", "", None  # no raw line for this ingredient
+                leads.append(lead)
+                middles.append(middle)
+                tails.append(tail)
+                row += 1
+
+        self.ingredients = ingredients
+        self.name_id, self.names = pd.factorize(np.array([ingredient["name"] for ingredient in ingredients], dtype=object))
+        # raw line endings; -1 for ingredients without a raw line
+        self.tail_id, self.tails = pd.factorize(np.array(tails, dtype=object))
+        self.leads = np.array(leads, dtype=object)
+        self.middles = np.array(middles, dtype=object)
+        # rows whose raw line starts with the ingredient's amount, and whose unit is written after it
+        self.editable = self.leads != ""
+        self.unit_written = self.middles != ""
+        self.amount_changed = np.zeros(rows, dtype=bool)
+        self.unit_changed = np.zeros(rows, dtype=bool)
+
+    @classmethod
+    def from_recipes(cls, recipes):
+        return cls(recipes)
+
+    def __len__(self):
+        return len(self.ingredients)
+
+    def _set_amount(self, row, amount):
+        if _fits(amount):
+            self.numerator[row] = amount.numerator
+            self.denominator[row] = amount.denominator
+            self.overflow[row] = False
+            self.exact.pop(row, None)
+        else:
+            self.numerator[row] = 0
+            self.denominator[row] = 1
+            self.overflow[row] = True
+            self.exact[row] = amount
+
+    def amount(self, row):
+        """
+        Returns the amount of a row as a Fraction.
+        """
+        if self.overflow[row]:
+            return self.exact[row]
+        return Fraction(int(self.numerator[row]), int(self.denominator[row]))
+
+    def scale(self, factors):
+        """
+        Multiplies every amount by a factor.
+
+        Args:
+            factors: one factor for the whole batch (int, Fraction, float or decimal string),
+                     or a sequence with one factor per recipe.
+        """
+        counts = np.diff(self.recipe_offsets)
+        if isinstance(factors, (list, tuple, np.ndarray, pd.Series)):
+            fractions = [_factor(factor) for factor in factors]
+        else:
+            fractions = [_factor(factors)] * len(self.recipes)
+        # a factor too large for int64 scales the rows of its recipe exactly
+        factor_fits = np.repeat(np.array([_fits(f) for f in fractions], dtype=bool), counts)
+        factor_numerator = np.repeat(np.array([f.numerator if _fits(f) else 1 for f in fractions], dtype=np.int64), counts)
+        factor_denominator = np.repeat(np.array([f.denominator if _fits(f) else 1 for f in fractions], dtype=np.int64), counts)
+        # check the products against the int64 bounds before multiplying
+        exact = self.has_amount & (
+            self.overflow | ~factor_fits
+            | (np.abs(self.numerator) > INT64_MAX // np.maximum(np.abs(factor_numerator), 1))
+            | (self.denominator > INT64_MAX // factor_denominator)
+        )
+        mask = self.has_amount & ~exact
+        # products that would overflow are computed too, but never kept
+        numerator, denominator = _reduce(self.numerator * factor_numerator, self.denominator * factor_denominator)
+        self.numerator = np.where(mask, numerator, self.numerator)
+        self.denominator = np.where(mask, denominator, self.denominator)
+        if exact.any():
+            recipe_of_row = np.repeat(np.arange(len(self.recipes)), counts)
+            for row in np.flatnonzero(exact):
+                self._set_amount(row, self.amount(row) * fractions[recipe_of_row[row]])
+        self.amount_changed |= self.has_amount
+        return self
+
+    def promote_units(self):
+        """
+        Moves volume amounts up to a larger unit where it reads better: 3 tsp -> 1 tbsp,
+        4 tbsp -> 1/4 cup. An amount is promoted to the largest unit in which it is at least
+        PROMOTION_MINIMUM and can be written with a denominator of at most PROMOTION_MAX_DENOMINATOR.
+        Only rows whose raw line spells out the unit after the quantity are promoted, so the
+        line can be rewritten to match. Amounts too large to convert within int64 stay as they are.
+        """
+        teaspoons_per_unit = _TEASPOONS[np.maximum(self.unit_code, 0)]
+        # bounds for the products below: teaspoons times a minimum's denominator, and the
+        # denominator times a unit size
+        largest = max(VOLUME_TEASPOONS.values())
+        in_range = (
+            ~self.overflow
+            & (np.abs(self.numerator) <= INT64_MAX // (largest * max(m.denominator for m in PROMOTION_MINIMUM.values())))
+            & (self.denominator <= INT64_MAX // largest)
+        )
+        candidates = (self.has_amount & in_range & self.editable & self.unit_written & (self.unit_code >= 0)
+                      & (teaspoons_per_unit > 0))
+        teaspoons = self.numerator * teaspoons_per_unit
+        chosen = np.zeros(len(self), dtype=bool)
+        for unit in sorted(PROMOTION_MINIMUM, key=VOLUME_TEASPOONS.get, reverse=True):
+            size = VOLUME_TEASPOONS[unit]
+            minimum = PROMOTION_MINIMUM[unit]
+            numerator, denominator = _reduce(teaspoons, self.denominator * size)
+            promote = (
+                candidates & ~chosen & (teaspoons_per_unit < size)
+                & (denominator <= PROMOTION_MAX_DENOMINATOR)
+                & (numerator * minimum.denominator >= minimum.numerator * denominator)
+            )
+            self.numerator = np.where(promote, numerator, self.numerator)
+            self.denominator = np.where(promote, denominator, self.denominator)
+            self.unit_code = np.where(promote, UNIT_CODES[unit], self.unit_code)
+            chosen |= promote
+        self.amount_changed |= chosen
+        self.unit_changed |= chosen
+        return self
+
+    def substitute(self, substitutions):
+        """
+        Applies a substitution to every ingredient name and to the ingredient text of every raw
+        line, once per distinct name and line ending.
+
+        Args:
+            substitutions (SubstitutionTable or dict): {old: new} replacements.
+        """
+        if not isinstance(substitutions, SubstitutionTable):
+            substitutions = SubstitutionTable(substitutions)
+        names = np.array(substitutions.apply_all(self.names), dtype=object)
+        remap, self.names = pd.factorize(names)
+        self.name_id = remap[self.name_id]
+        if len(self.tails):
+            tails = np.array(substitutions.apply_all(self.tails), dtype=object)
+            remap, self.tails = pd.factorize(tails)
+            self.tail_id = np.where(self.tail_id >= 0, remap[np.maximum(self.tail_id, 0)], -1)
+        return self
+
+    def quantities(self):
+        """
+        Returns the formatted quantity of every row (None for rows without an amount), formatting
+        each distinct amount once.
+        """
+        if not len(self):
+            return np.array([], dtype=object)
+        pairs = np.stack([self.numerator, self.denominator], axis=1)
+        unique, inverse = np.unique(pairs, axis=0, return_inverse=True)
+        formatted = np.array([format_amount(Fraction(int(n), int(d))) for n, d in unique], dtype=object)
+        quantities = np.where(self.has_amount, formatted[inverse.reshape(-1)], None)
+        for row, amount in self.exact.items():
+            quantities[row] = format_amount(amount)
+        return quantities
+
+    def unit_texts(self):
+        """
+        Returns how the unit of every promoted row is written ("tablespoon", "tablespoons").
+        """
+        names = np.array(UNIT_NAMES + [""], dtype=object)
+        plural = np.array([unit + "s" for unit in UNIT_NAMES] + [""], dtype=object)
+        codes = np.where(self.unit_code >= 0, self.unit_code, len(UNIT_NAMES))
+        more_than_one = self.numerator > self.denominator
+        for row, amount in self.exact.items():
+            more_than_one[row] = amount > 1
+        return np.where(more_than_one, plural[codes], names[codes])
+
+    def to_frame(self):
+        """
+        Returns the columns as a pandas DataFrame, one row per ingredient.
+        """
+        counts = np.diff(self.recipe_offsets)
+        units = np.array(UNIT_NAMES + [None], dtype=object)
+        numerator, denominator = self.numerator, self.denominator
+        amount = np.where(self.has_amount, numerator / denominator, np.nan)
+        if self.exact:
+            # Python ints for the amounts int64 can't hold
+            numerator, denominator = numerator.astype(object), denominator.astype(object)
+            for row, exact in self.exact.items():
+                numerator[row], denominator[row], amount[row] = exact.numerator, exact.denominator, float(exact)
+        return pd.DataFrame({
+            "recipe": np.repeat(np.arange(len(self.recipes)), counts),
+            "name": self.names[self.name_id] if len(self) else np.array([], dtype=object),
+            "numerator": numerator,
+            "denominator": denominator,
+            "amount": amount,
+            "unit": units[np.where(self.unit_code >= 0, self.unit_code, len(UNIT_NAMES))],
+        })
+
+    def to_recipes(self):
+        """
+        Renders the columns back into the recipes: rewritten raw_ingredients and ingredient
+        dicts. Returns new frozen recipes that share everything that didn't change.
+        """
+        quantities = self.quantities()
+        unit_texts = self.unit_texts()
+        units = np.array(UNIT_NAMES + [None], dtype=object)
+        canonical_units = units[np.where(self.unit_code >= 0, self.unit_code, len(UNIT_NAMES))]
+        names = self.names[self.name_id] if len(self) else np.array([], dtype=object)
+
+        # raw lines: lead + middle + tail, with the lead and unit rewritten where they changed
+        rewrite = self.amount_changed & self.editable
+        leads = np.where(rewrite, quantities, self.leads)
+        middles = np.where(self.unit_changed, " " + unit_texts, self.middles)
+        has_line = self.tail_id >= 0
+        tails = np.array(list(self.tails) + [""], dtype=object)[np.where(has_line, self.tail_id, len(self.tails))]
+        lines = np.where(has_line, leads + middles + tails, None)
+
+        transformed = []
+        for r, recipe in enumerate(self.recipes):
+            start, end = self.recipe_offsets[r], self.recipe_offsets[r + 1]
+            raw_ingredients = list(recipe["raw_ingredients"])
+            ingredients = []
+            for i, row in enumerate(range(start, end)):
+                ingredient = dict(self.ingredients[row], name=names[row])
+                if self.amount_changed[row]:
+                    ingredient["quantity"] = quantities[row]
+                    amount = self.amount(row)
+                    ingredient["amount"] = [amount.numerator, amount.denominator]
+                if self.unit_changed[row]:
+                    ingredient["measurement"] = unit_texts[row]
+                    ingredient["unit"] = canonical_units[row]
+                ingredients.append(ingredient)
+                if lines[row] is not None:
+                    raw_ingredients[i] = lines[row]
+            transformed.append(evolve(recipe, dict(recipe, ingredients=ingredients, raw_ingredients=raw_ingredients)))
+        return transformed
+
+def scale_recipes(recipes, factors, promote=False):
+    """
+    Scales a batch of recipes in one columnar pass.
+
+    Args:
+        recipes (list of dicts): recipes in recipe_to_json form.
+        factors: one factor for every recipe, or one per recipe (e.g. target / current servings).
+        promote (bool): also promote volume units that grew past the next unit (see promote_units).
+    Returns:
+        recipes (list of dicts): the scaled recipes, frozen (see frozen.py).
+    """
+    columns = IngredientColumns(recipes).scale(factors)
+    if promote:
+        columns.promote_units()
+    return columns.to_recipes()
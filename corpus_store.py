@@ -0,0 +1,342 @@
+"""
+Append-only corpus file of parsed recipes, opened with mmap for random access by id.
+
+A corpus file holds any number of recipes in the binary encoding of serialization.py. Recipes
+are appended in blocks, one block per CorpusWriter.append call, and get consecutive ids starting at
+0. All blocks share one string table: a block only stores the strings no earlier block has. Every
+block keeps an offset index of its recipes and its strings, so a reader decodes recipe i by
+reading its body and the strings it references straight from the mapped file. It never reads
+the whole corpus. The mapping is read-only, so every process that opens the same file shares
+its pages in the OS page cache.
+
+    file header   b"RCPS", u16 format version, u16 reserved, u64 reserved
+    blocks        one after another:
+        header          b"BLCK", u16 schema version, u16 reserved, u32 recipe count,
+                        u32 string count, u64 body bytes, u64 string bytes
+        recipe offsets  (recipe count + 1) x u64 byte offsets into the body, the last one its end
+        string offsets  (string count + 1) x u64 byte offsets into the string data
+        body            the u32 body values of every recipe (see serialization.encode_body),
+                        padded to 8 bytes
+        string data     the UTF-8 bytes of the block's new strings, padded to 8 bytes
+
+String references number the strings of all blocks in order: 0 is None, 1 to n the first block's
+strings, and so on. All integers are little-endian. The writer appends a whole block and syncs it
+before returning, and readers ignore a block that is cut short, so an interrupted append leaves
+every earlier recipe readable. There should be one writer at a time. Readers see recipes appended
+after they opened the file once they call refresh.
+
+Usage:
+    python corpus_store.py add CORPUS [FILE]   append the recipes of main.py --ndjson output (or stdin)
+    python corpus_store.py get CORPUS ID...    print recipes as JSON
+    python corpus_store.py info CORPUS
+"""
+import argparse
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from bisect import bisect_right
+from collections import namedtuple
+
+from serialization import SCHEMA_VERSION, StringTable, _to_little_endian, _uint_array, decode_body, encode_body
+
+MAGIC = b"RCPS"
+BLOCK_MAGIC = b"BLCK"
+FORMAT_VERSION = 1
+HEADER = struct.Struct("<4sHHQ")
+BLOCK = struct.Struct("<4sHHIIQQ")
+OFFSET = struct.Struct("<Q")
+# recipes decoded per read when iterating over the corpus
+ITERATION_CHUNK = 1024
+
+# positions are absolute byte offsets in the file
+Block = namedtuple("Block", ["first_id", "first_ref", "count", "string_count", "version",
+                             "recipe_offsets", "string_offsets", "body", "strings", "end"])
+
+def padded(size):
+    return -size % 8
+
+def encode_block(recipes, table):
+    """
+    Encodes recipes as one block, adding the strings table doesn't have yet to it.
+
+    Args:
+        recipes (list of Recipe): the recipes.
+        table (StringTable): every string already in the corpus; updated in place.
+
+    Returns:
+        bytes: the block.
+    """
+    first_string = len(table.strings)
+    body = array("I")
+    recipe_offsets = [0]
+    for recipe in recipes:
+        body.extend(encode_body(recipe, table.ref))
+        recipe_offsets.append(4 * len(body))
+    body = _to_little_endian(body).tobytes()
+    strings = [string.encode("utf-8") for string in table.strings[first_string:]]
+    string_offsets = [0]
+    for string in strings:
+        string_offsets.append(string_offsets[-1] + len(string))
+    string_data = b"".join(strings)
+    return b"".join([
+        BLOCK.pack(BLOCK_MAGIC, SCHEMA_VERSION, 0, len(recipes), len(strings), len(body), len(string_data)),
+        struct.pack(f"<{len(recipe_offsets)}Q", *recipe_offsets),
+        struct.pack(f"<{len(string_offsets)}Q", *string_offsets),
+        body, bytes(padded(len(body))),
+        string_data, bytes(padded(len(string_data))),
+    ])
+
+def read_blocks(data, offset, first_id=0, first_ref=1):
+    """
+    Returns the complete blocks in data from offset on, as Block tuples.
+    """
+    blocks = []
+    while offset + BLOCK.size <= len(data):
+        magic, version, _, count, string_count, body_size, string_size = BLOCK.unpack_from(data, offset)
+        if magic != BLOCK_MAGIC:
+            raise ValueError(f"Corrupt corpus: no block at byte {offset}.")
+        recipe_offsets = offset + BLOCK.size
+        string_offsets = recipe_offsets + 8 * (count + 1)
+        body = string_offsets + 8 * (string_count + 1)
+        strings = body + body_size + padded(body_size)
+        end = strings + string_size + padded(string_size)
+        if end > len(data):
+            break  # an append that didn't finish
+        blocks.append(Block(first_id, first_ref, count, string_count, version,
+                            recipe_offsets, string_offsets, body, strings, end))
+        first_id += count
+        first_ref += string_count
+        offset = end
+    return blocks
+
+def read_header(data):
+    magic, version, _, _ = HEADER.unpack_from(data, 0)
+    if magic != MAGIC:
+        raise ValueError("Not a recipe corpus file.")
+    if version > FORMAT_VERSION:
+        raise ValueError(f"Recipe corpus uses format version {version}, newer than supported ({FORMAT_VERSION}).")
+
+class MappedStrings:
+    """
+    The corpus string table as a sequence, decoding each string from the mapped file when it is
+    looked up.
+    """
+    def __init__(self, store):
+        self.store = store
+
+    def __getitem__(self, ref):
+        if ref == 0:
+            return None
+        store = self.store
+        block = store._blocks[bisect_right(store._first_refs, ref) - 1]
+        position = block.string_offsets + 8 * (ref - block.first_ref)
+        (start,) = OFFSET.unpack_from(store._map, position)
+        (end,) = OFFSET.unpack_from(store._map, position + 8)
+        return str(store._map[block.strings + start:block.strings + end], "utf-8")
+
+class CorpusStore:
+    """
+    Read-only, memory-mapped view of a corpus file: store[i] is recipe i as a Recipe, and iterating
+    yields every recipe in id order.
+
+    Args:
+        path (str): the corpus file.
+    """
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "rb")
+        self._map = None
+        self._blocks = []
+        self._first_ids = []
+        self._first_refs = []
+        self.strings = MappedStrings(self)
+        self.refresh()
+
+    def refresh(self):
+        """
+        Picks up recipes appended since the file was opened or last refreshed.
+
+        Returns:
+            int: the number of recipes in the corpus.
+        """
+        size = os.fstat(self._file.fileno()).st_size
+        if self._map is not None and size == len(self._map):
+            return len(self)
+        if self._map is not None:
+            self._map.close()
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        if not self._blocks:
+            read_header(self._map)
+        last = self._blocks[-1] if self._blocks else None
+        blocks = read_blocks(self._map, last.end if last else HEADER.size,
+                             last.first_id + last.count if last else 0,
+                             last.first_ref + last.string_count if last else 1)
+        self._blocks += blocks
+        self._first_ids += [block.first_id for block in blocks]
+        self._first_refs += [block.first_ref for block in blocks]
+        return len(self)
+
+    def __len__(self):
+        if not self._blocks:
+            return 0
+        return self._blocks[-1].first_id + self._blocks[-1].count
+
+    def __getitem__(self, recipe_id):
+        if recipe_id < 0:
+            recipe_id += len(self)
+        if not 0 <= recipe_id < len(self):
+            raise IndexError(f"recipe id {recipe_id} out of range for a corpus of {len(self)}")
+        block = self._blocks[bisect_right(self._first_ids, recipe_id) - 1]
+        position = block.recipe_offsets + 8 * (recipe_id - block.first_id)
+        (start,) = OFFSET.unpack_from(self._map, position)
+        (end,) = OFFSET.unpack_from(self._map, position + 8)
+        values = _uint_array(self._map[block.body + start:block.body + end])
+        return decode_body(iter(values), self.strings, block.version)
+
+    def __iter__(self):
+        for block in self._blocks:
+            # read the bodies of a chunk of recipes at once rather than one recipe at a time
+            for first in range(0, block.count, ITERATION_CHUNK):
+                last = min(first + ITERATION_CHUNK, block.count)
+                (start,) = OFFSET.unpack_from(self._map, block.recipe_offsets + 8 * first)
+                (end,) = OFFSET.unpack_from(self._map, block.recipe_offsets + 8 * last)
+                values = iter(_uint_array(self._map[block.body + start:block.body + end]))
+                for _ in range(first, last):
+                    yield decode_body(values, self.strings, block.version)
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+class CorpusWriter:
+    """
+    Appends recipes to a corpus file, creating it if it doesn't exist. Opening an existing file
+    reads its string table, so new blocks can refer to the strings already stored.
+
+    Args:
+        path (str): the corpus file.
+    """
+    def __init__(self, path):
+        self.path = path
+        self._table = StringTable()
+        self.count = 0
+        if not os.path.exists(path) or os.path.getsize(path) == 0:
+            with open(path, "wb") as file:
+                file.write(HEADER.pack(MAGIC, FORMAT_VERSION, 0, 0))
+        self._file = open(path, "r+b")
+        with CorpusStore(path) as store:
+            self.count = len(store)
+            for ref in range(1, sum(block.string_count for block in store._blocks) + 1):
+                self._table.ref(store.strings[ref])
+            end = store._blocks[-1].end if store._blocks else HEADER.size
+        # drop what an interrupted append left behind
+        self._file.truncate(end)
+        self._file.seek(end)
+
+    def append(self, recipes):
+        """
+        Appends recipes as one block and syncs it to disk. If that fails, nothing is appended.
+
+        Args:
+            recipes (iterable of Recipe): the recipes.
+
+        Returns:
+            int: the id of the first recipe appended.
+        """
+        recipes = list(recipes)
+        first_id = self.count
+        if not recipes:
+            return first_id
+        string_count = len(self._table.strings)
+        end = self._file.tell()
+        try:
+            self._file.write(encode_block(recipes, self._table))
+            self._file.flush()
+            os.fsync(self._file.fileno())
+        except BaseException:
+            # a recipe that can't be encoded or a failed write: the strings this block added were
+            # never stored, so later blocks must not refer to them
+            self._table.truncate(string_count)
+            self._file.seek(end)
+            self._file.truncate(end)
+            raise
+        self.count += len(recipes)
+        return first_id
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+def write_corpus(path, recipes, block_size=10000):
+    """
+    Appends recipes to a corpus file in blocks of block_size; returns the number of recipes in it.
+    """
+    with CorpusWriter(path) as writer:
+        batch = []
+        for recipe in recipes:
+            batch.append(recipe)
+            if len(batch) == block_size:
+                writer.append(batch)
+                batch = []
+        writer.append(batch)
+        return writer.count
+
+def read_recipes(lines):
+    # Recipe objects from main.py --ndjson records ({"line": ..., "recipe": {...}}) or bare recipe dicts
+    from serialization import json_to_recipe
+    for line in lines:
+        if not line.strip():
+            continue
+        record = json.loads(line)
+        if "error" in record:
+            continue
+        yield json_to_recipe(record.get("recipe", record))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    add = commands.add_parser("add", help="append recipes to a corpus file, creating it if needed")
+    add.add_argument("corpus")
+    add.add_argument("file", nargs="?", help="NDJSON file from main.py --ndjson (default: stdin)")
+    get = commands.add_parser("get", help="print recipes by id as JSON")
+    get.add_argument("corpus")
+    get.add_argument("ids", nargs="+", type=int)
+    info = commands.add_parser("info", help="print the number of recipes and blocks")
+    info.add_argument("corpus")
+    args = parser.parse_args()
+
+    if args.command == "add":
+        with open(args.file) if args.file else sys.stdin as file:
+            count = write_corpus(args.corpus, read_recipes(file))
+        print(f"{count} recipes in {args.corpus}", file=sys.stderr)
+        return
+
+    with CorpusStore(args.corpus) as store:
+        if args.command == "info":
+            print(f"{len(store)} recipes in {len(store._blocks)} blocks, {os.path.getsize(args.corpus)} bytes")
+            return
+        from parse import recipe_to_json
+        for recipe_id in args.ids:
+            try:
+                print(json.dumps(recipe_to_json(store[recipe_id])))
+            except IndexError as e:
+                parser.error(str(e))
+
+if __name__ == "__main__":
+    main()
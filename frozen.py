@@ -0,0 +1,111 @@
+"""
+Immutable, structurally shared recipe data.
+
+freeze turns recipe_to_json output into FrozenDicts and tuples. They are still dicts and tuples,
+so they read like the plain structures and serialize with json.dump, but any attempt to modify
+them raises TypeError. Transforms build new frozen recipes that reuse every ingredient, step and
+list they don't change, so one parsed recipe can be fanned out to any number of transforms (also
+from several threads) without copying it first. thaw gives back plain, mutable dicts and lists.
+"""
+
+class FrozenDict(dict):
+    """
+    A dict that can't be modified after it is created. Values are expected to be frozen too;
+    build instances with freeze rather than directly.
+    """
+    __slots__ = ()
+
+    def _immutable(self, *args, **kwargs):
+        raise TypeError(f"{type(self).__name__} is immutable")
+
+    __setitem__ = __delitem__ = __ior__ = _immutable
+    clear = pop = popitem = setdefault = update = _immutable
+
+    def __reduce__(self):
+        # pickle through the constructor; the default dict path would call __setitem__
+        return (FrozenDict, (dict(self),))
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __repr__(self):
+        return f"FrozenDict({dict.__repr__(self)})"
+
+def freeze(value):
+    """
+    Returns an immutable version of value: dicts become FrozenDicts and lists become tuples,
+    recursively. Values that are already frozen are returned as they are.
+    """
+    if isinstance(value, FrozenDict):
+        return value
+    if isinstance(value, dict):
+        return FrozenDict({key: freeze(item) for key, item in value.items()})
+    if isinstance(value, (list, tuple)):
+        items = tuple(freeze(item) for item in value)
+        if isinstance(value, tuple) and all(new is old for new, old in zip(items, value)):
+            return value
+        return items
+    return value
+
+def thaw(value):
+    """
+    Returns a plain, mutable deep copy of a frozen value.
+    """
+    if isinstance(value, dict):
+        return {key: thaw(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [thaw(item) for item in value]
+    return value
+
+MISSING = object()
+
+def rebase(value, original):
+    """
+    Returns a frozen version of value that reuses original, or the parts of it (dict fields, list
+    items at the same position) that are unchanged.
+    """
+    if value is original:
+        return original
+    if isinstance(value, dict) and isinstance(original, FrozenDict):
+        return evolve(original, value)
+    if isinstance(value, (list, tuple)) and isinstance(original, tuple):
+        items = [rebase(item, original[i]) if i < len(original) else freeze(item) for i, item in enumerate(value)]
+        return share(items, original)
+    value = freeze(value)
+    return original if value == original else value
+
+def evolve(original, changed):
+    """
+    Returns a frozen version of changed, a dict edited from original, that reuses original's
+    values wherever they are unchanged. Returns original itself if nothing changed.
+
+    Args:
+        original (FrozenDict): the value before the edit.
+        changed (dict): the edited value.
+    """
+    if changed is original:
+        return original
+    fields = {}
+    same = len(changed) == len(original)
+    for key, value in changed.items():
+        old = original.get(key, MISSING)
+        value = freeze(value) if old is MISSING else rebase(value, old)
+        if value is not old:
+            same = False
+        fields[key] = value
+    return original if same else FrozenDict(fields)
+
+def share(items, original):
+    """
+    Returns items as a tuple, or original itself if every item is the same object as before.
+
+    Args:
+        items (list): the transformed items.
+        original (tuple): the items before the transform.
+    """
+    if len(items) == len(original) and all(new is old for new, old in zip(items, original)):
+        return original
+    return tuple(items)
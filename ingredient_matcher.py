@@ -0,0 +1,66 @@
+"""
+Detects which of a recipe's ingredients a step sentence mentions.
+
+An ingredient counts as mentioned if its name appears in the sentence, or if any word of the
+sentence is at least 60% similar to the name (normalized Indel similarity, which is what
+Levenshtein.ratio computes). Instead of calling Levenshtein.ratio once per (ingredient, word)
+pair, IngredientMatcher scores every distinct word of every sentence against every ingredient
+name in one batched rapidfuzz.process.cdist call.
+"""
+import instrumentation
+
+SIMILARITY_CUTOFF = 0.6
+# slack for float rounding, so pairs exactly at the cutoff (e.g. "heavy" / "honey") still match
+CUTOFF_TOLERANCE = 1e-9
+
+class IngredientMatcher:
+    """
+    Per-recipe index of ingredient names, built once and reused for all of the recipe's sentences.
+    """
+    def __init__(self, ingredient_names):
+        self.names = list(ingredient_names)
+        self.lowered = [name.lower() for name in self.names]
+
+    def match(self, sentence):
+        """
+        Returns the ingredient names mentioned in a single sentence.
+        """
+        return self.match_many([sentence])[0]
+
+    @instrumentation.instrumented("fuzzy_match")
+    def match_many(self, sentences):
+        """
+        Returns the ingredient names mentioned in each sentence, scoring all sentences at once.
+
+        Args:
+            sentences (list of strings): step sentences of one recipe.
+
+        Returns:
+            matches (list of lists): for each sentence, names found by substring first (in no
+                                     particular order), then names found by similarity, in
+                                     ingredient order.
+        """
+        lowered_sentences = [sentence.lower() for sentence in sentences]
+        # every distinct word across the sentences gets one row in the score matrix
+        rows = {}
+        sentence_rows = []
+        for lowered in lowered_sentences:
+            sentence_rows.append([rows.setdefault(word, len(rows)) for word in lowered.split()])
+        scores = None
+        if rows and self.names:
+            from rapidfuzz import process
+            from rapidfuzz.distance import Indel
+            instrumentation.count("fuzzy_comparisons", len(rows) * len(self.names))
+            # no score_cutoff: rapidfuzz zeroes scores at the cutoff too, and those pairs must match
+            scores = process.cdist(list(rows), self.lowered, scorer=Indel.normalized_similarity)
+            scores = scores >= SIMILARITY_CUTOFF - CUTOFF_TOLERANCE
+        matches = []
+        for lowered, row_ids in zip(lowered_sentences, sentence_rows):
+            ingredients = list(set(name for name, name_lower in zip(self.names, self.lowered) if name_lower in lowered))
+            if scores is not None and row_ids:
+                similar = scores[row_ids].any(axis=0)
+                for name, hit in zip(self.names, similar):
+                    if hit and name not in ingredients:
+                        ingredients.append(name)
+            matches.append(ingredients)
+        return matches
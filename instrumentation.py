@@ -0,0 +1,240 @@
+"""
+Per-stage timing and counters for the parsing and transform pipeline.
+
+parse.py, ingredient_matcher.py, substitution.py and pipeline.py time their stages with
+timed(stage) or the instrumented(stage) decorator and count what they process with count(event, n): pages fetched, sentences run
+through spaCy, fuzzy comparisons made, substitutions applied, and so on. Stages can nest, so a
+stage's time includes the stages inside it (parse_steps includes fuzzy_match, for example).
+
+Instrumentation is off by default. Turn it on with enable() or by setting RECIPE_INSTRUMENTATION=1.
+While it is off, timed returns a shared no-op context manager and count returns immediately, and
+the hottest call sites check instrumentation.enabled before doing any work at all.
+
+Everything recorded goes into the process-wide aggregate (see snapshot and prometheus_text).
+Wrapping a recipe in `with trace() as recipe_trace:` also collects what happens in that context
+into a Trace, for a per-recipe breakdown.
+
+Usage (from the repository root):
+    python instrumentation.py <url or JSON-LD file> [-t "to vegetarian and double"] [--prometheus]
+"""
+import contextlib
+import contextvars
+import functools
+import os
+import threading
+import time
+
+enabled = os.environ.get("RECIPE_INSTRUMENTATION", "") not in ("", "0")
+
+# upper bounds, in seconds, of the stage duration histogram buckets
+BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+_NULL_TIMER = contextlib.nullcontext()
+_current_trace = contextvars.ContextVar("recipe_trace", default=None)
+
+def enable(on=True):
+    """
+    Turns instrumentation on (or off with on=False) for the whole process.
+    """
+    global enabled
+    enabled = on
+
+class Registry:
+    """
+    Aggregate stage durations (as histograms) and event counters, shared by every thread.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.stages = {}    # stage -> [bucket counts..., count, sum]
+        self.counters = {}
+
+    def observe(self, stage, seconds):
+        with self.lock:
+            entry = self.stages.get(stage)
+            if entry is None:
+                entry = self.stages[stage] = [0] * (len(BUCKETS) + 1) + [0.0]
+            for i, bound in enumerate(BUCKETS):
+                if seconds <= bound:
+                    entry[i] += 1
+            entry[-2] += 1
+            entry[-1] += seconds
+
+    def add(self, event, n):
+        with self.lock:
+            self.counters[event] = self.counters.get(event, 0) + n
+
+    def reset(self):
+        with self.lock:
+            self.stages.clear()
+            self.counters.clear()
+
+registry = Registry()
+
+class Trace:
+    """
+    What happened while one recipe was processed: every stage in the order it finished, the
+    total time per stage and the event counts.
+    """
+    def __init__(self, label=None):
+        self.label = label
+        self.events = []
+        self.counters = {}
+        self.start = time.perf_counter()
+        self.seconds = None
+
+    def to_dict(self):
+        totals = {}
+        for stage, seconds in self.events:
+            totals[stage] = totals.get(stage, 0.0) + seconds
+        return {
+            "label": self.label,
+            "seconds": self.seconds if self.seconds is not None else time.perf_counter() - self.start,
+            "stages": [{"stage": stage, "seconds": seconds} for stage, seconds in self.events],
+            "stage_totals": totals,
+            "counters": dict(self.counters),
+        }
+
+@contextlib.contextmanager
+def trace(label=None):
+    """
+    Collects the stages and counts recorded in this context (this thread or task) into a Trace.
+    Tracing only records anything while instrumentation is enabled.
+
+    Args:
+        label (str): what is being traced, e.g. the recipe's URL.
+    """
+    recipe_trace = Trace(label)
+    token = _current_trace.set(recipe_trace)
+    try:
+        yield recipe_trace
+    finally:
+        recipe_trace.seconds = time.perf_counter() - recipe_trace.start
+        _current_trace.reset(token)
+
+class _Timer:
+    __slots__ = ("stage", "start")
+
+    def __init__(self, stage):
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        record(self.stage, time.perf_counter() - self.start)
+        return False
+
+def timed(stage):
+    """
+    Returns a context manager that records how long its block takes under stage.
+    """
+    return _Timer(stage) if enabled else _NULL_TIMER
+
+def instrumented(stage):
+    """
+    Decorator that times every call of a function under stage. The wrapper checks enabled on each
+    call, so decorated functions can be turned on and off like timed blocks.
+    """
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not enabled:
+                return function(*args, **kwargs)
+            with _Timer(stage):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def record(stage, seconds):
+    registry.observe(stage, seconds)
+    recipe_trace = _current_trace.get()
+    if recipe_trace is not None:
+        recipe_trace.events.append((stage, seconds))
+
+def count(event, n=1):
+    """
+    Adds n to the counter for event, if instrumentation is enabled.
+    """
+    if not enabled:
+        return
+    registry.add(event, n)
+    recipe_trace = _current_trace.get()
+    if recipe_trace is not None:
+        recipe_trace.counters[event] = recipe_trace.counters.get(event, 0) + n
+
+def reset():
+    registry.reset()
+
+def snapshot():
+    """
+    Returns the aggregate metrics as a dict: {"stages": {stage: {"count", "seconds"}}, "counters": {...}}.
+    """
+    with registry.lock:
+        stages = {stage: {"count": entry[-2], "seconds": entry[-1]} for stage, entry in registry.stages.items()}
+        return {"stages": stages, "counters": dict(registry.counters)}
+
+def escape_label(value):
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+def prometheus_text(prefix="recipe"):
+    """
+    Returns the aggregate metrics in the Prometheus text exposition format: a
+    <prefix>_stage_seconds histogram per stage and a <prefix>_events_total counter per event.
+    """
+    with registry.lock:
+        stages = {stage: list(entry) for stage, entry in registry.stages.items()}
+        counters = dict(registry.counters)
+    lines = [
+        f"# HELP {prefix}_stage_seconds Time spent in each pipeline stage.",
+        f"# TYPE {prefix}_stage_seconds histogram",
+    ]
+    for stage in sorted(stages):
+        entry = stages[stage]
+        label = escape_label(stage)
+        for bound, bucket in zip(BUCKETS, entry):
+            lines.append(f'{prefix}_stage_seconds_bucket{{stage="{label}",le="{bound}"}} {bucket}')
+        lines.append(f'{prefix}_stage_seconds_bucket{{stage="{label}",le="+Inf"}} {entry[-2]}')
+        lines.append(f'{prefix}_stage_seconds_sum{{stage="{label}"}} {entry[-1]}')
+        lines.append(f'{prefix}_stage_seconds_count{{stage="{label}"}} {entry[-2]}')
+    lines.append(f"# HELP {prefix}_events_total Items processed by the pipeline stages.")
+    lines.append(f"# TYPE {prefix}_events_total counter")
+    for event in sorted(counters):
+        lines.append(f'{prefix}_events_total{{event="{escape_label(event)}"}} {counters[event]}')
+    return "\n".join(lines) + "\n"
+
+def main():
+    import argparse
+    import json
+
+    import parse
+    from transformation import TRANSFORMS, compile_plan, parse_transformations
+
+    parser = argparse.ArgumentParser(description="Parse (and transform) one recipe and print where the time went.")
+    parser.add_argument("source", help="recipe URL, or a file with the page's JSON-LD")
+    parser.add_argument("-t", "--transform", help='transformations to apply, e.g. "to vegetarian and double"')
+    parser.add_argument("--prometheus", action="store_true", help="print the aggregate metrics instead of the trace")
+    args = parser.parse_args()
+    names = parse_transformations(args.transform) if args.transform else ()
+    if args.transform and (not names or any(name not in TRANSFORMS for name in names)):
+        parser.error(f"invalid transformation request: {args.transform!r}")
+
+    enable()
+    with trace(args.source) as recipe_trace:
+        if os.path.exists(args.source):
+            with open(args.source) as file:
+                json_data = parse.find_recipe(json.load(file))
+        else:
+            json_data = parse.fetch_recipe_json(args.source)
+        if not json_data:
+            parser.error("no recipe found")
+        recipe = parse.recipe_to_json(parse.parse_recipe(json_data))
+        if names:
+            compile_plan(names).run(recipe)
+    if args.prometheus:
+        print(prometheus_text(), end="")
+    else:
+        print(json.dumps(recipe_trace.to_dict(), indent=2))
+
+if __name__ == "__main__":
+    main()
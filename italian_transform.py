@@ -1,7 +1,10 @@
 import json
 import re
-from parse import fetch_recipe, extract_json_ld, parse_recipe, recipe_to_json
-from fractions import Fraction
+from parse import parse_recipe, recipe_to_json
+from frozen import evolve, freeze
+from pipeline import Stage
+from substitution import SubstitutionTable
+from quantities import QUANTITY_PATTERN, amount_from_json, amount_to_json, format_amount, normalize_unit, parse_amount
 
 # Ingredient substitution mapping for Italian cuisine
 ingredient_mapping = {
@@ -96,6 +99,16 @@ common_ingredient_defaults = {
     "mozzarella": {"quantity": "8", "measurement": "ounces"}
 }
 
+# quantity, measurement, and ingredient name of a raw ingredient line
+RAW_INGREDIENT_REGEX = re.compile(r"(?P<quantity>" + QUANTITY_PATTERN + r")?\s*(?P<measurement>\b\w+\b)?\s*(?P<name>.+)")
+
+# compiled substitution tables
+ingredient_substitutions = SubstitutionTable(ingredient_mapping)
+tool_substitutions = SubstitutionTable(tool_mapping)
+method_substitutions = SubstitutionTable(method_mapping)
+raw_step_substitutions = SubstitutionTable(ingredient_mapping, method_mapping, tool_mapping)
+step_substitutions = SubstitutionTable(ingredient_mapping, tool_mapping, method_mapping)
+
 def aggregate_raw_ingredients(raw_ingredients):
     """
     Combines common ingredients in raw_ingredients list to one entry with updated quantity. 
@@ -119,8 +132,7 @@ def aggregate_raw_ingredients(raw_ingredients):
     """
     def parse_raw_ingredient(ingredient):
         # Regular expression to extract quantity, measurement, and ingredient name
-        pattern = r"(?P<quantity>[\d/]+(?:\.\d+)?|\d+)?\s*(?P<measurement>\b\w+\b)?\s*(?P<name>.+)"
-        match = re.match(pattern, ingredient.strip())
+        match = RAW_INGREDIENT_REGEX.match(ingredient.strip())
         if match:
             quantity = match.group("quantity") or "1"  # Default to 1 if no quantity
             measurement = match.group("measurement") or ""
@@ -147,12 +159,12 @@ def aggregate_raw_ingredients(raw_ingredients):
             current_quantity = aggregated[name]["quantity"]
             new_quantity = parsed["quantity"]
             
-            try:
-                # Attempt to parse and add quantities as numbers
-                current_quantity = float(Fraction(current_quantity))
-                new_quantity = float(Fraction(new_quantity))
-                aggregated[name]["quantity"] = str(current_quantity + new_quantity)
-            except ValueError:
+            # Attempt to parse and add quantities as numbers
+            current_amount = parse_amount(current_quantity)
+            new_amount = parse_amount(new_quantity)
+            if current_amount is not None and new_amount is not None:
+                aggregated[name]["quantity"] = format_amount(current_amount + new_amount)
+            else:
                 # Concatenate quantities if they can't be added numerically
                 aggregated[name]["quantity"] += f" + {parsed['quantity']}"
             
@@ -196,13 +208,6 @@ def aggregate_ingredients(ingredients):
         "preparation": None
     }
     """
-    # Helper to convert string quantities to numeric for addition
-    def parse_quantity(q):
-        try:
-            return float(Fraction(q))
-        except ValueError:
-            return None
-    
     # Aggregated result
     aggregated = {}
     
@@ -212,44 +217,26 @@ def aggregate_ingredients(ingredients):
         if name not in aggregated:
             aggregated[name] = ingredient.copy()  # Start with a copy of the first occurrence
         else:
-            # Combine quantities if possible
-            current_quantity = parse_quantity(aggregated[name]["quantity"])
-            new_quantity = parse_quantity(ingredient["quantity"])
+            # Combine quantities if possible, using the amounts parsed when the recipe was parsed
+            current_amount = amount_from_json(aggregated[name].get("amount"))
+            new_amount = amount_from_json(ingredient.get("amount"))
             
-            if current_quantity is not None and new_quantity is not None:
-                aggregated[name]["quantity"] = str(current_quantity + new_quantity)
+            if current_amount is not None and new_amount is not None:
+                total = current_amount + new_amount
+                aggregated[name]["amount"] = amount_to_json(total)
+                aggregated[name]["quantity"] = format_amount(total)
             else:
                 # If quantities are not summable, default to appending the new one
-                aggregated[name]["quantity"] = aggregated[name]["quantity"] + " + " + ingredient["quantity"]
+                aggregated[name]["quantity"] = f"{aggregated[name]['quantity']} + {ingredient['quantity']}"
+                aggregated[name]["amount"] = None
             
             # Merge other fields if they are not already set
-            for key in ["measurement", "descriptor", "preparation"]:
+            for key in ["measurement", "descriptor", "preparation", "unit"]:
                 if not aggregated[name][key] and ingredient[key]:
                     aggregated[name][key] = ingredient[key]
     
     return list(aggregated.values())
 
-def replace_items(strings, mappings):
-    """
-    Replace all occurrences of items in strings based on given mappings.
-    Intended to be used to update all ingredients, tools, methods referenced in recipe steps with transformed equivalent.
-    
-    Args:
-        strings (list): List of strings to process i.e. recipe steps.
-        mappings (list of dicts): List of dictionaries, where each dictionary contains items to replace as keys and their replacements as values.
-                                  Ex: replace ingredients, methods, tools.
-        
-    Returns:
-        updated_strings: List of strings with replacements applied.
-    """
-    updated_strings = []
-    for string in strings:
-        for mapping in mappings:
-            for old, new in mapping.items():
-                string = string.replace(old, new)  # Replace each old item with the new one
-        updated_strings.append(string)
-    return updated_strings
-
 def suggest_enhancing_ingredients(step, iconic_ingredients, current_ingredients):
     """
     Identifies whether any common Italian ingredients could be added to enhance current recipe step.
@@ -283,7 +270,8 @@ def suggest_enhancing_ingredients(step, iconic_ingredients, current_ingredients)
 
 def transform_recipe_to_italian(recipe):
     """
-    Transforms a parsed JSON recipe representation into an Italian-style recipe.
+    Transforms a parsed JSON recipe representation into an Italian-style recipe, returned frozen
+    (see frozen.py).
     """
     transformed_recipe = recipe.copy()
 
@@ -291,7 +279,7 @@ def transform_recipe_to_italian(recipe):
     transformed_recipe["title"] = "Italian-Style " + recipe["title"]
 
     # Transform raw_ingredients
-    transformed_recipe["raw_ingredients"] = replace_items(recipe["raw_ingredients"], [ingredient_mapping])
+    transformed_recipe["raw_ingredients"] = ingredient_substitutions.apply_all(recipe["raw_ingredients"])
 
     # Transform ingredients
     transformed_ingredients = []
@@ -304,7 +292,9 @@ def transform_recipe_to_italian(recipe):
             "quantity": ingredient["quantity"],
             "measurement": ingredient["measurement"],
             "descriptor": ingredient["descriptor"],
-            "preparation": ingredient["preparation"]
+            "preparation": ingredient["preparation"],
+            "amount": ingredient["amount"],
+            "unit": ingredient["unit"]
         })
     transformed_recipe["ingredients"] = transformed_ingredients
 
@@ -323,15 +313,17 @@ def transform_recipe_to_italian(recipe):
     transformed_recipe["methods"] = transformed_methods
 
     # Transform raw_steps: replace ingredients, methods, tools w/ Italian equivalents
-    transformed_recipe["raw_steps"] = replace_items(recipe["raw_steps"], [ingredient_mapping, method_mapping, tool_mapping])
+    transformed_recipe["raw_steps"] = raw_step_substitutions.apply_all(recipe["raw_steps"])
     
     # Transform steps 
     additional_optional_ingredients = set() # set of optional ingredient suggestions to append to recipe ingredient list
-    for i, step in enumerate(transformed_recipe["steps"]):
-        step["text"] = replace_items([step["text"]], [ingredient_mapping, tool_mapping, method_mapping])[0]
-        step["ingredients"] = replace_items(step["ingredients"], [ingredient_mapping])
-        step["tools"] = replace_items(step["tools"], [tool_mapping])
-        step["methods"] = replace_items(step["methods"], [method_mapping])
+    transformed_steps = []
+    for step in recipe["steps"]:
+        step = dict(step) # update a copy so the input recipe is left as it was
+        step["text"] = step_substitutions.apply(step["text"])
+        step["ingredients"] = ingredient_substitutions.apply_all(step["ingredients"])
+        step["tools"] = tool_substitutions.apply_all(step["tools"])
+        step["methods"] = method_substitutions.apply_all(step["methods"])
         
         # check for optional ingredient enhancements for current step
         step["text"], step_ingredient_suggestions = suggest_enhancing_ingredients(step["text"], common_ingredient_to_method_mapping, step["ingredients"])
@@ -339,6 +331,8 @@ def transform_recipe_to_italian(recipe):
         # if optional ingredients were suggested, add to ingredients list for the step & overall recipe
         step["ingredients"].extend(step_ingredient_suggestions)
         additional_optional_ingredients.update(step_ingredient_suggestions)
+        transformed_steps.append(step)
+    transformed_recipe["steps"] = transformed_steps
 
     # update recipe raw ingredients and ingredients list if additional ingredients were suggested
     for optional_ingredient in list(additional_optional_ingredients):
@@ -355,11 +349,26 @@ def transform_recipe_to_italian(recipe):
             "quantity": common_ingredient_defaults[optional_ingredient]["quantity"],
             "measurement": common_ingredient_defaults[optional_ingredient]["measurement"],
             "descriptor": None,
-            "preparation": None
+            "preparation": None,
+            "amount": amount_to_json(parse_amount(common_ingredient_defaults[optional_ingredient]["quantity"])),
+            "unit": normalize_unit(common_ingredient_defaults[optional_ingredient]["measurement"])
         })
     
     # aggregate common ingredients into single entries with updated quantities
     transformed_recipe["raw_ingredients"] = aggregate_raw_ingredients(transformed_recipe["raw_ingredients"])
     transformed_recipe["ingredients"] = aggregate_ingredients(transformed_recipe["ingredients"])
 
-    return transformed_recipe
\ No newline at end of file
+    # frozen like the other transforms' results, sharing whatever was left unchanged with the input
+    return evolve(freeze(recipe), transformed_recipe)
+
+class ItalianStage(Stage):
+    """
+    Pipeline stage for the Italian transform. Ingredient aggregation needs the whole ingredient
+    list, so the stage runs transform_recipe_to_italian as a barrier.
+    """
+    barrier = True
+
+    def apply(self, recipe):
+        return transform_recipe_to_italian(recipe)
+
+TO_ITALIAN = ItalianStage()
@@ -1,13 +1,86 @@
+import argparse
+import os
 import re
-from transformation import transform
-from parse import fetch_recipe, extract_json_ld, parse_recipe, recipe_to_json
+import sys
+import time
+from collections import deque
+from transformation import TRANSFORMS, parse_transformations, transform
+from parse import fetch_recipe_json, parse_recipe, recipe_to_json
 import json
 
 def is_valid_allrecipes_url(url):
     """Validate if the URL is from allrecipes.com"""
     return re.match(r'^https?://(www\.)?allrecipes\.com/recipe/\d+/[^/]+/?$', url)
 
+def read_inputs(lines, line_numbers):
+    """
+    Yields the non-blank input lines (URLs or JSON-LD documents), recording each one's line number.
+    """
+    for line_number, line in enumerate(lines, start=1):
+        line = line.strip()
+        if line:
+            line_numbers.append(line_number)
+            yield line
+
+def stream(lines, transformation=None, workers=None, chunk_size=None, output=sys.stdout):
+    """
+    Non-interactive mode: processes URLs or JSON-LD documents, one per line, and writes one NDJSON
+    record per recipe to output, in input order. Records are written as results come in and only a
+    bounded number of recipes is in flight, so memory use doesn't grow with the input.
+
+    Args:
+        lines (iterable of strings): input lines; blank lines are skipped.
+        transformation (str or None): transforms to apply, e.g. "to vegetarian and double".
+        workers (int): worker processes (see batch.BatchRunner); 0 processes everything in this process.
+        chunk_size (int): inputs sent to a worker at a time.
+        output (file): where records are written.
+    Returns:
+        stats (dict): recipes processed, failures and throughput.
+    """
+    from batch import DEFAULT_CHUNK_SIZE, BatchRunner
+    line_numbers = deque()
+    with BatchRunner(transformation, workers=workers, chunk_size=chunk_size or DEFAULT_CHUNK_SIZE) as runner:
+        for index, recipe, error in runner.run(read_inputs(lines, line_numbers)):
+            record = {"line": line_numbers.popleft()}
+            if error is None:
+                record["recipe"] = recipe
+            else:
+                record["error"] = error
+            output.write(json.dumps(record, ensure_ascii=False) + "\n")
+        return runner.stats
+
+def stream_main(args):
+    names = parse_transformations(args.transform) if args.transform else ()
+    if args.transform and (not names or any(name not in TRANSFORMS for name in names)):
+        print(f"Invalid transformation request: {args.transform!r}", file=sys.stderr)
+        return 2
+    lines = sys.stdin if args.input == "-" else open(args.input)
+    try:
+        stats = stream(lines, args.transform, workers=args.workers, chunk_size=args.chunk_size)
+    except BrokenPipeError:
+        # the reader went away (e.g. piped into head); stop quietly instead of failing on exit's flush
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return 0
+    finally:
+        if lines is not sys.stdin:
+            lines.close()
+    print(f"{stats['recipes']} recipes ({stats['failed']} failed) in {stats['seconds']:.1f}s, "
+          f"{stats['recipes_per_second']:.1f} recipes/s", file=sys.stderr)
+    return 0
+
 def main():
+    parser = argparse.ArgumentParser(description="Parse and transform allrecipes.com recipes. Without --ndjson, asks for a URL and a transformation interactively.")
+    parser.add_argument("--ndjson", action="store_true", help="read URLs or JSON-LD documents line by line and write one JSON record per recipe to stdout")
+    parser.add_argument("input", nargs="?", default="-", help="input file for --ndjson, or - for stdin (default)")
+    parser.add_argument("-t", "--transform", help="transformations to apply in --ndjson mode, e.g. 'to vegetarian and double'; parse only if omitted")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="worker processes for --ndjson mode (default: one per core, 0: no pool)")
+    parser.add_argument("--chunk-size", type=int, default=None, help="recipes sent to a worker at a time in --ndjson mode")
+    args = parser.parse_args()
+    if args.ndjson:
+        sys.exit(stream_main(args))
+    interactive()
+
+def interactive():
     # prompt for user input
     print("Please specify a URL.")
     url = input().strip()
@@ -17,8 +90,7 @@ def main():
         return
     # attempt to fetch and parse url
     try:
-        soup = fetch_recipe(url)
-        json_data = extract_json_ld(soup)
+        json_data = fetch_recipe_json(url)
         if not json_data:
             print("Could not find a valid recipe in the provided URL.")
             return
@@ -35,6 +107,7 @@ def main():
         print("6. To double the recipe, type 'double'.")
         print("7. To halve the recipe, type 'half'.")
         print("8. To make the recipe faster, type 'faster' or 'speed'.")
+        print("You can combine transformations, e.g. 'to vegetarian and double'; they are applied in the order given.")
         print()
         transformation = input(f"How would you like to transform the recipe for {recipe.title}? ")
         
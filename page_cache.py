@@ -0,0 +1,162 @@
+"""
+Persistent on-disk cache of fetched recipe pages, used by parse.fetch_recipe.
+
+Pages are stored zlib-compressed in a SQLite database keyed by normalized URL, together with
+their ETag / Last-Modified headers. A page younger than the TTL is served straight from disk;
+an older one is revalidated with a conditional GET, so an unchanged page costs a 304 instead of
+a full download. If revalidation fails with a connection error, a timeout or a 5xx status, the
+outdated page is served instead of an error. When the cache grows past its size cap, the least
+recently used pages are evicted. SQLite's locking (in WAL mode) makes the cache safe to share
+between threads and worker processes.
+"""
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+DEFAULT_TTL = 24 * 60 * 60            # seconds before a cached page is revalidated
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024  # total compressed size before LRU eviction
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    key TEXT PRIMARY KEY,
+    body BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    etag TEXT,
+    last_modified TEXT,
+    fetched_at REAL NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS pages_last_access ON pages (last_access);
+"""
+
+def normalize_url(url):
+    """
+    Normalizes a URL for use as a cache key: lowercase scheme and host, default ports, fragment
+    and trailing slash dropped, query parameters sorted.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if parts.port and (scheme, parts.port) not in (("http", 80), ("https", 443)):
+        host = f"{host}:{parts.port}"
+    path = parts.path.rstrip("/") or "/"
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((scheme, host, path, query, ""))
+
+class PageCache:
+    """
+    Args:
+        path (string): SQLite database file; its directory is created if needed.
+        ttl (float): seconds a page is served without revalidation.
+        max_bytes (int): compressed size the cache is kept under.
+    """
+    def __init__(self, path, ttl=DEFAULT_TTL, max_bytes=DEFAULT_MAX_BYTES):
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        self.stale_served = 0
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._connection().executescript(SCHEMA)
+
+    def _connection(self):
+        # sqlite connections can't be shared across threads, so each thread opens its own
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def get(self, url, session, timeout=None):
+        """
+        Returns the body of a page (bytes), from the cache when possible.
+
+        Args:
+            url (string): page to fetch.
+            session (requests.Session): session used for downloads and revalidation.
+            timeout: requests timeout.
+        """
+        key = normalize_url(url)
+        connection = self._connection()
+        row = connection.execute(
+            "SELECT body, etag, last_modified, fetched_at FROM pages WHERE key = ?", (key,)
+        ).fetchone()
+        now = time.time()
+        if row and now - row[3] < self.ttl:
+            connection.execute("UPDATE pages SET last_access = ? WHERE key = ?", (now, key))
+            return zlib.decompress(row[0])
+
+        headers = {}
+        if row:
+            if row[1]:
+                headers["If-None-Match"] = row[1]
+            if row[2]:
+                headers["If-Modified-Since"] = row[2]
+        try:
+            response = session.get(url, headers=headers, timeout=timeout)
+        except OSError:
+            # requests' connection errors and timeouts are OSErrors
+            if row:
+                return self._stale(connection, key, row, now)
+            raise
+        if response.status_code == 304 and row:
+            connection.execute("UPDATE pages SET fetched_at = ?, last_access = ? WHERE key = ?", (now, now, key))
+            return zlib.decompress(row[0])
+        if response.status_code >= 500 and row:
+            return self._stale(connection, key, row, now)
+        if response.status_code != 200:
+            raise ValueError("Could not fetch the webpage. Please check the URL.")
+
+        body = response.content
+        self._store(key, body, response.headers.get("ETag"), response.headers.get("Last-Modified"), now)
+        return body
+
+    def _stale(self, connection, key, row, now):
+        # the site is down: serve the outdated copy, and revalidate again on the next request
+        self.stale_served += 1
+        connection.execute("UPDATE pages SET last_access = ? WHERE key = ?", (now, key))
+        return zlib.decompress(row[0])
+
+    def _store(self, key, body, etag, last_modified, now):
+        compressed = zlib.compress(body)
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            connection.execute(
+                "INSERT OR REPLACE INTO pages (key, body, size, etag, last_modified, fetched_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, compressed, len(compressed), etag, last_modified, now, now)
+            )
+            self._evict(connection)
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+
+    def _evict(self, connection):
+        # drop least recently used pages until the cache fits under max_bytes
+        total = connection.execute("SELECT COALESCE(SUM(size), 0) FROM pages").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        evict = []
+        for key, size in connection.execute("SELECT key, size FROM pages ORDER BY last_access"):
+            if total <= self.max_bytes:
+                break
+            evict.append((key,))
+            total -= size
+        connection.executemany("DELETE FROM pages WHERE key = ?", evict)
+
+    def clear(self):
+        self._connection().execute("DELETE FROM pages")
+
+    def stats(self):
+        """
+        Returns (number of pages, total compressed bytes).
+        """
+        return tuple(self._connection().execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM pages").fetchone())
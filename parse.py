@@ -1,38 +1,325 @@
+import os
 import re
 import json
-import spacy
-import requests
-import Levenshtein
-from bs4 import BeautifulSoup
+import threading
+import instrumentation
 from representation import Ingredient, Step, Recipe
+from vocabulary import MEASUREMENTS, get_matcher
+from ingredient_matcher import IngredientMatcher
+from segmentation import DEFAULT_BACKEND, create_segmenter
+from quantities import QUANTITY_PATTERN, amount_to_json, normalize_unit, parse_amount
 
-nlp = spacy.load('en_core_web_lg')
+# spacy, requests and bs4 are imported where they are used so that
+# importing this module (and the transform modules that import it) stays cheap.
+# the spacy model is loaded on first use, see get_nlp
+MODEL_NAME = 'en_core_web_lg'
+# model the senter segmentation backend takes its senter from; any pipeline with a senter works
+SENTER_MODEL_NAME = os.environ.get("RECIPE_SENTER_MODEL", MODEL_NAME)
+# bump whenever a change to this module changes what parse_recipe returns (invalidates recipe_cache.py)
+PARSER_VERSION = 4
+_nlp = None
 
-def fetch_recipe(url):
-    response = requests.get(url)
+def get_nlp():
+    """
+    Returns the spacy pipeline used for parsing steps, loading it the first time it is needed.
+    Its vector table is memory-mapped rather than read into memory (see spacy_model.py).
+    """
+    global _nlp
+    if _nlp is None:
+        from spacy_model import load_pipeline
+        _nlp = load_pipeline(MODEL_NAME)
+    return _nlp
+
+# sentence segmentation backend used by parse_steps, see segmentation.py and get_segmenter
+_segmenter = None
+
+def configure_segmenter(backend):
+    """
+    Sets the sentence segmentation backend parse_steps uses: "model" (the default), "senter",
+    "sentencizer" or "rules" (see segmentation.py).
+    """
+    global _segmenter
+    _segmenter = create_segmenter(backend)
+    return _segmenter
+
+def get_segmenter():
+    """
+    Returns the segmenter parse_steps uses, creating the one named by RECIPE_SEGMENTER (or the
+    default) the first time it is needed. Its pipeline is only loaded once it splits something.
+    """
+    global _segmenter
+    if _segmenter is None:
+        _segmenter = create_segmenter(os.environ.get("RECIPE_SEGMENTER", DEFAULT_BACKEND))
+    return _segmenter
+
+def __getattr__(name):
+    # keep parse.nlp working for existing callers without loading the model at import time
+    if name == "nlp":
+        return get_nlp()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+# (connect, read) timeout in seconds for every page request
+REQUEST_TIMEOUT = (5, 30)
+# retry connection errors and these statuses, with exponential backoff between attempts
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+MAX_RETRIES = 3
+BACKOFF_FACTOR = 0.5
+
+_session = None
+_session_lock = threading.Lock()
+
+def make_session(max_connections_per_host=10):
+    """
+    Creates a requests session that keeps connections alive and retries failed requests.
+
+    Args:
+        max_connections_per_host (int): size of each host's connection pool. Requests block
+                                        until a connection to that host is free.
+    """
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+    retry = Retry(total=MAX_RETRIES, backoff_factor=BACKOFF_FACTOR, status_forcelist=RETRY_STATUSES,
+                  allowed_methods=["GET"], raise_on_status=False)
+    adapter = HTTPAdapter(pool_connections=max_connections_per_host, pool_maxsize=max_connections_per_host,
+                          pool_block=True, max_retries=retry)
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+def get_session():
+    """
+    Returns the session shared by fetch_recipe calls, creating it the first time it is needed.
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = make_session()
+    return _session
+
+# fetched pages are cached under this directory unless RECIPE_PAGE_CACHE=0, see get_page_cache
+CACHE_DIR = os.environ.get("RECIPE_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "recipe_transformer"))
+_page_cache = None
+_page_cache_configured = False
+
+def configure_page_cache(path=None, **options):
+    """
+    Sets the on-disk page cache used by fetch_recipe and fetch_recipe_json.
+
+    Args:
+        path (string): SQLite file for the cache, or None to fetch without caching.
+        options: ttl and max_bytes, passed on to page_cache.PageCache.
+    """
+    global _page_cache, _page_cache_configured
+    from page_cache import PageCache
+    _page_cache = PageCache(path, **options) if path else None
+    _page_cache_configured = True
+    return _page_cache
+
+def get_page_cache():
+    """
+    Returns the page cache, creating the default one under CACHE_DIR the first time it is
+    needed, or None if caching is turned off.
+    """
+    if not _page_cache_configured:
+        enabled = os.environ.get("RECIPE_PAGE_CACHE", "1") not in ("0", "false", "off")
+        configure_page_cache(os.path.join(CACHE_DIR, "pages.sqlite") if enabled else None)
+    return _page_cache
+
+def fetch_page(url, session=None, timeout=REQUEST_TIMEOUT):
+    """
+    Returns the raw bytes of a page, going through the page cache when it is enabled.
+    """
+    session = session or get_session()
+    cache = get_page_cache()
+    instrumentation.count("pages_fetched")
+    with instrumentation.timed("fetch"):
+        if cache:
+            return cache.get(url, session, timeout)
+        response = session.get(url, timeout=timeout)
     if response.status_code == 200:
-        return BeautifulSoup(response.text, 'html.parser')
+        return response.content
     else:
         raise ValueError("Could not fetch the webpage. Please check the URL.")
-    
+
+def fetch_recipe(url, session=None, timeout=REQUEST_TIMEOUT):
+    from bs4 import BeautifulSoup
+    page = fetch_page(url, session, timeout)
+    with instrumentation.timed("html_parse"):
+        return BeautifulSoup(page, 'html.parser')
+
+# size of the chunks fetch_recipe_json reads a streamed page in
+STREAM_CHUNK_SIZE = 16 * 1024
+
+def fetch_recipe_json(url, session=None, timeout=REQUEST_TIMEOUT):
+    """
+    Fetches a page and returns its Recipe JSON-LD (or None) without building the page's DOM.
+    Without a page cache the response is streamed and the download stops once the recipe
+    has been found; with one, the whole page is read so it can be cached.
+    """
+    if get_page_cache():
+        return extract_json_ld_from_html(fetch_page(url, session, timeout))
+    instrumentation.count("pages_fetched")
+    # streamed pages are extracted as they download, so extract_json_ld_from_html includes the download
+    response = (session or get_session()).get(url, timeout=timeout, stream=True)
+    with response:
+        if response.status_code != 200:
+            raise ValueError("Could not fetch the webpage. Please check the URL.")
+        return extract_json_ld_from_html(response.iter_content(chunk_size=STREAM_CHUNK_SIZE))
+
+def fetch_recipes(urls, max_concurrency=8, max_connections_per_host=4, session=None, timeout=REQUEST_TIMEOUT,
+                  fetch=fetch_recipe, ordered=False):
+    """
+    Fetches many recipe pages concurrently over one pooled session, yielding each page as soon
+    as it has been downloaded and parsed (not in input order, unless ordered is set).
+
+    Args:
+        urls (iterable of strings): pages to fetch. Consumed lazily, so it can be a generator.
+        max_concurrency (int): number of pages fetched at the same time.
+        max_connections_per_host (int): open connections allowed to any one host.
+        session (requests.Session): session to use instead of a new pooled one.
+        timeout: requests timeout for each page.
+        fetch (function): fetch_recipe to get BeautifulSoup pages, or fetch_recipe_json to get
+                          the Recipe JSON-LD directly.
+        ordered (bool): yield results in the order of urls. A page that finishes early is held
+                        until every page before it has been yielded.
+
+    Yields:
+        (url, result, error): result is what fetch returned, or None if fetching failed,
+                              in which case error is the exception raised.
+    """
+    from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+    session = session or make_session(max_connections_per_host)
+    urls = iter(urls)
+    with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+        pending = {}
+        # ordered: finished results by position, waiting for the ones before them
+        finished = {}
+        next_position = 0
+        submitted = 0
+
+        def submit_next():
+            nonlocal submitted
+            for url in urls:
+                pending[executor.submit(fetch, url, session, timeout)] = (submitted, url)
+                submitted += 1
+                return True
+            return False
+
+        # keep a bounded number of requests in flight rather than queueing every url up front
+        for _ in range(max_concurrency * 2):
+            if not submit_next():
+                break
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                position, url = pending.pop(future)
+                error = future.exception()
+                result = (url, (None if error else future.result()), error)
+                if not ordered:
+                    yield result
+                else:
+                    finished[position] = result
+                    while next_position in finished:
+                        yield finished.pop(next_position)
+                        next_position += 1
+                submit_next()
+
+def find_recipe(json_data):
+    """
+    Returns the Recipe object in parsed JSON-LD, or None. The JSON-LD can be the recipe itself,
+    a list of objects, or an object with an "@graph" list.
+    """
+    # check if JSON-LD is a list
+    if isinstance(json_data, list):
+        for entry in json_data:
+            # get recipe if in list
+            recipe = find_recipe(entry)
+            if recipe:
+                return recipe
+    elif isinstance(json_data, dict):
+        # otherwise get recipe
+        if "Recipe" in json_data.get("@type", []):
+            return json_data
+        if "@graph" in json_data:
+            return find_recipe(json_data["@graph"])
+    return None
+
+@instrumentation.instrumented("extract_json_ld")
 def extract_json_ld(soup):
     script_tag = soup.find('script', {'type': 'application/ld+json'})
     if script_tag:
         json_data = json.loads(script_tag.string)
-        # check if JSON-LD is a list
-        if isinstance(json_data, list):
-            for entry in json_data:
-                # get recipe if in list
-                if "Recipe" in entry.get("@type", []):
-                    return entry
-        # otherwise get recipe
-        elif "Recipe" in json_data.get("@type", []):
-            return json_data
+        return find_recipe(json_data)
     return None
 
+# opening tag of a JSON-LD script block in raw page bytes
+LD_JSON_OPEN_REGEX = re.compile(rb"<script\b[^>]*?\btype\s*=\s*[\"']?application/ld\+json[\"']?[^>]*>", re.IGNORECASE)
+LD_JSON_CLOSE = b"</script"
+# longest opening tag we expect; only this much of an unmatched buffer tail is rescanned
+MAX_OPEN_TAG = 512
+
+@instrumentation.instrumented("extract_json_ld_from_html")
+def extract_json_ld_from_html(html):
+    """
+    Finds the Recipe JSON-LD in a page without building a DOM.
+
+    The raw page is scanned for <script type="application/ld+json"> blocks and only their
+    contents are parsed. When the page is given as an iterable of byte chunks (e.g. a streamed
+    response), reading stops as soon as a block containing a Recipe has been found. If no
+    block yields a recipe, the page is parsed with BeautifulSoup and extract_json_ld as before.
+
+    Args:
+        html (bytes, str or iterable of bytes): the page, whole or in chunks.
+
+    Returns:
+        json_data: the Recipe JSON-LD object, or None if the page has none.
+    """
+    if isinstance(html, str):
+        html = html.encode("utf-8")
+    chunks = [html] if isinstance(html, (bytes, bytearray)) else html
+    buffer = bytearray()
+    position = 0          # where to look for the next opening tag
+    content_start = None  # start of the block being read, if inside one
+    for chunk in chunks:
+        buffer += chunk
+        while True:
+            if content_start is None:
+                opening = LD_JSON_OPEN_REGEX.search(buffer, position)
+                if opening is None:
+                    position = max(position, len(buffer) - MAX_OPEN_TAG)
+                    break
+                content_start = position = opening.end()
+            end = buffer.find(LD_JSON_CLOSE, position)
+            if end == -1:
+                position = max(position, len(buffer) - len(LD_JSON_CLOSE))
+                break
+            content = bytes(buffer[content_start:end])
+            content_start = None
+            position = end
+            try:
+                recipe = find_recipe(json.loads(content))
+            except ValueError:
+                continue
+            if recipe:
+                return recipe
+    # fast path found nothing: fall back to the DOM
+    from bs4 import BeautifulSoup
+    with instrumentation.timed("html_parse"):
+        soup = BeautifulSoup(bytes(buffer), 'html.parser')
+    return extract_json_ld(soup)
+
+# measurements in parentheses, e.g. "1 (8 ounce) package cream cheese"
+PARENTHESIS_REGEX = re.compile(r"(" + QUANTITY_PATTERN + r")?\s*\((.*?)\)\s*(.*)")
+# name, quantity (mixed, fractional or decimal), and measurement
+MEASUREMENT_REGEX = re.compile(r"(" + QUANTITY_PATTERN + r")?\s*(\b(?:" + "|".join(MEASUREMENTS) + r")\b)?\s*(.*)")
+
+@instrumentation.instrumented("parse_ingredients")
 def parse_ingredients(json_data):
     ingredients = []
     raw_ingredients = []
+    matcher = get_matcher()
     for item in json_data.get("recipeIngredient", []):
         raw_ingredients.append(item.strip())
         quantity = None
@@ -46,8 +333,7 @@ def parse_ingredients(json_data):
             item = item.replace("to taste", "").strip()
             quantity = "to taste"
         # handle measurements in parentheses
-        parenthesis_pattern = r"(\d+/\d+|\d+\.\d+|\d+)?\s*\((.*?)\)\s*(.*)"
-        match_parenthesis = re.match(parenthesis_pattern, item)
+        match_parenthesis = PARENTHESIS_REGEX.match(item)
         if match_parenthesis:
             # extract name, quantity, measurement
             name = match_parenthesis.group(3).strip()
@@ -55,58 +341,63 @@ def parse_ingredients(json_data):
             measurement = match_parenthesis.group(2).strip()
         # regex to extract name, quantity (fractional or decimal), and measurement
         else:
-            pattern = r"(\d+/\d+|\d+\.\d+|\d+)?\s*(\b(?:cup|cups|teaspoon|teaspoons|tbsp|tablespoon|tablespoons|oz|ounce|ounces|pound|pounds|g|grams|kg|kilograms|ml|milliliters|l|liters|handful|pinch|pinches|dash|dashes|slice|slices|clove|cloves|package|packages|piece|pieces|milligrams|tsp|quart|quarts|pint|pints|fluid ounce|fluid ounces|gal|gallon|gallons|dl)\b)?\s*(.*)"
-            match = re.match(pattern, item)
+            match = MEASUREMENT_REGEX.match(item)
             name = match.group(3).strip() if match and match.group(3) else item.strip()
             prev = quantity
             quantity = match.group(1).strip() if match and match.group(1) else prev
             measurement = match.group(2).strip() if match and match.group(2) else None
-        # regex for descriptors and preparation
-        descriptor_pattern = r"\b(fresh|extra-virgin|dehydrated|heirloom|aged|low-fat|reduced-fat|lean|package|packages|packaged|packed|box|boxed|jar|jarred|jars|ripe|can|cans|canned|frozen|organic|large|small|medium|smoked|thick-cut|thinly|boneless|skinless|bone-in)\b"
-        descriptor_match = re.search(descriptor_pattern, name.lower())
-        if descriptor_match:
-            descriptor = descriptor_match.group(0).strip()
+        # descriptors and preparation
+        lowered = name.lower()
+        found = matcher.match(lowered)
+        if found["descriptors"]:
+            descriptor = found["descriptors"][0]
             name = name.replace(descriptor, "").strip()
-        preparation_pattern = r"\b(finely chopped|chopped|shredded|divided|finely shredded|minced|sliced|diced|grated|ground|julienned|peeled|squeezed|dried|roughly chopped|roughly diced|pureed|smashed|zested|beaten|marinated|mashed|sliced thinly|halved|quartered|cut into chunks|brushed|trimmed|cored|cubed|butterflied|crushed)\b"
-        preparation_match = re.search(preparation_pattern, name.lower())
-        if preparation_match:
-            preparation = preparation_match.group(0).strip()
+            # removing the descriptor changes the text the preparation is looked up in
+            if name.lower() != lowered:
+                found = matcher.match(name.lower())
+        if found["preparations"]:
+            preparation = found["preparations"][0]
             name = name.replace(preparation, "").strip()
         # format ingredient
-        ingredient = Ingredient(name, quantity, measurement, descriptor, preparation)
+        # numeric amount and canonical unit, so transforms don't have to parse the display strings
+        amount = parse_amount(quantity)
+        unit = normalize_unit(measurement)
+        ingredient = Ingredient(name, quantity, measurement, descriptor, preparation, amount, unit)
         ingredients.append(ingredient)
+    instrumentation.count("ingredients", len(ingredients))
     return raw_ingredients, ingredients
 
+# Patterns to match durations and conditional phrases
+TIME_PATTERNS = [
+    r"\d+\s*(?:more)?\s*(?:second[s]?|minute[s]?|hour[s]?|sec|min|hr[s]?)",  # Numeric durations with units
+    r"about\s+\d+\s*(?:second[s]?|minute[s]?|hour[s]?)",         # Approximate durations
+    r"for\s+\d+\s*(?:second[s]?|minute[s]?|hour[s]?)"            # 'for X time'
+]
+
+# Patterns to match conditions
+CONDITION_PATTERNS = [
+    r"until\s+[\w\s]+",        # Conditions like 'until golden brown'
+    r"once\s+[\w\s]+",         # Conditions like 'once dissolved'
+    r"when\s+[\w\s]+"          # Conditions like 'when bubbly'
+]
+
+# Compile the patterns once
+TIME_REGEX = re.compile("|".join(TIME_PATTERNS), re.IGNORECASE)
+CONDITION_REGEX = re.compile("|".join(CONDITION_PATTERNS), re.IGNORECASE)
+TIME_PREFIX_REGEX = re.compile(r"^(for|about)\s+", re.IGNORECASE)
+
 # parse time info for a given step
 def parse_time(sentence):   
-    # Patterns to match durations and conditional phrases
-    time_patterns = [
-        r"\d+\s*(?:more)?\s*(?:second[s]?|minute[s]?|hour[s]?|sec|min|hr[s]?)",  # Numeric durations with units
-        r"about\s+\d+\s*(?:second[s]?|minute[s]?|hour[s]?)",         # Approximate durations
-        r"for\s+\d+\s*(?:second[s]?|minute[s]?|hour[s]?)"            # 'for X time'
-    ] 
-
-    # Patterns to match conditions
-    condition_patterns = [
-        r"until\s+[\w\s]+",        # Conditions like 'until golden brown'
-        r"once\s+[\w\s]+",         # Conditions like 'once dissolved'
-        r"when\s+[\w\s]+"          # Conditions like 'when bubbly'
-    ] 
-
-    # Compile the patterns
-    time_regex = re.compile("|".join(time_patterns), re.IGNORECASE)
-    condition_regex = re.compile("|".join(condition_patterns), re.IGNORECASE)
-
     # Find all matches
-    times = time_regex.findall(sentence)
-    conditions = condition_regex.findall(sentence)
+    times = TIME_REGEX.findall(sentence)
+    conditions = CONDITION_REGEX.findall(sentence)
 
     # Extract structured results
         # duration : time value (for 10 minutes)
         # condition : condition value (until brown)
     time_info = {} 
     for time in times:
-        cleaned_time = re.sub(r"^(for|about)\s+", "", time, flags=re.IGNORECASE)
+        cleaned_time = TIME_PREFIX_REGEX.sub("", time)
         time_info['duration'] = cleaned_time.strip()
     if not times: 
         time_info['duration'] = None
@@ -119,54 +410,90 @@ def parse_time(sentence):
 
     return time_info
 
-def parse_steps(json_data, ingredient_names):
+def split_sentences(segments):
+    # further split the segmenter's sentences on semicolons
+    sentences = []
+    for segment in segments:
+        sub_sentences = re.split(r'[;]', segment)
+        sub_sentences = [sub_sentence.strip() for sub_sentence in sub_sentences if sub_sentence.strip()]
+        sentences.extend(sub_sentences)
+    return sentences
+
+# raw text of each instruction step
+def step_texts(json_data):
+    return [step.get("text", "").strip() for step in json_data.get("recipeInstructions", [])]
+
+@instrumentation.instrumented("parse_steps")
+def parse_steps(json_data, ingredient_names, step_sentences=None):
+    matcher = get_matcher()
     steps = []
-    raw_steps = []
-    instructions = json_data.get("recipeInstructions", [])
+    raw_steps = step_texts(json_data)
+    # the segmenter's sentences for each step can be passed in when they were already computed in a batch (see parse_recipes)
+    if step_sentences is None:
+        segmenter = get_segmenter()
+        step_sentences = [segmenter.split(text) for text in raw_steps]
+    # split sentences using the segmenter and regex
+    sentences = []
+    for segments in step_sentences:
+        sentences.extend(sub_text for sub_text in split_sentences(segments) if sub_text)
+    instrumentation.count("steps", len(raw_steps))
+    instrumentation.count("sentences", len(sentences))
+    # handle ingredients, scoring every sentence against every ingredient name at once
+    sentence_ingredients = IngredientMatcher(ingredient_names).match_many(sentences)
     step_counter = 1
-    for step in instructions:
-        text = step.get("text", "").strip()
-        raw_steps.append(text)
-        # split sentences using regex and spacy
-        doc = nlp(text)
-        sentences = []
-        for sent in doc.sents:
-            sub_sentences = re.split(r'[;]', sent.text)
-            sub_sentences = [sub_sentence.strip() for sub_sentence in sub_sentences if sub_sentence.strip()]
-            sentences.extend(sub_sentences)
-        for sub_text in sentences:
-            if not sub_text:
-                continue
-            # regex for tools and methods
-            tools_pattern = r"\b(oven|pot|skillet|baking pan|bowl|plate|aluminum foil|foil|tray|sheet|whisk|spatula|strainer|ladle|colander|saucepan|grater|microplane|peeler|tongs|mortar|pestle|slotted spoon|mandoline|rolling pin|measuring cup|measuring spoon|baster|mixing bowl|blender|pressure cooker|air fryer)\b"
-            tools = list(set(re.findall(tools_pattern, sub_text.lower())))
-            methods_pattern = r"\b(preheat|boil|cook|stir|mix|layer|bake|drain|broil|poach|roast|grill|steam|sear|saute|braise|whisk|knead|caramelize|marinate|simmer|parboil|blanch|whip|fold|beat|blend|pulse|scald|deglaze|fillet|infuse|deep-fry|deep fry|score|smoke)\b"
-            methods = list(set(re.findall(methods_pattern, sub_text.lower())))
-            # handle ingredients
-            ingredients = list(set(filter(lambda ingredient: ingredient.lower() in sub_text.lower(), ingredient_names)))
-            for ingredient in ingredient_names:
-                for word in sub_text.lower().split():
-                    # use Levenshtein to compare word similarity with the ingredient
-                    similarity = Levenshtein.ratio(word, ingredient.lower())
-                    if similarity >= 0.6 and ingredient not in ingredients:
-                        ingredients.append(ingredient)
-                        break
-            # handle time
-            time = parse_time(sub_text)                
-            
-            # create step object and add to list of steps
-            step_obj = Step(step_number=step_counter, text=sub_text, ingredients=ingredients, tools=tools, methods=methods, time=time)
-            steps.append(step_obj)
-            step_counter += 1
+    for sub_text, ingredients in zip(sentences, sentence_ingredients):
+        # tools and methods
+        found = matcher.match(sub_text.lower())
+        tools = list(set(found["tools"]))
+        methods = list(set(found["methods"]))
+        # handle time
+        time = parse_time(sub_text)                
+        
+        # create step object and add to list of steps
+        step_obj = Step(step_number=step_counter, text=sub_text, ingredients=ingredients, tools=tools, methods=methods, time=time)
+        steps.append(step_obj)
+        step_counter += 1
     return raw_steps, steps
 
-def parse_recipe(json_data):
+@instrumentation.instrumented("parse_recipe")
+def parse_recipe(json_data, step_sentences=None):
     title = json_data.get("name", "Unknown Title")
+    instrumentation.count("recipes")
     raw_ingredients, ingredients = parse_ingredients(json_data)
     ingredient_names = [ing.name for ing in ingredients]
-    raw_steps, steps = parse_steps(json_data, ingredient_names)
+    raw_steps, steps = parse_steps(json_data, ingredient_names, step_sentences=step_sentences)
     return Recipe(title=title, raw_ingredients=raw_ingredients, ingredients=ingredients, raw_steps=raw_steps, steps=steps)
 
+def parse_recipes(json_ld_list, batch_size=256, n_process=1):
+    """
+    Parses many recipes at once. Instead of running the segmenter once per instruction step,
+    every step text in the batch is streamed through it (nlp.pipe for the spacy backends) and
+    the resulting sentences are handed back to the recipe they came from. Output is identical
+    to calling parse_recipe on each recipe in turn.
+
+    Args:
+        json_ld_list (iterable of dicts): JSON-LD recipe objects, e.g. from extract_json_ld.
+        batch_size (int): number of step texts spacy processes per batch.
+        n_process (int): number of processes nlp.pipe uses.
+
+    Returns:
+        recipes: List of Recipe objects, in the same order as json_ld_list.
+    """
+    json_ld_list = list(json_ld_list)
+    texts = []
+    counts = []
+    for json_data in json_ld_list:
+        recipe_texts = step_texts(json_data)
+        texts.extend(recipe_texts)
+        counts.append(len(recipe_texts))
+    segmented = get_segmenter().split_many(texts, batch_size=batch_size, n_process=n_process)
+    recipes = []
+    for json_data, count in zip(json_ld_list, counts):
+        recipe_sentences = [next(segmented) for _ in range(count)]
+        recipes.append(parse_recipe(json_data, step_sentences=recipe_sentences))
+    return recipes
+
+@instrumentation.instrumented("recipe_to_json")
 def recipe_to_json(recipe):
     recipe_dict = {
         "title": recipe.title,
@@ -179,7 +506,10 @@ def recipe_to_json(recipe):
                 "quantity": ing.quantity,
                 "measurement": ing.measurement,
                 "descriptor": ing.descriptor,
-                "preparation": ing.preparation
+                "preparation": ing.preparation,
+                # exact amount as [numerator, denominator], see quantities.py
+                "amount": amount_to_json(ing.amount),
+                "unit": ing.unit
             }
             for ing in recipe.ingredients
         ],
@@ -0,0 +1,228 @@
+"""
+Fused transform pipeline.
+
+Each transform is described as a Stage: per-field hooks for ingredient lines, raw steps and
+step dicts, plus {name: replacement} maps for the recipe-level tools and methods. A Plan chains
+the stages of a transform combination and runs them in a single traversal of the recipe dict:
+every field is passed through the whole chain before the next one is visited, so
+"to vegetarian and double" walks the recipe once instead of once per transform. Within a plan,
+tool and method maps are composed into a single dict and consecutive stages that can be folded
+together (e.g. two scalings) are merged.
+
+Substitution tables are chained per string rather than merged, since a single longest-match pass
+over two tables doesn't give the same result as running them one after the other.
+
+Stages that need the whole recipe at once (italian aggregates its ingredient list) are barriers:
+the plan runs the fused segment before them, the barrier, then the next segment. The output of a
+plan matches applying its transforms one after another.
+
+Plans never modify their input. The recipe is frozen (see frozen.py) on the way in, and the result
+is a new frozen recipe that shares every ingredient, step and list the plan didn't change.
+"""
+import instrumentation
+from frozen import evolve, freeze, share
+
+def clean(text):
+    # the key the transform modules look tool and method names up by
+    return text.lower().strip().rstrip(',.')
+
+def compose_mappings(first, second):
+    """
+    Composes two {cleaned name: replacement} maps into one that gives the same result as looking
+    a name up in first, then looking the result up in second.
+
+    Args:
+        first (dict or None): map applied first.
+        second (dict or None): map applied second.
+    Returns:
+        composed (dict or None): combined map, or None if neither map is set.
+    """
+    if not first:
+        return second
+    if not second:
+        return first
+    composed = {key: second.get(clean(value), value) for key, value in first.items()}
+    for key, value in second.items():
+        composed.setdefault(key, value)
+    return composed
+
+class Stage:
+    """
+    One transform, split into per-field hooks. Subclasses override the hooks they need; a plan
+    never calls hooks that a stage leaves at their default.
+
+    Attributes:
+        barrier (bool): the stage transforms the whole recipe in apply and can't be fused.
+        tool_mapping (dict or None): {cleaned tool: replacement} for the recipe's tool list.
+        method_mapping (dict or None): {cleaned method: replacement} for the recipe's method list.
+    """
+    barrier = False
+    tool_mapping = None
+    method_mapping = None
+
+    def start(self):
+        """
+        Returns the object whose hooks are used for one recipe. Stages that collect state while
+        traversing a recipe (e.g. which ingredients were substituted) return a fresh copy.
+        """
+        return self
+
+    def merge(self, other):
+        """
+        Returns a single stage equivalent to self followed by other, or None if they can't be folded.
+        """
+        return None
+
+    def raw_ingredient(self, text):
+        return text
+
+    def ingredient(self, ingredient):
+        return ingredient
+
+    def ingredient_line(self, ingredient, raw_line):
+        """
+        Transforms the i-th ingredient dict and raw ingredient line together; either may be None
+        when the two lists differ in length. Stages that relate the two override this.
+        """
+        if raw_line is not None:
+            raw_line = self.raw_ingredient(raw_line)
+        if ingredient is not None:
+            ingredient = self.ingredient(ingredient)
+        return ingredient, raw_line
+
+    def raw_step(self, text):
+        return text
+
+    def step(self, step):
+        """
+        Transforms a step dict. The dict (and its "time" dict) is a private, mutable copy of the
+        frozen step and may be updated in place; unchanged fields are shared again afterwards.
+        """
+        return step
+
+    def apply(self, recipe):
+        """
+        Transforms the whole (frozen) recipe and returns the result; only called for barrier stages.
+        """
+        raise NotImplementedError
+
+def overrides(stage, *hooks):
+    return any(getattr(type(stage), hook) is not getattr(Stage, hook) for hook in hooks)
+
+class FusedSegment:
+    """
+    A run of non-barrier stages applied in one traversal of the recipe.
+    """
+    def __init__(self, stages):
+        self.stages = stages
+        self.ingredient_stages = [i for i, stage in enumerate(stages) if overrides(stage, "raw_ingredient", "ingredient", "ingredient_line")]
+        self.raw_step_stages = [i for i, stage in enumerate(stages) if overrides(stage, "raw_step")]
+        self.step_stages = [i for i, stage in enumerate(stages) if overrides(stage, "step")]
+        self.tool_mapping = None
+        self.method_mapping = None
+        for stage in stages:
+            self.tool_mapping = compose_mappings(self.tool_mapping, stage.tool_mapping)
+            self.method_mapping = compose_mappings(self.method_mapping, stage.method_mapping)
+
+    def run(self, recipe):
+        runs = [stage.start() for stage in self.stages]
+        transformed = dict(recipe)
+
+        # ingredients first: stages may use what they saw here when rewriting steps
+        if self.ingredient_stages:
+            hooks = [runs[i].ingredient_line for i in self.ingredient_stages]
+            original_ingredients = recipe["ingredients"]
+            original_raw_ingredients = recipe["raw_ingredients"]
+            ingredients = list(original_ingredients)
+            raw_ingredients = list(original_raw_ingredients)
+            for i in range(max(len(ingredients), len(raw_ingredients))):
+                ingredient = ingredients[i] if i < len(ingredients) else None
+                raw_line = raw_ingredients[i] if i < len(raw_ingredients) else None
+                for hook in hooks:
+                    ingredient, raw_line = hook(ingredient, raw_line)
+                if ingredient is not None:
+                    ingredients[i] = evolve(original_ingredients[i], ingredient)
+                if raw_line is not None:
+                    raw_ingredients[i] = raw_line
+            transformed["ingredients"] = share(ingredients, original_ingredients)
+            transformed["raw_ingredients"] = share(raw_ingredients, original_raw_ingredients)
+
+        if self.tool_mapping:
+            tools = [self.tool_mapping.get(clean(tool), tool) for tool in recipe["tools"]]
+            transformed["tools"] = share(tools, recipe["tools"])
+        if self.method_mapping:
+            methods = [self.method_mapping.get(clean(method), method) for method in recipe["methods"]]
+            transformed["methods"] = share(methods, recipe["methods"])
+
+        if self.raw_step_stages:
+            hooks = [runs[i].raw_step for i in self.raw_step_stages]
+            raw_steps = []
+            for text in recipe["raw_steps"]:
+                for hook in hooks:
+                    text = hook(text)
+                raw_steps.append(text)
+            transformed["raw_steps"] = share(raw_steps, recipe["raw_steps"])
+
+        if self.step_stages:
+            hooks = [runs[i].step for i in self.step_stages]
+            steps = []
+            for original in recipe["steps"]:
+                step = dict(original)
+                if isinstance(step.get("time"), dict):
+                    step["time"] = dict(step["time"])
+                for hook in hooks:
+                    step = hook(step)
+                steps.append(evolve(original, step))
+            transformed["steps"] = share(steps, recipe["steps"])
+
+        return evolve(recipe, transformed)
+
+class Plan:
+    """
+    A compiled transform combination.
+
+    Args:
+        stages (list of Stage): transforms in the order they should be applied.
+        names (list of str): the transforms' names, used to label the plan's segments in
+                             instrumentation; the stage class names by default.
+    """
+    def __init__(self, stages, names=None):
+        names = list(names) if names is not None else [type(stage).__name__ for stage in stages]
+        merged = []
+        for stage, name in zip(stages, names):
+            folded = merged[-1][0].merge(stage) if merged and not merged[-1][0].barrier and not stage.barrier else None
+            if folded is not None:
+                merged[-1] = (folded, merged[-1][1] + [name])
+            else:
+                merged.append((stage, [name]))
+
+        self.segments = []
+        self.labels = []
+        run = []
+        run_names = []
+        for stage, stage_names in merged:
+            if stage.barrier:
+                if run:
+                    self.segments.append(FusedSegment(run))
+                    self.labels.append("transform:" + "+".join(run_names))
+                    run = []
+                    run_names = []
+                self.segments.append(stage)
+                self.labels.append("transform:" + "+".join(stage_names))
+            else:
+                run.append(stage)
+                run_names.extend(stage_names)
+        if run:
+            self.segments.append(FusedSegment(run))
+            self.labels.append("transform:" + "+".join(run_names))
+
+    def run(self, recipe):
+        """
+        Applies the plan to a recipe in recipe_to_json form and returns the transformed recipe as
+        a frozen structure (see frozen.py) that shares everything the plan didn't change with the input.
+        """
+        recipe = freeze(recipe)
+        for segment, label in zip(self.segments, self.labels):
+            with instrumentation.timed(label):
+                recipe = evolve(recipe, segment.apply(recipe)) if isinstance(segment, Stage) else segment.run(recipe)
+        return recipe
@@ -0,0 +1,99 @@
+"""
+Numeric quantities and canonical units for ingredients.
+
+parse.parse_ingredients keeps the quantity as it was written ("1 1/2", "½", "to taste") for
+display, and next to it stores the amount as an exact Fraction and the measurement as a canonical
+unit name, so transforms can do arithmetic without parsing the display string again. In the JSON
+form of a recipe an amount is a [numerator, denominator] pair (see amount_to_json).
+"""
+import re
+from fractions import Fraction
+
+UNICODE_FRACTIONS = {
+    "½": Fraction(1, 2), "⅓": Fraction(1, 3), "⅔": Fraction(2, 3), "¼": Fraction(1, 4), "¾": Fraction(3, 4),
+    "⅕": Fraction(1, 5), "⅖": Fraction(2, 5), "⅗": Fraction(3, 5), "⅘": Fraction(4, 5), "⅙": Fraction(1, 6),
+    "⅚": Fraction(5, 6), "⅐": Fraction(1, 7), "⅛": Fraction(1, 8), "⅜": Fraction(3, 8), "⅝": Fraction(5, 8),
+    "⅞": Fraction(7, 8), "⅑": Fraction(1, 9), "⅒": Fraction(1, 10),
+}
+
+_VULGAR = "".join(UNICODE_FRACTIONS)
+
+# a written quantity: mixed numbers ("1 1/2", "1 ½", "1½"), fractions, decimals and integers
+QUANTITY_PATTERN = (
+    rf"\d+\s+\d+/\d+|\d+\s*[{_VULGAR}]|[{_VULGAR}]|\d+/\d+|\d+\.\d+|\d+"
+)
+QUANTITY_REGEX = re.compile(
+    # the whole number of a mixed number needs a space before "1/2", but not before "½"
+    rf"(?:(?P<whole>\d+)\s+)?(?P<numerator>\d+)/(?P<denominator>\d+)"
+    rf"|(?:(?P<vulgar_whole>\d+)\s*)?(?P<vulgar>[{_VULGAR}])"
+    rf"|(?P<decimal>\d+\.\d+|\d+)"
+)
+
+# canonical unit for each way a measurement is written
+UNITS = {
+    "cup": "cup", "cups": "cup",
+    "teaspoon": "teaspoon", "teaspoons": "teaspoon", "tsp": "teaspoon",
+    "tablespoon": "tablespoon", "tablespoons": "tablespoon", "tbsp": "tablespoon",
+    "oz": "ounce", "ounce": "ounce", "ounces": "ounce",
+    "fluid ounce": "fluid ounce", "fluid ounces": "fluid ounce",
+    "pound": "pound", "pounds": "pound",
+    "g": "gram", "grams": "gram", "kg": "kilogram", "kilograms": "kilogram", "milligrams": "milligram",
+    "ml": "milliliter", "milliliters": "milliliter", "dl": "deciliter", "l": "liter", "liters": "liter",
+    "quart": "quart", "quarts": "quart", "pint": "pint", "pints": "pint",
+    "gal": "gallon", "gallon": "gallon", "gallons": "gallon",
+    "handful": "handful", "pinch": "pinch", "pinches": "pinch", "dash": "dash", "dashes": "dash",
+    "slice": "slice", "slices": "slice", "clove": "clove", "cloves": "clove",
+    "package": "package", "packages": "package", "piece": "piece", "pieces": "piece",
+}
+
+def parse_amount(quantity):
+    """
+    Returns the exact amount of a written quantity as a Fraction, or None if it isn't a number
+    (e.g. "to taste").
+    """
+    if not quantity:
+        return None
+    match = QUANTITY_REGEX.fullmatch(quantity.strip())
+    if not match:
+        return None
+    if match.group("decimal"):
+        return Fraction(match.group("decimal"))
+    if match.group("vulgar"):
+        amount = UNICODE_FRACTIONS[match.group("vulgar")]
+    else:
+        denominator = int(match.group("denominator"))
+        if denominator == 0:
+            return None
+        amount = Fraction(int(match.group("numerator")), denominator)
+    whole = match.group("whole") or match.group("vulgar_whole")
+    if whole:
+        amount += int(whole)
+    return amount
+
+def format_amount(amount):
+    """
+    Formats an amount the way recipes write it: "3", "1/2", "1 1/2". Amounts that don't come out
+    to a fraction with a small denominator are written as decimals ("0.33").
+    """
+    if amount.denominator == 1:
+        return str(amount.numerator)
+    if amount.denominator > 16:
+        return f"{float(amount):.2f}".rstrip("0").rstrip(".")
+    whole, remainder = divmod(amount.numerator, amount.denominator)
+    fraction = f"{remainder}/{amount.denominator}"
+    return f"{whole} {fraction}" if whole else fraction
+
+def normalize_unit(measurement):
+    """
+    Returns the canonical unit for a measurement ("Tbsp" -> "tablespoon"), or None if the
+    measurement isn't a known unit.
+    """
+    if not measurement:
+        return None
+    return UNITS.get(measurement.strip().lower())
+
+def amount_to_json(amount):
+    return [amount.numerator, amount.denominator] if amount is not None else None
+
+def amount_from_json(value):
+    return Fraction(value[0], value[1]) if value is not None else None
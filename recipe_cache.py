@@ -0,0 +1,266 @@
+"""
+Cache of parsed recipes, in front of parse.parse_recipe.
+
+A parsed recipe only depends on its JSON-LD, the parser code, the segmentation backend and the
+spaCy model, so the cache key is a hash of the canonicalized JSON-LD (keys sorted, no whitespace)
+together with parse.PARSER_VERSION, the backend name and the installed model version. The
+versions are read on every lookup, so configuring another segmenter (or bumping the parser
+version) gives new keys from then on.
+
+There are two tiers: an in-memory LRU of Recipe objects, and a directory of pickled recipes
+shared by every process that points at it. Each file records the entry format and versions it
+was written under and is ignored if they don't match. Files older than max_age are dropped when
+read, and once the directory grows past max_bytes the least recently used files are deleted.
+Recipes returned from the cache may be the same object handed to an earlier caller, so treat
+them as read-only.
+"""
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+import parse
+
+DEFAULT_MAX_ENTRIES = 1024
+DEFAULT_MAX_AGE = 30 * 24 * 60 * 60       # seconds before a file in the disk tier is dropped
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024     # total size of the disk tier before LRU eviction
+# eviction deletes files until the disk tier is this fraction of max_bytes, so a full cache
+# isn't rescanned on every write
+EVICT_TO = 0.9
+# bump when the layout of a disk tier file changes
+ENTRY_FORMAT = 1
+
+def model_version():
+    """
+    Returns the installed version of the spaCy model package, without loading the model.
+    """
+    from importlib import metadata
+    try:
+        return metadata.version(parse.MODEL_NAME)
+    except metadata.PackageNotFoundError:
+        return "unknown"
+
+def recipe_key(json_data, versions):
+    """
+    Returns a stable hex digest for a JSON-LD recipe under the given version string.
+    """
+    canonical = json.dumps(json_data, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(f"{versions}\0{canonical}".encode("utf-8")).hexdigest()
+
+class RecipeCache:
+    """
+    Args:
+        directory (string): where the on-disk tier keeps pickled recipes, or None for memory only.
+        max_entries (int): number of recipes kept in the in-memory tier.
+        max_age (float): seconds a file in the on-disk tier is used for.
+        max_bytes (int): size the on-disk tier is kept under.
+    """
+    def __init__(self, directory=None, max_entries=DEFAULT_MAX_ENTRIES, max_age=DEFAULT_MAX_AGE,
+                 max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self.max_bytes = max_bytes
+        self._model = f"{parse.MODEL_NAME}-{model_version()}"
+        # size of the disk tier, counted the first time something is written
+        self._disk_bytes = None
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    @property
+    def versions(self):
+        # the installed model can't change under a running process, the segmenter can
+        return f"parser={parse.PARSER_VERSION};segmenter={parse.get_segmenter().name};model={self._model}"
+
+    def key(self, json_data):
+        return recipe_key(json_data, self.versions)
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key + ".pickle")
+
+    def get(self, key):
+        """
+        Returns the cached Recipe for a key, or None. Disk hits are promoted to memory.
+        """
+        with self._lock:
+            recipe = self._memory.get(key)
+            if recipe is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return recipe
+        if self.directory:
+            recipe = self._load(key)
+            if recipe is not None:
+                with self._lock:
+                    self.disk_hits += 1
+                self._remember(key, recipe)
+                return recipe
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def _load(self, key):
+        # the recipe in a disk tier file, or None if there is none or it is expired or unusable
+        path = self._path(key)
+        try:
+            if time.time() - os.path.getmtime(path) > self.max_age:
+                self._discard(path)
+                return None
+            with open(path, "rb") as file:
+                entry = pickle.load(file)
+        except FileNotFoundError:
+            return None
+        except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError):
+            # written by an incompatible version of the code
+            entry = None
+        if not (isinstance(entry, tuple) and len(entry) == 3 and entry[:2] == (ENTRY_FORMAT, self.versions)):
+            self._discard(path)
+            return None
+        try:
+            # mark it recently used for eviction
+            os.utime(path)
+        except OSError:
+            pass
+        return entry[2]
+
+    def _discard(self, path):
+        try:
+            size = os.path.getsize(path)
+            os.unlink(path)
+        except OSError:
+            return  # already gone, maybe removed by another process
+        with self._lock:
+            if self._disk_bytes is not None:
+                self._disk_bytes -= size
+
+    def put(self, key, recipe):
+        self._remember(key, recipe)
+        if self.directory:
+            path = self._path(key)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # write to a temporary file and rename, so readers in other processes never see a partial file
+            descriptor, temporary = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+            try:
+                with os.fdopen(descriptor, "wb") as file:
+                    pickle.dump((ENTRY_FORMAT, self.versions, recipe), file, protocol=pickle.HIGHEST_PROTOCOL)
+                    size = file.tell()
+                os.replace(temporary, path)
+            except BaseException:
+                os.unlink(temporary)
+                raise
+            with self._lock:
+                if self._disk_bytes is None:
+                    self._disk_bytes = sum(size for _, size, _ in self._disk_files())
+                else:
+                    self._disk_bytes += size
+                full = self._disk_bytes > self.max_bytes
+            if full:
+                self._evict()
+
+    def _disk_files(self):
+        # (path, size, last used) for every file in the disk tier
+        files = []
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                if name.endswith(".pickle"):
+                    path = os.path.join(root, name)
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+                    files.append((path, stat.st_size, stat.st_mtime))
+        return files
+
+    def _evict(self):
+        # delete least recently used files until the disk tier is under EVICT_TO * max_bytes;
+        # the total is recounted, as other processes may share the directory
+        files = sorted(self._disk_files(), key=lambda file: file[2])
+        total = sum(size for _, size, _ in files)
+        for path, size, _ in files:
+            if total <= EVICT_TO * self.max_bytes:
+                break
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+            total -= size
+        with self._lock:
+            self._disk_bytes = total
+
+    def _remember(self, key, recipe):
+        with self._lock:
+            self._memory[key] = recipe
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    def parse_recipe(self, json_data):
+        """
+        Cached version of parse.parse_recipe.
+        """
+        key = self.key(json_data)
+        recipe = self.get(key)
+        if recipe is None:
+            recipe = parse.parse_recipe(json_data)
+            self.put(key, recipe)
+        return recipe
+
+    def parse_recipes(self, json_ld_list, **pipe_options):
+        """
+        Cached version of parse.parse_recipes: only the recipes missing from the cache are parsed,
+        together in one batch.
+        """
+        json_ld_list = list(json_ld_list)
+        keys = [self.key(json_data) for json_data in json_ld_list]
+        recipes = [self.get(key) for key in keys]
+        missing = [i for i, recipe in enumerate(recipes) if recipe is None]
+        if missing:
+            parsed = parse.parse_recipes([json_ld_list[i] for i in missing], **pipe_options)
+            for i, recipe in zip(missing, parsed):
+                self.put(keys[i], recipe)
+                recipes[i] = recipe
+        return recipes
+
+    def recipe_json(self, json_data):
+        """
+        Cached version of parse.recipe_to_json(parse.parse_recipe(json_data)).
+        """
+        return parse.recipe_to_json(self.parse_recipe(json_data))
+
+    def stats(self):
+        """
+        Returns the hit/miss counters.
+        """
+        with self._lock:
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "memory_entries": len(self._memory),
+            }
+
+_recipe_cache = None
+
+def get_recipe_cache():
+    """
+    Returns the default RecipeCache, stored under parse.CACHE_DIR/recipes.
+    """
+    global _recipe_cache
+    if _recipe_cache is None:
+        _recipe_cache = RecipeCache(os.path.join(parse.CACHE_DIR, "recipes"))
+    return _recipe_cache
+
+def cached_parse_recipe(json_data):
+    return get_recipe_cache().parse_recipe(json_data)
+
+def cached_recipe_json(json_data):
+    return get_recipe_cache().recipe_json(json_data)
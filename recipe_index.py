@@ -0,0 +1,377 @@
+"""
+Inverted index over a parsed recipe corpus by ingredient, tool and method.
+
+Every recipe added to a RecipeIndex gets the next document id (0, 1, 2, ...) and is filed under
+its terms, written "field:text" with field one of ingredient, tool or method and text lowercased
+with runs of whitespace collapsed, e.g. "ingredient:pork shoulder" or "tool:dutch oven". Each
+term's postings are the sorted ids of the recipes that have it, held as a uint32 NumPy array, so
+AND and OR queries are array intersections and unions; intersections start from the shortest list
+and switch to a binary search of the longer list when the two differ a lot in length. New recipes
+always get larger ids than every stored one, so adding one only appends to its terms' postings.
+
+On disk the postings are delta-encoded as varints (a recipe id usually costs one or two bytes):
+
+    header        b"RIDX", u16 format version, u16 reserved, u32 number of recipes
+    keys          string table (see serialization.py), one key per recipe, in id order
+    terms         string table of the terms
+    directory     u32 count, then per term u32 number of postings and u32 encoded byte length
+    postings      the encoded postings of every term, back to back
+
+A loaded index decodes a term's postings the first time a query uses it, and more recipes can be
+added to it and saved again.
+
+Usage:
+    python recipe_index.py add INDEX [FILE]    index the recipes of main.py --ndjson output (or stdin)
+    python recipe_index.py query INDEX TERM... [--any] [--limit N]
+    python recipe_index.py terms INDEX [--field tool] [--contains oven]
+"""
+import argparse
+import json
+import os
+import struct
+import sys
+import tempfile
+from array import array
+
+import numpy as np
+
+from representation import Recipe
+from serialization import COUNT, decode_strings, encode_strings
+
+MAGIC = b"RIDX"
+FORMAT_VERSION = 1
+HEADER = struct.Struct("<4sHHI")
+FIELDS = ("ingredient", "tool", "method")
+# intersect by binary search once one list is this many times longer than the other
+GALLOP_RATIO = 16
+
+EMPTY = np.empty(0, dtype=np.uint32)
+
+def normalize(text):
+    # lowercase, trailing punctuation dropped, runs of whitespace collapsed
+    return " ".join(text.lower().split()).strip(",.")
+
+def make_term(field, text):
+    """
+    Returns the index term for a field and a name, e.g. ("tool", "Dutch  oven") -> "tool:dutch oven".
+    """
+    if field not in FIELDS:
+        raise ValueError(f"Unknown field {field!r}; choose from {', '.join(FIELDS)}")
+    return f"{field}:{normalize(text)}"
+
+def parse_term(term):
+    """
+    Normalizes a term written as "field:text", e.g. "Ingredient:Pork Shoulder".
+    """
+    field, separator, text = term.partition(":")
+    if not separator:
+        raise ValueError(f"Terms are written field:text, e.g. tool:dutch oven; got {term!r}")
+    return make_term(field.strip().lower(), text)
+
+def recipe_terms(recipe):
+    """
+    Returns the set of terms of a parsed recipe.
+
+    Args:
+        recipe (Recipe or dict): a Recipe, or the dict recipe_to_json makes of one.
+    """
+    if isinstance(recipe, Recipe):
+        names = {
+            "ingredient": [ingredient.name for ingredient in recipe.ingredients],
+            "tool": [tool for step in recipe.steps for tool in step.tools],
+            "method": [method for step in recipe.steps for method in step.methods],
+        }
+    else:
+        steps = recipe.get("steps") or []
+        names = {
+            "ingredient": [ingredient["name"] for ingredient in recipe.get("ingredients") or []],
+            "tool": list(recipe.get("tools") or []) + [tool for step in steps for tool in step["tools"] or []],
+            "method": list(recipe.get("methods") or []) + [method for step in steps for method in step["methods"] or []],
+        }
+    return {make_term(field, name) for field, values in names.items() for name in values if name and normalize(name)}
+
+def encode_postings(ids):
+    """
+    Delta-encodes sorted recipe ids as little-endian base-128 varints.
+    """
+    values = np.array(ids, dtype=np.uint64)
+    if not len(values):
+        return b""
+    values[1:] = np.diff(values)
+    lengths = np.ones(len(values), dtype=np.int64)
+    for bits in (7, 14, 21, 28):
+        lengths += values >= (1 << bits)
+    starts = np.cumsum(lengths) - lengths
+    encoded = np.empty(int(lengths.sum()), dtype=np.uint8)
+    for byte in range(5):
+        rows = lengths > byte
+        if not rows.any():
+            break
+        chunk = (values[rows] >> np.uint64(7 * byte)) & np.uint64(0x7F)
+        more = (lengths[rows] > byte + 1).astype(np.uint64) << np.uint64(7)
+        encoded[starts[rows] + byte] = chunk | more
+    return encoded.tobytes()
+
+def decode_postings(data, count):
+    """
+    Decodes count recipe ids written by encode_postings; returns a uint32 array.
+    """
+    if not count:
+        return EMPTY
+    data = np.frombuffer(data, dtype=np.uint8)
+    # the last byte of every varint has its high bit clear
+    ends = np.flatnonzero(data < 0x80)
+    if len(ends) != count or ends[-1] != len(data) - 1:
+        raise ValueError("Corrupt postings list.")
+    starts = np.empty_like(ends)
+    starts[0] = 0
+    starts[1:] = ends[:-1] + 1
+    positions = np.arange(len(data)) - np.repeat(starts, ends - starts + 1)
+    parts = (data & 0x7F).astype(np.uint64) << (7 * positions).astype(np.uint64)
+    return np.cumsum(np.add.reduceat(parts, starts)).astype(np.uint32)
+
+def intersect(*postings):
+    """
+    Returns the ids in every one of the sorted id arrays.
+    """
+    if not postings:
+        return EMPTY
+    postings = sorted(postings, key=len)
+    result = postings[0]
+    for other in postings[1:]:
+        if not len(result):
+            break
+        if len(other) > GALLOP_RATIO * len(result):
+            # few candidates left: look each one up in the long list instead of merging both
+            positions = np.searchsorted(other, result)
+            found = positions < len(other)
+            result = result[found][other[positions[found]] == result[found]]
+        else:
+            result = np.intersect1d(result, other, assume_unique=True)
+    return result
+
+def union(*postings):
+    """
+    Returns the ids in any of the sorted id arrays, sorted.
+    """
+    postings = [ids for ids in postings if len(ids)]
+    if len(postings) < 2:
+        return postings[0] if postings else EMPTY
+    return np.unique(np.concatenate(postings))
+
+class RecipeIndex:
+    """
+    Inverted index from ingredient, tool and method terms to recipe ids.
+
+    Attributes:
+        keys (list): a key per recipe id (by default its title) to find the recipe again.
+    """
+    def __init__(self):
+        self.keys = []
+        # term -> (count, encoded bytes) read from disk and not decoded yet
+        self._encoded = {}
+        # term -> uint32 array of ids
+        self._postings = {}
+        # term -> array("I") of ids added since the term's postings were last merged
+        self._added = {}
+
+    def __len__(self):
+        return len(self.keys)
+
+    def add(self, recipe, key=None):
+        """
+        Adds a parsed recipe (a Recipe or a recipe_to_json dict) to the index.
+
+        Args:
+            recipe (Recipe or dict): the recipe.
+            key (str): key to store for it; defaults to its title.
+
+        Returns:
+            int: the recipe's id.
+        """
+        recipe_id = len(self.keys)
+        if key is None:
+            key = recipe.title if isinstance(recipe, Recipe) else recipe.get("title")
+        self.keys.append(key or "")
+        for term in recipe_terms(recipe):
+            added = self._added.get(term)
+            if added is None:
+                added = self._added[term] = array("I")
+            added.append(recipe_id)
+        return recipe_id
+
+    def add_many(self, recipes):
+        """
+        Adds recipes in order; returns the id of the first one.
+        """
+        first = len(self.keys)
+        for recipe in recipes:
+            self.add(recipe)
+        return first
+
+    def postings(self, term):
+        """
+        Returns the sorted ids of the recipes that have a term ("field:text", normalized).
+        """
+        ids = self._postings.get(term)
+        if ids is None:
+            encoded = self._encoded.pop(term, None)
+            ids = decode_postings(encoded[1], encoded[0]) if encoded else EMPTY
+        added = self._added.pop(term, None)
+        if added:
+            ids = np.concatenate([ids, np.frombuffer(added, dtype=np.uint32)])
+        if len(ids):
+            self._postings[term] = ids
+        return ids
+
+    def all_of(self, *terms):
+        """
+        Returns the ids of the recipes that have every term, e.g.
+        index.all_of("ingredient:pork shoulder", "tool:dutch oven").
+        """
+        return intersect(*(self.postings(parse_term(term)) for term in terms))
+
+    def any_of(self, *terms):
+        """
+        Returns the ids of the recipes that have at least one of the terms.
+        """
+        return union(*(self.postings(parse_term(term)) for term in terms))
+
+    def query(self, all_of=(), any_of=()):
+        """
+        Returns the ids of the recipes that have every term in all_of and, if any_of is given, at
+        least one term in any_of.
+        """
+        if not all_of and not any_of:
+            return EMPTY
+        groups = [self.postings(parse_term(term)) for term in all_of]
+        if any_of:
+            groups.append(self.any_of(*any_of))
+        return intersect(*groups)
+
+    def terms(self, field=None, contains=None):
+        """
+        Returns the sorted terms of the index, optionally only those of one field or whose text
+        contains a substring (e.g. every ingredient containing "pork shoulder").
+        """
+        terms = set(self._encoded) | set(self._postings) | set(self._added)
+        prefix = f"{field}:" if field else ""
+        contains = normalize(contains) if contains else None
+        return sorted(term for term in terms if term.startswith(prefix)
+                      and (contains is None or contains in term.partition(":")[2]))
+
+    def to_bytes(self):
+        terms = self.terms()
+        directory = array("I")
+        blobs = []
+        for term in terms:
+            encoded = self._encoded.get(term)
+            if encoded is not None and term not in self._added:
+                count, blob = encoded
+            else:
+                ids = self.postings(term)
+                count, blob = len(ids), encode_postings(ids)
+            directory.extend((count, len(blob)))
+            blobs.append(blob)
+        directory = np.frombuffer(directory, dtype=np.uint32).astype("<u4")
+        return (HEADER.pack(MAGIC, FORMAT_VERSION, 0, len(self.keys)) + encode_strings(self.keys)
+                + encode_strings(terms) + COUNT.pack(len(terms)) + directory.tobytes() + b"".join(blobs))
+
+    @classmethod
+    def from_bytes(cls, data):
+        magic, version, _, recipe_count = HEADER.unpack_from(data, 0)
+        if magic != MAGIC:
+            raise ValueError("Not a recipe index.")
+        if version > FORMAT_VERSION:
+            raise ValueError(f"Recipe index uses format version {version}, newer than supported ({FORMAT_VERSION}).")
+        # postings stay views into data until a query decodes them
+        data = memoryview(data)
+        index = cls()
+        keys, offset = decode_strings(data, HEADER.size)
+        terms, offset = decode_strings(data, offset)
+        index.keys = keys[1:]
+        if len(index.keys) != recipe_count:
+            raise ValueError("Corrupt recipe index: wrong number of keys.")
+        (count,) = COUNT.unpack_from(data, offset)
+        offset += COUNT.size
+        directory = np.frombuffer(data, dtype="<u4", count=2 * count, offset=offset).reshape(count, 2)
+        offset += directory.nbytes
+        for term, (postings_count, length) in zip(terms[1:], directory.tolist()):
+            index._encoded[term] = (postings_count, data[offset:offset + length])
+            offset += length
+        return index
+
+    def save(self, path):
+        """
+        Writes the index to path, replacing it atomically.
+        """
+        data = self.to_bytes()
+        # write to a temporary file and rename, so readers never see a partial index
+        descriptor, temporary = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix=".tmp")
+        try:
+            with os.fdopen(descriptor, "wb") as file:
+                file.write(data)
+            os.replace(temporary, path)
+        except BaseException:
+            os.unlink(temporary)
+            raise
+
+    @classmethod
+    def load(cls, path):
+        """
+        Reads an index written by save.
+        """
+        with open(path, "rb") as file:
+            return cls.from_bytes(file.read())
+
+def read_recipes(lines):
+    # recipes from main.py --ndjson records ({"line": ..., "recipe": {...}}) or bare recipe dicts
+    for line in lines:
+        if not line.strip():
+            continue
+        record = json.loads(line)
+        if "error" in record:
+            continue
+        yield record.get("recipe", record)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    add = commands.add_parser("add", help="add recipes to an index, creating it if needed")
+    add.add_argument("index")
+    add.add_argument("file", nargs="?", help="NDJSON file from main.py --ndjson (default: stdin)")
+    query = commands.add_parser("query", help="list the recipes that have every term")
+    query.add_argument("index")
+    query.add_argument("terms", nargs="+", help='terms like "ingredient:pork shoulder" "tool:dutch oven"')
+    query.add_argument("--any", action="store_true", help="recipes with any of the terms instead")
+    query.add_argument("--limit", type=int, default=20, help="recipes to print (0 for all)")
+    terms = commands.add_parser("terms", help="list the terms of an index")
+    terms.add_argument("index")
+    terms.add_argument("--field", choices=FIELDS)
+    terms.add_argument("--contains", help="only terms containing this text")
+    args = parser.parse_args()
+
+    if args.command == "add":
+        index = RecipeIndex.load(args.index) if os.path.exists(args.index) else RecipeIndex()
+        before = len(index)
+        with open(args.file) if args.file else sys.stdin as file:
+            index.add_many(read_recipes(file))
+        index.save(args.index)
+        print(f"added {len(index) - before} recipes, {len(index)} in {args.index}", file=sys.stderr)
+        return
+
+    index = RecipeIndex.load(args.index)
+    if args.command == "terms":
+        for term in index.terms(args.field, args.contains):
+            print(f"{term}\t{len(index.postings(term))}")
+        return
+    try:
+        ids = index.any_of(*args.terms) if args.any else index.all_of(*args.terms)
+    except ValueError as e:
+        parser.error(str(e))
+    for recipe_id in ids[:args.limit or None].tolist():
+        print(f"{recipe_id}\t{index.keys[recipe_id]}")
+    print(f"{len(ids)} of {len(index)} recipes", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,16 @@
+import sys
+
+# Parsed recipes are kept in memory by the hundreds of thousands, so these classes use
+# __slots__ instead of a per-object __dict__, and the strings that repeat across recipes
+# (ingredient names, measurements, descriptors, preparations, tools, methods) are interned
+# so every "salt" or "oven" in the corpus is the same string object.
+
+def intern(value):
+    return sys.intern(value) if type(value) is str else value
+
+def intern_all(values):
+    return [intern(value) for value in values] if values else []
+
 class Ingredient:
     """
     Ingredients 
@@ -6,27 +19,37 @@ class Ingredient:
         Measurement (cup, teaspoon, pinch, etc.)
         (optional) Descriptor (e.g. fresh, extra-virgin)
         (optional) Preparation (e.g. finely chopped)
+        (optional) Amount – the quantity as an exact Fraction (1 1/2 -> Fraction(3, 2))
+        (optional) Unit – the measurement's canonical unit (tbsp -> tablespoon)
     """
-    def __init__(self, name, quantity=None, measurement=None, descriptor=None, preparation=None):
-        self.name = name
-        self.quantity = quantity
-        self.measurement = measurement
-        self.descriptor = descriptor
-        self.preparation = preparation
+    __slots__ = ("name", "quantity", "measurement", "descriptor", "preparation", "amount", "unit")
+
+    def __init__(self, name, quantity=None, measurement=None, descriptor=None, preparation=None, amount=None, unit=None):
+        self.name = intern(name)
+        self.quantity = intern(quantity)
+        self.measurement = intern(measurement)
+        self.descriptor = intern(descriptor)
+        self.preparation = intern(preparation)
+        self.amount = amount
+        self.unit = intern(unit)
 
 class Step:
     """
     Steps – parse the directions into a series of steps that each consist of ingredients, tools, methods, and times
     """
+    __slots__ = ("step_number", "text", "ingredients", "tools", "methods", "time")
+
     def __init__(self, step_number, text, ingredients=None, tools=None, methods=None, time=None):
         self.step_number = step_number
         self.text = text
-        self.ingredients = ingredients or []
-        self.tools = tools or []
-        self.methods = methods or []
+        self.ingredients = intern_all(ingredients)
+        self.tools = intern_all(tools)
+        self.methods = intern_all(methods)
         self.time = time
 
 class Recipe:
+    __slots__ = ("title", "raw_ingredients", "ingredients", "raw_steps", "steps")
+
     def __init__(self, title, raw_ingredients, ingredients, raw_steps, steps):
         self.title = title
         self.raw_ingredients = raw_ingredients
@@ -0,0 +1,138 @@
+"""
+Sentence segmentation backends for parse_steps.
+
+parse_steps only needs the sentence boundaries of each instruction step. Running the whole
+en_core_web_lg pipeline (tagger, parser, NER, lemmatizer and the vector table) for that is the
+most accurate option but also the slowest and the largest, so the segmenter is configurable:
+
+    model        the full model; sentences come from its dependency parse (the default)
+    senter       only the model's senter component, everything else excluded
+    sentencizer  spaCy's rule-based sentencizer on a blank English tokenizer, no model
+    rules        a regex splitter for recipe prose, no spaCy at all
+
+Pick one with parse.configure_segmenter or the RECIPE_SEGMENTER environment variable.
+benchmarks/segmentation_bench.py reports how closely each backend reproduces the model's splits
+and what it costs in time and memory.
+"""
+import re
+
+import instrumentation
+
+DEFAULT_BACKEND = "model"
+# senter-only components excluded from the model, so they are never loaded
+SENTER_EXCLUDE = ["tok2vec", "tagger", "parser", "attribute_ruler", "lemmatizer", "ner"]
+
+class Segmenter:
+    """
+    Splits step texts into sentences.
+
+    Attributes:
+        name (str): the backend name, part of the recipe cache key.
+    """
+    name = None
+
+    def split(self, text):
+        """
+        Returns the sentences of one text, as strings.
+        """
+        raise NotImplementedError
+
+    def split_many(self, texts, batch_size=256, n_process=1):
+        """
+        Returns an iterator over the sentences of each text, in order. Backends that can batch
+        process all texts together.
+        """
+        return (self.split(text) for text in texts)
+
+class SpacySegmenter(Segmenter):
+    """
+    Segments with a spaCy pipeline's doc.sents.
+
+    Args:
+        name (str): backend name.
+        load (function): returns the pipeline; called the first time it is needed.
+    """
+    def __init__(self, name, load):
+        self.name = name
+        self.load = load
+        self._nlp = None
+
+    @property
+    def nlp(self):
+        if self._nlp is None:
+            self._nlp = self.load()
+        return self._nlp
+
+    def split(self, text):
+        with instrumentation.timed("spacy"):
+            return [sent.text for sent in self.nlp(text).sents]
+
+    def split_many(self, texts, batch_size=256, n_process=1):
+        docs = self.nlp.pipe(texts, batch_size=batch_size, n_process=n_process)
+        while True:
+            # nlp.pipe is lazy: the spacy work for a text happens here
+            with instrumentation.timed("spacy"):
+                doc = next(docs, None)
+            if doc is None:
+                return
+            yield [sent.text for sent in doc.sents]
+
+# abbreviations that end in a period without ending the sentence
+ABBREVIATIONS = {"approx", "e.g", "i.e", "etc", "vs", "no", "tsp", "tbsp", "tbs", "oz", "fl", "lb", "lbs", "pkg", "pt", "qt", "gal", "st", "dr", "mr", "mrs"}
+# a candidate boundary: terminal punctuation, optional closing quotes/brackets, then whitespace
+# followed by something that can start a sentence
+BOUNDARY_REGEX = re.compile(r"([.!?]+[\"')\]]*)\s+(?=[\"'(\[]?[A-Z0-9])")
+LAST_WORD_REGEX = re.compile(r"([\w.]+)\.$")
+
+class RuleSegmenter(Segmenter):
+    """
+    Regex sentence splitter for recipe prose: splits after ., ! or ? when the next word starts with
+    a capital letter or a digit, except after common abbreviations ("approx.", "tsp.") and at line
+    breaks.
+    """
+    name = "rules"
+
+    def split(self, text):
+        sentences = []
+        for line in text.splitlines():
+            start = 0
+            for boundary in BOUNDARY_REGEX.finditer(line):
+                word = LAST_WORD_REGEX.search(line, start, boundary.end(1))
+                if word and word.group(1).lower() in ABBREVIATIONS:
+                    continue
+                sentences.append(line[start:boundary.end(1)])
+                start = boundary.end()
+            if line[start:].strip():
+                sentences.append(line[start:].strip())
+        return [sentence.strip() for sentence in sentences if sentence.strip()]
+
+def load_model():
+    import parse
+    return parse.get_nlp()
+
+def load_senter():
+    import parse
+    from spacy_model import load_pipeline
+    # the vector table is skipped if the senter doesn't use it
+    return load_pipeline(parse.SENTER_MODEL_NAME, exclude=SENTER_EXCLUDE, enable=["senter"])
+
+def load_sentencizer():
+    import spacy
+    nlp = spacy.blank("en")
+    nlp.add_pipe("sentencizer")
+    return nlp
+
+BACKENDS = {
+    "model": lambda: SpacySegmenter("model", load_model),
+    "senter": lambda: SpacySegmenter("senter", load_senter),
+    "sentencizer": lambda: SpacySegmenter("sentencizer", load_sentencizer),
+    "rules": RuleSegmenter,
+}
+
+def create_segmenter(backend=DEFAULT_BACKEND):
+    """
+    Returns a Segmenter for a backend name. Models are loaded on first use, not here.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown segmentation backend {backend!r}; choose from {', '.join(BACKENDS)}")
+    return BACKENDS[backend]()
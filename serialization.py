@@ -0,0 +1,234 @@
+"""
+Converting parsed recipes back from their JSON form, and a compact binary encoding.
+
+json_to_recipe rebuilds Recipe / Step / Ingredient objects from the dict recipe_to_json produces.
+
+The binary format stores a batch of recipes as one string table plus a flat array of unsigned
+32-bit integers:
+
+    header        b"RCPB", u16 schema version, u16 reserved, u32 number of recipes
+    string table  u32 count, count x u32 byte lengths, the UTF-8 bytes of every string back to back
+    body          u32 count, count x u32 values
+
+Every string field is a reference into the string table (0 for None, i + 1 for string i), so
+repeated strings are stored once per batch. All integers are little-endian. The body holds, per
+recipe, the fields below in order, lists being prefixed with their length:
+
+    title, raw_ingredients,
+    ingredients (name, quantity, measurement, descriptor, preparation,
+                 has_amount, amount numerator, amount denominator, unit),
+    raw_steps, steps (step_number, text, ingredients, tools, methods, has_time, duration, condition)
+
+has_amount is 0 for no amount, 1 for an amount stored as numerator and denominator, and 2 for
+one whose numerator or denominator doesn't fit in 32 bits (e.g. "0.333333333333"): its numerator
+field is then a reference to the amount written as "numerator/denominator" and its denominator
+field is 0.
+
+Decoders accept every schema version up to SCHEMA_VERSION. Version 1 had no amount or unit
+fields; those are derived from the quantity and measurement when decoding it. Version 2 had no
+has_amount 2.
+"""
+import struct
+import sys
+from array import array
+
+from fractions import Fraction
+
+from quantities import amount_from_json, normalize_unit, parse_amount
+from representation import Ingredient, Step, Recipe
+
+MAGIC = b"RCPB"
+SCHEMA_VERSION = 3
+HEADER = struct.Struct("<4sHHI")
+COUNT = struct.Struct("<I")
+# largest value a body field can hold
+MAX_VALUE = 2 ** 32 - 1
+
+def json_to_recipe(recipe_dict):
+    """
+    Rebuilds a Recipe from the dict returned by parse.recipe_to_json.
+    """
+    ingredients = []
+    for ing in recipe_dict["ingredients"]:
+        # JSON written before amounts and units existed only has the display strings
+        if "amount" in ing:
+            amount, unit = amount_from_json(ing["amount"]), ing["unit"]
+        else:
+            amount, unit = parse_amount(ing["quantity"]), normalize_unit(ing["measurement"])
+        ingredients.append(Ingredient(ing["name"], ing["quantity"], ing["measurement"], ing["descriptor"],
+                                      ing["preparation"], amount, unit))
+    steps = [
+        Step(step_number=step["step_number"], text=step["text"], ingredients=list(step["ingredients"]),
+             tools=list(step["tools"]), methods=list(step["methods"]),
+             time=dict(step["time"]) if step["time"] is not None else None)
+        for step in recipe_dict["steps"]
+    ]
+    return Recipe(title=recipe_dict["title"], raw_ingredients=list(recipe_dict["raw_ingredients"]),
+                  ingredients=ingredients, raw_steps=list(recipe_dict["raw_steps"]), steps=steps)
+
+def _to_little_endian(values):
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values
+
+def _uint_array(data=b""):
+    values = array("I")
+    assert values.itemsize == 4, "array('I') must be 32 bits wide"
+    values.frombytes(data)
+    return _to_little_endian(values)
+
+class StringTable:
+    """
+    Assigns references to strings: 0 for None, i + 1 for the i-th distinct string added.
+    """
+    def __init__(self):
+        self.ids = {}
+        self.strings = []
+
+    def ref(self, value):
+        if value is None:
+            return 0
+        ref = self.ids.get(value)
+        if ref is None:
+            self.strings.append(value)
+            ref = self.ids[value] = len(self.strings)
+        return ref
+
+    def truncate(self, count):
+        """
+        Forgets every string added after the first count.
+        """
+        for value in self.strings[count:]:
+            del self.ids[value]
+        del self.strings[count:]
+
+def encode_body(recipe, ref):
+    """
+    Returns the body values for one recipe, using ref to turn strings into references.
+    """
+    values = [ref(recipe.title), len(recipe.raw_ingredients)]
+    values.extend(map(ref, recipe.raw_ingredients))
+    values.append(len(recipe.ingredients))
+    for ing in recipe.ingredients:
+        values += (ref(ing.name), ref(ing.quantity), ref(ing.measurement), ref(ing.descriptor), ref(ing.preparation))
+        if ing.amount is None:
+            values += (0, 0, 1, ref(ing.unit))
+        elif 0 <= ing.amount.numerator <= MAX_VALUE and ing.amount.denominator <= MAX_VALUE:
+            values += (1, ing.amount.numerator, ing.amount.denominator, ref(ing.unit))
+        else:
+            values += (2, ref(str(ing.amount)), 0, ref(ing.unit))
+    values.append(len(recipe.raw_steps))
+    values.extend(map(ref, recipe.raw_steps))
+    values.append(len(recipe.steps))
+    for step in recipe.steps:
+        values += (step.step_number, ref(step.text), len(step.ingredients))
+        values.extend(map(ref, step.ingredients))
+        values.append(len(step.tools))
+        values.extend(map(ref, step.tools))
+        values.append(len(step.methods))
+        values.extend(map(ref, step.methods))
+        if step.time is None:
+            values += (0, 0, 0)
+        else:
+            values += (1, ref(step.time["duration"]), ref(step.time["condition"]))
+    return values
+
+def decode_body(values, strings, version=SCHEMA_VERSION):
+    """
+    Decodes one recipe from an iterator over body values.
+
+    Args:
+        values (iterator of ints): positioned at the start of a recipe; advanced past it.
+        strings (sequence): strings[ref] is the string for a reference (strings[0] is None).
+        version (int): schema version the values were written with.
+    """
+    take = values.__next__
+    title = strings[take()]
+    raw_ingredients = [strings[take()] for _ in range(take())]
+    ingredients = []
+    for _ in range(take()):
+        name, quantity, measurement, descriptor, preparation = (
+            strings[take()], strings[take()], strings[take()], strings[take()], strings[take()]
+        )
+        if version >= 2:
+            has_amount, numerator, denominator, unit = take(), take(), take(), strings[take()]
+            if has_amount == 2:
+                amount = Fraction(strings[numerator])
+            else:
+                amount = Fraction(numerator, denominator) if has_amount else None
+        else:
+            amount, unit = parse_amount(quantity), normalize_unit(measurement)
+        ingredients.append(Ingredient(name, quantity, measurement, descriptor, preparation, amount, unit))
+    raw_steps = [strings[take()] for _ in range(take())]
+    steps = []
+    for _ in range(take()):
+        step_number = take()
+        text = strings[take()]
+        step_ingredients = [strings[take()] for _ in range(take())]
+        tools = [strings[take()] for _ in range(take())]
+        methods = [strings[take()] for _ in range(take())]
+        has_time, duration, condition = take(), strings[take()], strings[take()]
+        time = {"duration": duration, "condition": condition} if has_time else None
+        steps.append(Step(step_number, text, step_ingredients, tools, methods, time))
+    return Recipe(title, raw_ingredients, ingredients, raw_steps, steps)
+
+def encode_strings(strings):
+    """
+    Encodes a list of strings as a string table.
+    """
+    encoded = [string.encode("utf-8") for string in strings]
+    lengths = _to_little_endian(array("I", map(len, encoded)))
+    return COUNT.pack(len(encoded)) + lengths.tobytes() + b"".join(encoded)
+
+def decode_strings(data, offset=0):
+    """
+    Decodes a string table starting at offset.
+
+    Returns:
+        strings (list): [None] followed by the strings, so it can be indexed by reference.
+        offset (int): position just past the table.
+    """
+    (count,) = COUNT.unpack_from(data, offset)
+    offset += COUNT.size
+    lengths = _uint_array(data[offset:offset + 4 * count])
+    offset += 4 * count
+    strings = [None]
+    for length in lengths:
+        strings.append(str(data[offset:offset + length], "utf-8"))
+        offset += length
+    return strings, offset
+
+def encode_recipes(recipes):
+    """
+    Encodes a list of Recipe objects into bytes, sharing one string table.
+    """
+    recipes = list(recipes)
+    table = StringTable()
+    body = array("I")
+    for recipe in recipes:
+        body.extend(encode_body(recipe, table.ref))
+    body = _to_little_endian(body)
+    return (HEADER.pack(MAGIC, SCHEMA_VERSION, 0, len(recipes)) + encode_strings(table.strings)
+            + COUNT.pack(len(body)) + body.tobytes())
+
+def decode_recipes(data):
+    """
+    Decodes bytes written by encode_recipes back into a list of Recipe objects.
+    """
+    magic, version, _, recipe_count = HEADER.unpack_from(data, 0)
+    if magic != MAGIC:
+        raise ValueError("Not an encoded recipe batch.")
+    if version > SCHEMA_VERSION:
+        raise ValueError(f"Recipe batch uses schema version {version}, newer than supported ({SCHEMA_VERSION}).")
+    strings, offset = decode_strings(data, HEADER.size)
+    (count,) = COUNT.unpack_from(data, offset)
+    offset += COUNT.size
+    body = _uint_array(data[offset:offset + 4 * count])
+    values = iter(body)
+    return [decode_body(values, strings, version) for _ in range(recipe_count)]
+
+def encode_recipe(recipe):
+    return encode_recipes([recipe])
+
+def decode_recipe(data):
+    return decode_recipes(data)[0]
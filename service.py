@@ -0,0 +1,360 @@
+"""
+Long-running HTTP service for parsing and transforming recipes.
+
+The spaCy model and transform tables are loaded once at start-up (see batch.warm_worker), so a
+request only pays for its own recipe. Endpoints:
+
+    POST /parse      {"url": ...} or {"json_ld": {...}}  -> the parsed recipe (recipe_to_json)
+    POST /transform  the same, plus "transformation": "to vegetarian and double"; a parsed
+                     recipe can be passed as "recipe" instead to skip parsing (422 if it isn't
+                     shaped like /parse output)
+    GET  /metrics    request counts, batch sizes and p50/p99 latencies
+    GET  /metrics/prometheus  per-stage timings and counters (see instrumentation.py), in the
+                     Prometheus text format; run with --instrument to collect them
+
+Parse requests that arrive within a short window are grouped by a MicroBatcher and parsed with a
+single parse_recipes (nlp.pipe) call on a dedicated thread. At most max_pending requests are
+handled at a time; beyond that the service answers 503 with Retry-After instead of queueing.
+
+Run with:
+    python service.py [--host 0.0.0.0] [--port 8080]
+"""
+import argparse
+import asyncio
+import math
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from aiohttp import web
+
+import instrumentation
+import parse
+from batch import describe, load_document, warm_worker
+from frozen import freeze
+from transformation import TRANSFORMS, compile_plan, parse_transformations
+
+DEFAULT_BATCH_WINDOW = 0.01  # seconds the batcher waits for more requests after the first
+DEFAULT_MAX_BATCH = 64
+DEFAULT_MAX_PENDING = 256
+DEFAULT_FETCH_THREADS = 16
+LATENCY_SAMPLES = 10000  # latencies kept per endpoint for the percentiles
+
+class MicroBatcher:
+    """
+    Groups parse requests that arrive close together into one parse.parse_recipes call.
+
+    Args:
+        window (float): seconds to wait for more requests once the first one has arrived.
+        max_batch (int): largest number of recipes parsed together.
+    """
+    def __init__(self, window=DEFAULT_BATCH_WINDOW, max_batch=DEFAULT_MAX_BATCH):
+        self.window = window
+        self.max_batch = max_batch
+        self.queue = asyncio.Queue()
+        # spaCy runs on one thread, so batches never compete for the model
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="nlp")
+        self.batches = 0
+        self.batched_recipes = 0
+        self._task = None
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self.executor.shutdown(wait=False)
+
+    async def parse(self, json_data):
+        """
+        Returns the parsed Recipe for a Recipe JSON-LD object, parsed together with whatever
+        other requests arrive in the same window.
+        """
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((json_data, future))
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.window
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            self.batches += 1
+            self.batched_recipes += len(batch)
+            results = await loop.run_in_executor(self.executor, parse_batch, [json_data for json_data, _ in batch])
+            for (_, future), (recipe, error) in zip(batch, results):
+                if future.done():
+                    continue  # the request was cancelled (client went away)
+                if error is None:
+                    future.set_result(recipe)
+                else:
+                    future.set_exception(error)
+
+def parse_batch(json_list):
+    """
+    Parses a batch with one nlp.pipe call; if that fails, parses the recipes one at a time so the
+    error is only reported for the recipe that caused it. Returns (recipe, error) pairs.
+    """
+    try:
+        return [(recipe, None) for recipe in parse.parse_recipes(json_list)]
+    except Exception:
+        results = []
+        for json_data in json_list:
+            try:
+                results.append((parse.parse_recipe(json_data), None))
+            except Exception as e:
+                results.append((None, e))
+        return results
+
+class Metrics:
+    """
+    Request counters and recent latencies for each endpoint.
+    """
+    def __init__(self):
+        self.requests = {}
+        self.errors = {}
+        self.rejected = 0
+        self.latencies = {}
+
+    def record(self, endpoint, seconds, ok):
+        self.requests[endpoint] = self.requests.get(endpoint, 0) + 1
+        if not ok:
+            self.errors[endpoint] = self.errors.get(endpoint, 0) + 1
+        self.latencies.setdefault(endpoint, deque(maxlen=LATENCY_SAMPLES)).append(seconds)
+
+    def snapshot(self):
+        endpoints = {}
+        for endpoint, samples in self.latencies.items():
+            ordered = sorted(samples)
+            endpoints[endpoint] = {
+                "requests": self.requests.get(endpoint, 0),
+                "errors": self.errors.get(endpoint, 0),
+                "p50_ms": percentile(ordered, 50) * 1000,
+                "p99_ms": percentile(ordered, 99) * 1000,
+            }
+        return {"endpoints": endpoints, "rejected": self.rejected}
+
+def percentile(ordered, p):
+    # nearest-rank percentile of an already sorted list
+    if not ordered:
+        return 0.0
+    rank = max(0, math.ceil(p / 100 * len(ordered)) - 1)
+    return ordered[rank]
+
+class RequestError(Exception):
+    """
+    An error to report to the client with the given HTTP status.
+    """
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+# the fields of a parsed recipe (parse.recipe_to_json) that the transforms read
+RECIPE_LISTS = ("raw_ingredients", "ingredients", "tools", "methods", "raw_steps", "steps")
+INGREDIENT_FIELDS = ("name", "quantity", "measurement", "descriptor", "preparation", "amount", "unit")
+STEP_FIELDS = ("step_number", "text", "ingredients", "tools", "methods", "time")
+
+def optional_string(value):
+    return value is None or isinstance(value, str)
+
+def string_list(value):
+    return isinstance(value, list) and all(isinstance(item, str) for item in value)
+
+def check_recipe(recipe):
+    """
+    Raises RequestError (422) unless recipe has the shape parse.recipe_to_json produces.
+    """
+    def invalid(problem):
+        return RequestError(422, f'"recipe" must be a parsed recipe as /parse returns it: {problem}')
+    if not isinstance(recipe, dict):
+        raise invalid("not a JSON object")
+    missing = [field for field in ("title",) + RECIPE_LISTS if field not in recipe]
+    if missing:
+        raise invalid(f"missing {', '.join(missing)}")
+    if not optional_string(recipe["title"]):
+        raise invalid("title is not a string")
+    for field in RECIPE_LISTS:
+        if not isinstance(recipe[field], list):
+            raise invalid(f"{field} is not a list")
+    for field in ("raw_ingredients", "tools", "methods", "raw_steps"):
+        if not string_list(recipe[field]):
+            raise invalid(f"{field} must be a list of strings")
+    for i, ingredient in enumerate(recipe["ingredients"]):
+        if not isinstance(ingredient, dict) or any(field not in ingredient for field in INGREDIENT_FIELDS):
+            raise invalid(f"ingredient {i} must have {', '.join(INGREDIENT_FIELDS)}")
+        if not isinstance(ingredient["name"], str) or not all(optional_string(ingredient[field]) for field in INGREDIENT_FIELDS[1:5] + ("unit",)):
+            raise invalid(f"ingredient {i} has a field that is not a string")
+        amount = ingredient["amount"]
+        if amount is not None and not (isinstance(amount, list) and len(amount) == 2
+                                       and all(type(part) is int for part in amount) and amount[1] > 0):
+            raise invalid(f"ingredient {i} amount must be null or [numerator, denominator]")
+    for i, step in enumerate(recipe["steps"]):
+        if not isinstance(step, dict) or any(field not in step for field in STEP_FIELDS):
+            raise invalid(f"step {i} must have {', '.join(STEP_FIELDS)}")
+        if not isinstance(step["text"], str) or not all(string_list(step[field]) for field in ("ingredients", "tools", "methods")):
+            raise invalid(f"step {i} text must be a string and its ingredients, tools and methods lists of strings")
+        time = step["time"]
+        if not (isinstance(time, dict) and "duration" in time and "condition" in time
+                and optional_string(time["duration"]) and optional_string(time["condition"])):
+            raise invalid(f"step {i} time must be {{\"duration\": ..., \"condition\": ...}}")
+
+class RecipeService:
+    """
+    The aiohttp application and the state it shares between requests.
+
+    Args:
+        window (float): micro-batching window in seconds.
+        max_batch (int): largest parse batch.
+        max_pending (int): requests handled at a time before new ones get 503.
+        fetch_threads (int): threads fetching recipe pages.
+    """
+    def __init__(self, window=DEFAULT_BATCH_WINDOW, max_batch=DEFAULT_MAX_BATCH, max_pending=DEFAULT_MAX_PENDING,
+                 fetch_threads=DEFAULT_FETCH_THREADS):
+        self.batcher = MicroBatcher(window, max_batch)
+        self.max_pending = max_pending
+        self.pending = 0
+        self.fetch_executor = ThreadPoolExecutor(max_workers=fetch_threads, thread_name_prefix="fetch")
+        self.metrics = Metrics()
+        self.app = web.Application(middlewares=[self.track])
+        self.app.router.add_post("/parse", self.handle_parse)
+        self.app.router.add_post("/transform", self.handle_transform)
+        self.app.router.add_get("/metrics", self.handle_metrics)
+        self.app.router.add_get("/metrics/prometheus", self.handle_prometheus)
+        self.app.on_startup.append(self.on_startup)
+        self.app.on_cleanup.append(self.on_cleanup)
+
+    async def on_startup(self, app):
+        # load the model and compile the tables before the first request arrives
+        await asyncio.get_running_loop().run_in_executor(self.batcher.executor, warm_worker)
+        instrumentation.reset()  # the warm-up isn't traffic
+        self.batcher.start()
+
+    async def on_cleanup(self, app):
+        await self.batcher.stop()
+        self.fetch_executor.shutdown(wait=False)
+
+    @web.middleware
+    async def track(self, request, handler):
+        if request.path.startswith("/metrics"):
+            return await handler(request)
+        if self.pending >= self.max_pending:
+            self.metrics.rejected += 1
+            return web.json_response({"error": "Too many requests in progress, try again shortly."},
+                                     status=503, headers={"Retry-After": "1"})
+        self.pending += 1
+        start = time.perf_counter()
+        ok = False
+        try:
+            response = await handler(request)
+            ok = response.status < 400
+            return response
+        finally:
+            self.pending -= 1
+            self.metrics.record(request.path, time.perf_counter() - start, ok)
+
+    async def read_body(self, request):
+        try:
+            body = await request.json()
+        except ValueError:
+            # invalid JSON, or bytes that aren't valid in the request's charset
+            raise RequestError(400, "The request body must be UTF-8 encoded JSON.")
+        if not isinstance(body, dict):
+            raise RequestError(400, "The request body must be a JSON object.")
+        return body
+
+    async def recipe_json(self, body):
+        """
+        Returns the Recipe JSON-LD a request refers to, fetching the page for a URL.
+        """
+        if "url" in body:
+            loop = asyncio.get_running_loop()
+            try:
+                json_data = await loop.run_in_executor(self.fetch_executor, parse.fetch_recipe_json, body["url"])
+            except Exception as e:
+                raise RequestError(502, describe(e))
+            if not json_data:
+                raise RequestError(422, "Could not find a valid recipe in the provided URL.")
+            return json_data
+        if "json_ld" in body:
+            try:
+                return load_document(body["json_ld"])
+            except Exception as e:
+                raise RequestError(422, describe(e))
+        raise RequestError(400, 'Provide a "url" or a "json_ld" document.')
+
+    async def parsed_recipe(self, body):
+        json_data = await self.recipe_json(body)
+        try:
+            recipe = await self.batcher.parse(json_data)
+        except Exception as e:
+            raise RequestError(500, describe(e))
+        return freeze(parse.recipe_to_json(recipe))
+
+    async def handle_parse(self, request):
+        try:
+            body = await self.read_body(request)
+            return web.json_response({"recipe": await self.parsed_recipe(body)})
+        except RequestError as e:
+            return web.json_response({"error": str(e)}, status=e.status)
+
+    async def handle_transform(self, request):
+        try:
+            body = await self.read_body(request)
+            transformation = body.get("transformation")
+            names = parse_transformations(transformation) if transformation else ()
+            if not names or any(name not in TRANSFORMS for name in names):
+                raise RequestError(400, f"Invalid transformation request: {transformation!r}")
+            if "recipe" in body:
+                check_recipe(body["recipe"])
+                recipe = freeze(body["recipe"])
+            else:
+                recipe = await self.parsed_recipe(body)
+            try:
+                transformed = compile_plan(names).run(recipe)
+            except Exception as e:
+                # a recipe sent by the client can still hold values the transforms can't handle
+                raise RequestError(422 if "recipe" in body else 500, describe(e))
+            return web.json_response({"transformations": list(names), "recipe": transformed})
+        except RequestError as e:
+            return web.json_response({"error": str(e)}, status=e.status)
+
+    async def handle_metrics(self, request):
+        snapshot = self.metrics.snapshot()
+        snapshot["pending"] = self.pending
+        snapshot["batches"] = self.batcher.batches
+        snapshot["mean_batch_size"] = self.batcher.batched_recipes / self.batcher.batches if self.batcher.batches else 0.0
+        return web.json_response(snapshot)
+
+    async def handle_prometheus(self, request):
+        return web.Response(body=instrumentation.prometheus_text().encode("utf-8"),
+                            headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"})
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve /parse, /transform and /metrics over HTTP.")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--batch-window", type=float, default=DEFAULT_BATCH_WINDOW, help="seconds to wait for more parse requests to batch together")
+    parser.add_argument("--max-batch", type=int, default=DEFAULT_MAX_BATCH, help="largest number of recipes parsed in one batch")
+    parser.add_argument("--max-pending", type=int, default=DEFAULT_MAX_PENDING, help="requests handled at a time before answering 503")
+    parser.add_argument("--instrument", action="store_true", help="collect per-stage timings for /metrics/prometheus")
+    args = parser.parse_args()
+    if args.instrument:
+        instrumentation.enable()
+    service = RecipeService(args.batch_window, args.max_batch, args.max_pending)
+    web.run_app(service.app, host=args.host, port=args.port)
+
+if __name__ == "__main__":
+    main()
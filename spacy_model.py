@@ -0,0 +1,72 @@
+"""
+Loads spaCy pipelines with their word-vector table loaded, memory-mapped or skipped.
+
+en_core_web_lg ships a vector table of several hundred MB. spacy.load reads all of it into each
+process's private memory before the first sentence is parsed. The vectors can be handled three
+ways instead:
+
+    load   read the table into memory, as spacy.load does
+    mmap   memory-map the table file read-only. Pages are only read when a row is used, and every
+           process using the model shares one copy of them in the OS page cache. When none of the
+           loaded components uses static vectors, the table is skipped entirely. (default)
+    skip   never load the table. Raises ValueError if a loaded component needs it.
+
+Choose with the RECIPE_VECTORS environment variable (see parse.get_nlp). The vectors are only
+ever read, so a memory-mapped table gives exactly the same parses as a loaded one.
+"""
+import os
+
+VECTOR_MODES = ("load", "mmap", "skip")
+DEFAULT_VECTOR_MODE = os.environ.get("RECIPE_VECTORS", "mmap")
+
+def contains_static_vectors(config):
+    # true if a (nested) model config embeds the static vector table
+    if isinstance(config, dict):
+        if config.get("include_static_vectors") is True:
+            return True
+        if "StaticVectors" in str(config.get("@architectures", "")):
+            return True
+        return any(contains_static_vectors(value) for value in config.values())
+    if isinstance(config, (list, tuple)):
+        return any(contains_static_vectors(value) for value in config)
+    return False
+
+def uses_static_vectors(nlp):
+    """
+    Returns whether any loaded component of a pipeline (enabled or not) reads the vector table.
+    """
+    components = nlp.config.get("components", {})
+    return any(contains_static_vectors(components.get(name, {})) for name in nlp.component_names)
+
+def map_vectors(nlp):
+    """
+    Attaches the pipeline's vector table from its model directory as a read-only memory map.
+    """
+    import numpy
+    vocab_path = nlp._path / "vocab"
+    vectors = nlp.vocab.vectors
+    # the table first: loading the keys checks them against its shape
+    vectors.data = numpy.load(str(vocab_path / "vectors"), mmap_mode="r")
+    vectors.from_disk(vocab_path, exclude=["strings", "vectors"])
+
+def load_pipeline(name, vectors=DEFAULT_VECTOR_MODE, **options):
+    """
+    Loads a spaCy pipeline like spacy.load, handling its vector table as described above.
+
+    Args:
+        name (str): package name or path of the pipeline.
+        vectors (str): "load", "mmap" or "skip".
+        options: passed on to spacy.load, e.g. exclude or enable.
+    """
+    import spacy
+    if vectors not in VECTOR_MODES:
+        raise ValueError(f"Unknown vectors mode {vectors!r}; choose from {', '.join(VECTOR_MODES)}")
+    if vectors == "load":
+        return spacy.load(name, **options)
+    exclude = list(options.pop("exclude", [])) + ["vectors"]
+    nlp = spacy.load(name, exclude=exclude, **options)
+    if uses_static_vectors(nlp):
+        if vectors == "skip":
+            raise ValueError(f"The pipeline {name!r} uses static vectors; load them with vectors='mmap' or 'load'")
+        map_vectors(nlp)
+    return nlp
@@ -1,7 +1,9 @@
 import json
 import re
 
-from parse import fetch_recipe, extract_json_ld, parse_recipe, recipe_to_json
+from pipeline import Plan, Stage
+from substitution import SubstitutionTable
+from parse import fetch_recipe_json, parse_recipe, recipe_to_json
 
 ingredient_mapping = {
     # Meats (replace slow-cooking cuts with quick-cooking alternatives)
@@ -88,104 +90,86 @@ method_mapping = {
     "for 1 hour": "for 30 minutes",
 }
 
-def replace_items(strings, mappings):
+# compiled substitution tables
+ingredient_substitutions = SubstitutionTable(ingredient_mapping)
+tool_substitutions = SubstitutionTable(tool_mapping)
+method_substitutions = SubstitutionTable(method_mapping)
+step_substitutions = SubstitutionTable(ingredient_mapping, tool_mapping, method_mapping)
+
+# cooking times in steps, halved by the transform
+COOKING_TIME_REGEX = re.compile(r"(\d+)\s*(minutes?|hours?)")
+
+def halve_time(match):
+    time_value = int(match.group(1))
+    if "minutes" in match.group(2) and time_value >= 30:
+        halved_time = time_value // 2
+        return f"{halved_time} {match.group(2)}"
+    elif "hours" in match.group(2) and time_value >= 1:
+        halved_time = time_value // 2
+        return f"{halved_time} {match.group(2)}"
+    return match.group(0)
+
+def faster_ingredient(ingredient):
     """
-    Replace all occurrences of items in strings based on given mappings.
-    Intended to be used to update all ingredients, tools, methods referenced in recipe steps with transformed equivalent.
-    
-    Args:
-        strings (list): List of strings to process i.e. recipe steps.
-        mappings (list of dicts): List of dictionaries, where each dictionary contains items to replace as keys and their replacements as values.
-                                  Ex: replace ingredients, methods, tools.
-        
-    Returns:
-        updated_strings: List of strings with replacements applied.
+    Returns the faster-cooking version of a parsed ingredient dict (the same dict if nothing matches).
     """
-    updated_strings = []
-    for string in strings:
-        for mapping in mappings:
-            for key, new in mapping.items():
-                string = string.replace(key, new)  # Replace each old item with the new one, non case sensitive
-        updated_strings.append(string)
-    return updated_strings
-
-def transform_recipe_faster(recipe):
+    # Clean the ingredient name by removing punctuation and whitespace
+    clean_name = ingredient["name"].lower().strip().rstrip(',.')
+
+    name, hit = ingredient_substitutions.apply_longest(clean_name)
+    if hit:
+        return {
+            "name": name,
+            "quantity": ingredient["quantity"],
+            "measurement": ingredient["measurement"],
+            "descriptor": ingredient["descriptor"],
+            "preparation": ingredient["preparation"],
+            "amount": ingredient["amount"],
+            "unit": ingredient["unit"]
+        }
+    return ingredient
+
+class SpeedStage(Stage):
     """
-    Transforms a parsed JSON recipe representation into a recipe that cooks faster.
+    Pipeline stage for the faster transform.
     """
-    transformed_recipe = recipe.copy()
+    tool_mapping = tool_mapping
+    method_mapping = method_mapping
 
-    # Transform raw_ingredients
-    transformed_recipe["raw_ingredients"] = replace_items(recipe["raw_ingredients"], [ingredient_mapping])
+    def raw_ingredient(self, text):
+        return ingredient_substitutions.apply(text)
 
-    # Transform ingredients
-    transformed_ingredients = []
-    for ingredient in recipe["ingredients"]:
-        # Clean the ingredient name by removing punctuation and whitespace
-        clean_name = ingredient["name"].lower().strip().rstrip(',.')
-        
-        for key in ingredient_mapping:
-            if key in clean_name:
-                transformed_ingredients.append({
-                    "name": clean_name.replace(key, ingredient_mapping[key]),
-                    "quantity": ingredient["quantity"],
-                    "measurement": ingredient["measurement"],
-                    "descriptor": ingredient["descriptor"],
-                    "preparation": ingredient["preparation"]
-                })
-                break
-        else:
-            transformed_ingredients.append(ingredient)
-    transformed_recipe["ingredients"] = transformed_ingredients
-
-    # Transform tools
-    transformed_tools = []
-    for tool in recipe["tools"]:
-        clean_tool = tool.lower().strip().rstrip(',.')
-        transformed_tools.append(tool_mapping.get(clean_tool, tool))
-    transformed_recipe["tools"] = transformed_tools
-
-    # Transform methods
-    transformed_methods = []
-    for method in recipe["methods"]:
-        clean_method = method.lower().strip().rstrip(',.')
-        transformed_methods.append(method_mapping.get(clean_method, method))
-    transformed_recipe["methods"] = transformed_methods
-
-    # Transform raw_steps -> replace ingredients, methods, tools w/ faster equivalents
-    transformed_recipe["raw_steps"] = replace_items(recipe["raw_steps"], [ingredient_mapping, tool_mapping, method_mapping])
-
-    # Halve cooking times
-    def halve_time(match):
-        time_value = int(match.group(1))
-        if "minutes" in match.group(2) and time_value >= 30:
-            halved_time = time_value // 2
-            return f"{halved_time} {match.group(2)}"
-        elif "hours" in match.group(2) and time_value >= 1:
-            halved_time = time_value // 2
-            return f"{halved_time} {match.group(2)}"
-        return match.group(0)
-    for i, step in enumerate(transformed_recipe["raw_steps"]):
-        step = re.sub(r"(\d+)\s*(minutes?|hours?)", halve_time, step)
-        transformed_recipe["raw_steps"][i] = step
-    
-    # Transform steps 
-    for i, step in enumerate(transformed_recipe["steps"]):
+    def ingredient(self, ingredient):
+        return faster_ingredient(ingredient)
+
+    def raw_step(self, text):
+        # replace ingredients, methods, tools w/ faster equivalents, then halve cooking times
+        return COOKING_TIME_REGEX.sub(halve_time, step_substitutions.apply(text))
+
+    def step(self, step):
         if step["time"]["duration"]:
-            step["time"]["duration"] = re.sub(r"(\d+)\s*(minutes?|hours?)", halve_time, step["time"]["duration"])
-        step["text"] = re.sub(r"(\d+)\s*(minutes?|hours?)", halve_time, step["text"])
-        step["text"] = replace_items([step["text"]], [ingredient_mapping, tool_mapping, method_mapping])
-        step["ingredients"] = replace_items(step["ingredients"], [ingredient_mapping])
-        step["tools"] = replace_items(step["tools"], [tool_mapping])
-        step["methods"] = replace_items(step["methods"], [method_mapping])
-    return transformed_recipe
+            step["time"]["duration"] = COOKING_TIME_REGEX.sub(halve_time, step["time"]["duration"])
+        step["text"] = COOKING_TIME_REGEX.sub(halve_time, step["text"])
+        step["text"] = step_substitutions.apply(step["text"])
+        step["ingredients"] = ingredient_substitutions.apply_all(step["ingredients"])
+        step["tools"] = tool_substitutions.apply_all(step["tools"])
+        step["methods"] = method_substitutions.apply_all(step["methods"])
+        return step
+
+FASTER = SpeedStage()
+FASTER_PLAN = Plan([FASTER])
+
+def transform_recipe_faster(recipe):
+    """
+    Transforms a parsed JSON recipe representation into a recipe that cooks faster.
+    """
+    return FASTER_PLAN.run(recipe)
 
 def main():
     url = "https://www.allrecipes.com/recipe/21766/roasted-pork-loin/"
 
     try:
-        soup = fetch_recipe(url)
-        json_data = extract_json_ld(soup)
+        json_data = fetch_recipe_json(url)
         if not json_data:
             print("Could not find a valid recipe in the provided URL.")
             return
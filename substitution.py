@@ -0,0 +1,111 @@
+"""
+Shared substitution engine for the transform modules.
+
+A SubstitutionTable compiles one or more {old: new} mappings into a single regex whose
+alternatives are folded into a character trie (see vocabulary.trie_pattern). Applying the table
+rewrites a string in one left-to-right pass: at each position the longest key that matches is
+replaced, and scanning resumes after it. Replacements are never matched again, so a mapping
+like "cheese" -> "vegan cheese" can't cascade into "vegan vegan cheese", and the result
+doesn't depend on the order of the keys.
+"""
+import re
+
+import instrumentation
+from vocabulary import trie_pattern
+
+class SubstitutionTable:
+    """
+    Args:
+        mappings (dicts): {old: new} mappings; when several define the same key, the first wins.
+        whole_words (bool): only replace keys that appear as whole words.
+        ignore_case (bool): match keys regardless of case.
+    """
+    def __init__(self, *mappings, whole_words=False, ignore_case=False):
+        self.whole_words = whole_words
+        self.ignore_case = ignore_case
+        self.replacements = {}
+        for mapping in mappings:
+            for old, new in mapping.items():
+                if old:
+                    self.replacements.setdefault(old.lower() if ignore_case else old, new)
+        self._regex = None
+
+    @property
+    def regex(self):
+        # compiled on first use, so building tables at import time stays cheap
+        if self._regex is None:
+            pattern = trie_pattern(self.replacements) if self.replacements else r"(?!)"
+            if self.whole_words:
+                pattern = r"\b(?:" + pattern + r")\b"
+            self._regex = re.compile(pattern, re.IGNORECASE if self.ignore_case else 0)
+        return self._regex
+
+    def _replacement(self, match):
+        old = match.group(0)
+        return self.replacements[old.lower() if self.ignore_case else old]
+
+    def apply(self, text):
+        """
+        Returns text with every key replaced in a single pass.
+        """
+        if not self.replacements:
+            return text
+        if instrumentation.enabled:
+            text, n = self.regex.subn(self._replacement, text)
+            instrumentation.count("substitutions", n)
+            return text
+        return self.regex.sub(self._replacement, text)
+
+    def apply_all(self, strings):
+        """
+        Returns a new list with apply run on every string.
+        """
+        if not self.replacements:
+            return list(strings)
+        if instrumentation.enabled:
+            return [self.apply(string) for string in strings]
+        sub = self.regex.sub
+        replacement = self._replacement
+        return [sub(replacement, string) for string in strings]
+
+    def apply_longest(self, text):
+        """
+        Replaces only the longest key found anywhere in text (the first of equally long ones).
+        Meant for short phrases such as ingredient names, where one substitution stands for the
+        whole phrase: "cheddar cheese" becomes "vegan cheddar cheese", not "vegan cheddar vegan cheese".
+
+        Returns:
+            (text, key): the new text and the key replaced (lowercased if the table ignores case),
+                         or the text unchanged and None if no key occurs in it.
+        """
+        best = None
+        if self.replacements:
+            match = self.regex.match
+            for start in range(len(text)):
+                found = match(text, start)
+                if found and (best is None or found.end() - found.start() > best.end() - best.start()):
+                    best = found
+        if best is None:
+            return text, None
+        key = best.group(0).lower() if self.ignore_case else best.group(0)
+        instrumentation.count("substitutions")
+        return text[:best.start()] + self.replacements[key] + text[best.end():], key
+
+    def apply_with_hits(self, text):
+        """
+        Like apply, but also returns the set of keys that were replaced (lowercased if the table
+        ignores case).
+        """
+        hits = set()
+
+        def replacement(match):
+            old = match.group(0)
+            key = old.lower() if self.ignore_case else old
+            hits.add(key)
+            return self.replacements[key]
+
+        if not self.replacements:
+            return text, hits
+        text, n = self.regex.subn(replacement, text)
+        instrumentation.count("substitutions", n)
+        return text, hits
@@ -0,0 +1,97 @@
+import os
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+# the modules live at the repository root, as for main.py and the benchmarks
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# never read or write the real caches under ~/.cache: set before parse is imported, which reads
+# these once. Tests that need a page cache make their own.
+os.environ["RECIPE_PAGE_CACHE"] = "0"
+os.environ["RECIPE_CACHE_DIR"] = tempfile.mkdtemp(prefix="recipe_transformer_tests_")
+
+class StandIn:
+    """
+    A local HTTP server standing in for allrecipes.com. Each path answers from a route:
+
+        body (bytes)             the page
+        statuses (list of int)   statuses for successive requests; the last one repeats (default 200)
+        delay (float)            seconds to wait before answering
+        etag, last_modified      validators sent with 200s; matching conditional requests get a 304
+
+    Records every request's path and headers, and the most requests it was handling at once.
+    """
+    def __init__(self):
+        self.routes = {}
+        self.requests = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                stand_in.handle(self)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+        self.thread.start()
+
+    def url(self, path):
+        return f"http://127.0.0.1:{self.server.server_port}{path}"
+
+    def hits(self, path):
+        return sum(request_path == path for request_path, _ in self.requests)
+
+    def handle(self, handler):
+        with self._lock:
+            self.requests.append((handler.path, dict(handler.headers)))
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            route = self.routes.get(handler.path, {"statuses": [404]})
+            statuses = route.setdefault("statuses", [200])
+            status = statuses.pop(0) if len(statuses) > 1 else statuses[0]
+        try:
+            time.sleep(route.get("delay", 0))
+            headers = {}
+            if status == 200:
+                etag, last_modified = route.get("etag"), route.get("last_modified")
+                if (etag and handler.headers.get("If-None-Match") == etag) or \
+                        (last_modified and handler.headers.get("If-Modified-Since") == last_modified):
+                    status = 304
+                if etag:
+                    headers["ETag"] = etag
+                if last_modified:
+                    headers["Last-Modified"] = last_modified
+            body = route.get("body", b"") if status == 200 else b""
+            handler.send_response(status)
+            for name, value in headers.items():
+                handler.send_header(name, value)
+            handler.send_header("Content-Type", "text/html; charset=utf-8")
+            handler.send_header("Content-Length", str(len(body)))
+            handler.end_headers()
+            handler.wfile.write(body)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+@pytest.fixture
+def stand_in():
+    server = StandIn()
+    yield server
+    server.close()
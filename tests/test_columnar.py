@@ -0,0 +1,75 @@
+import glob
+import json
+import os
+from fractions import Fraction
+
+import pytest
+
+import parse
+from columnar import INT64_MAX, IngredientColumns, scale_recipes
+from frozen import freeze
+from pipeline import Plan
+from transformation import ScaleStage
+
+FIXTURES = sorted(glob.glob(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                         "benchmarks", "fixtures", "*.json")))
+
+def parsed(json_ld):
+    parse.configure_segmenter("rules")
+    return freeze(parse.recipe_to_json(parse.parse_recipe(json_ld)))
+
+def recipe(*raw_ingredients):
+    return parsed({"@type": "Recipe", "name": "Test", "recipeIngredient": list(raw_ingredients),
+                   "recipeInstructions": [{"text": "Mix everything."}]})
+
+@pytest.fixture(scope="module")
+def fixtures():
+    recipes = []
+    for path in FIXTURES:
+        with open(path) as file:
+            recipes.append(parsed(parse.find_recipe(json.load(file))))
+    return recipes
+
+def scale_stage(recipes, factors):
+    return [Plan([ScaleStage(factor)]).run(recipe) for recipe, factor in zip(recipes, factors)]
+
+@pytest.mark.parametrize("factors", [
+    [2] * 3,
+    [Fraction(1, 2)] * 3,
+    [Fraction(1 + i % 12, 4) for i in range(3)],
+])
+def test_scaling_matches_scale_stage_on_fixtures(fixtures, factors):
+    factors = [factors[i % len(factors)] for i in range(len(fixtures))]
+    assert IngredientColumns(fixtures).scale(factors).to_recipes() == scale_stage(fixtures, factors)
+
+def test_single_factor_matches_scale_stage(fixtures):
+    assert scale_recipes(fixtures, 3) == scale_stage(fixtures, [3] * len(fixtures))
+
+def test_large_denominator_falls_back_to_exact_amounts():
+    recipes = [recipe("0.333333333333 cup sugar", "3 teaspoons salt"), recipe("1 1/2 cups flour")]
+    # 10^12 * 10^8 overflows int64 for the sugar, not for the rest
+    factors = [Fraction(1, 10 ** 8), Fraction(1, 10 ** 8)]
+    columns = IngredientColumns(recipes).scale(factors)
+    assert list(columns.overflow) == [True, False, False]
+    assert columns.to_recipes() == scale_stage(recipes, factors)
+    assert columns.amount(0) == Fraction(333333333333, 10 ** 20)
+
+def test_amount_above_int64_is_built_and_scaled():
+    recipes = [recipe(f"{2 ** 65} cups water", "2 cups flour")]
+    columns = IngredientColumns(recipes)
+    assert columns.amount(0) == 2 ** 65 and columns.amount(1) == 2
+    assert columns.scale(Fraction(1, 2)).to_recipes() == scale_stage(recipes, [Fraction(1, 2)])
+    frame = columns.to_frame()
+    assert frame["numerator"][0] == 2 ** 64 and frame["amount"][1] == 1
+
+def test_exact_amount_moves_back_into_the_columns():
+    recipes = [recipe(f"{INT64_MAX + 1} cups water")]
+    columns = IngredientColumns(recipes).scale(Fraction(1, 2 ** 10))
+    assert not columns.overflow[0] and columns.amount(0) == 2 ** 53
+    assert columns.to_recipes() == scale_stage(recipes, [Fraction(1, 2 ** 10)])
+
+def test_overflowing_amounts_are_not_promoted():
+    recipes = [recipe(f"{INT64_MAX // 4} teaspoons salt", "3 teaspoons sugar")]
+    columns = IngredientColumns(recipes).promote_units()
+    assert list(columns.unit_changed) == [False, True]
+    assert list(columns.to_recipes()[0]["raw_ingredients"]) == [f"{INT64_MAX // 4} teaspoons salt", "1 tablespoon sugar"]
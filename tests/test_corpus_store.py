@@ -0,0 +1,82 @@
+import glob
+import json
+import os
+
+import pytest
+
+import parse
+from corpus_store import CorpusStore, CorpusWriter, write_corpus
+from representation import Ingredient, Recipe, Step
+
+FIXTURES = sorted(glob.glob(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks", "fixtures", "*.json")))
+
+def make_recipe(title, ingredient):
+    step = Step(1, f"Add the {ingredient}.", [ingredient], ["bowl"], ["add"], None)
+    return Recipe(title, [f"1 cup {ingredient}"], [Ingredient(ingredient, "1", "cup")], [f"Add the {ingredient}."], [step])
+
+def titles_and_steps(recipe):
+    return recipe.title, recipe.ingredients[0].name, recipe.steps[0].text
+
+def test_failed_append_does_not_shift_later_strings(tmp_path):
+    path = str(tmp_path / "recipes.rcps")
+    first = make_recipe("First", "flour")
+    broken = make_recipe("Broken", "unstored string")
+    broken.steps[0].step_number = -1  # can't be packed into the u32 body
+    later = [make_recipe("Second", "sugar"), make_recipe("Third", "butter")]
+    with CorpusWriter(path) as writer:
+        writer.append([first])
+        with pytest.raises(OverflowError):
+            writer.append([make_recipe("Fine", "salt"), broken])
+        assert writer.append(later) == 1
+    with CorpusStore(path) as store:
+        assert len(store) == 3
+        assert [titles_and_steps(recipe) for recipe in store] == [titles_and_steps(recipe) for recipe in [first] + later]
+
+def test_reader_refresh_sees_appends(tmp_path):
+    path = str(tmp_path / "recipes.rcps")
+    with CorpusWriter(path) as writer:
+        writer.append([make_recipe("First", "flour")])
+        with CorpusStore(path) as store:
+            assert len(store) == 1
+            writer.append([make_recipe("Second", "flour")])
+            assert store.refresh() == 2
+            assert store[1].title == "Second"
+            assert store[-1].ingredients[0].name == "flour"
+
+def test_fixtures_by_id_and_in_order(tmp_path):
+    parse.configure_segmenter("rules")
+    recipes = []
+    for path in FIXTURES:
+        with open(path) as file:
+            recipes.append(parse.parse_recipe(parse.find_recipe(json.load(file))))
+    expected = [parse.recipe_to_json(recipe) for recipe in recipes]
+    path = str(tmp_path / "recipes.rcps")
+    # several blocks sharing one string table
+    assert write_corpus(path, recipes, block_size=4) == len(recipes)
+    with CorpusStore(path) as store:
+        assert len(store._blocks) == -(-len(recipes) // 4)
+        assert [parse.recipe_to_json(recipe) for recipe in store] == expected
+        for recipe_id in reversed(range(len(recipes))):
+            assert parse.recipe_to_json(store[recipe_id]) == expected[recipe_id]
+        with pytest.raises(IndexError):
+            store[len(recipes)]
+
+def test_cut_short_block_is_ignored_and_dropped(tmp_path):
+    path = str(tmp_path / "recipes.rcps")
+    with CorpusWriter(path) as writer:
+        writer.append([make_recipe("First", "flour")])
+        writer.append([make_recipe("Second", "sugar")])
+    # an append interrupted halfway through its block
+    os.truncate(path, os.path.getsize(path) - 8)
+    with CorpusStore(path) as store:
+        assert [recipe.title for recipe in store] == ["First"]
+    with CorpusWriter(path) as writer:
+        assert writer.append([make_recipe("Third", "butter")]) == 1
+    with CorpusStore(path) as store:
+        assert [titles_and_steps(recipe) for recipe in store] == [("First", "flour", "Add the flour."), ("Third", "butter", "Add the butter.")]
+
+def test_not_a_corpus_is_rejected(tmp_path):
+    path = tmp_path / "recipes.rcps"
+    path.write_bytes(b"RIDX" + bytes(12))
+    with pytest.raises(ValueError):
+        CorpusStore(str(path))
@@ -0,0 +1,75 @@
+import os
+import sys
+
+import pytest
+import requests
+
+import parse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+from corpus import load_corpus, render_page
+
+@pytest.fixture
+def pages(stand_in):
+    # the fixture recipes as small allrecipes-like pages; returns [(path, Recipe JSON-LD)] in name order
+    pages = []
+    for name, json_ld in load_corpus()[:6]:
+        path = f"/recipe/{name}/"
+        stand_in.routes[path] = {"body": render_page(json_ld, page_size=16 * 1024)}
+        pages.append((path, parse.find_recipe(json_ld)))
+    return pages
+
+@pytest.fixture(autouse=True)
+def quick_retries(monkeypatch):
+    monkeypatch.setattr(parse, "BACKOFF_FACTOR", 0.01)
+
+def fetch_all(urls, **options):
+    return list(parse.fetch_recipes(urls, fetch=parse.fetch_recipe_json, **options))
+
+def test_ordered_results_follow_input_order(stand_in, pages):
+    # the first page answers last
+    stand_in.routes[pages[0][0]]["delay"] = 0.3
+    urls = [stand_in.url(path) for path, _ in pages]
+    results = fetch_all(urls, ordered=True)
+    assert [url for url, _, _ in results] == urls
+    assert [result for _, result, _ in results] == [json_ld for _, json_ld in pages]
+    assert all(error is None for _, _, error in results)
+
+def test_unordered_results_come_back_as_they_finish(stand_in, pages):
+    stand_in.routes[pages[0][0]]["delay"] = 0.3
+    urls = [stand_in.url(path) for path, _ in pages]
+    results = fetch_all(urls)
+    assert results[-1][0] == urls[0]
+    assert sorted(url for url, _, _ in results) == sorted(urls)
+
+def test_connections_per_host_are_limited(stand_in, pages):
+    for route in stand_in.routes.values():
+        route["delay"] = 0.1
+    results = fetch_all([stand_in.url(path) for path, _ in pages], max_concurrency=6, max_connections_per_host=2)
+    assert all(error is None for _, _, error in results)
+    assert stand_in.max_in_flight == 2
+
+def test_failures_are_reported_per_url(stand_in, pages, monkeypatch):
+    monkeypatch.setattr(parse, "MAX_RETRIES", 0)
+    stand_in.routes["/slow/"] = {"body": b"<html></html>", "delay": 1}
+    urls = [stand_in.url(pages[0][0]), stand_in.url("/missing/"), stand_in.url("/slow/"), stand_in.url(pages[1][0])]
+    results = fetch_all(urls, timeout=(1, 0.2), ordered=True)
+    assert [url for url, _, _ in results] == urls
+    assert results[0][1] == pages[0][1] and results[0][2] is None
+    assert results[1][1] is None and isinstance(results[1][2], ValueError)
+    assert results[2][1] is None and isinstance(results[2][2], requests.exceptions.ConnectionError)
+    assert results[3][1] == pages[1][1] and results[3][2] is None
+
+def test_server_errors_are_retried(stand_in, pages):
+    path, json_ld = pages[0]
+    stand_in.routes[path]["statuses"] = [503, 503, 200]
+    [(_, result, error)] = fetch_all([stand_in.url(path)])
+    assert error is None and result == json_ld
+    assert stand_in.hits(path) == 3
+
+def test_retries_give_up(stand_in, pages):
+    path, _ = pages[0]
+    stand_in.routes[path]["statuses"] = [503]
+    [(_, result, error)] = fetch_all([stand_in.url(path)])
+    assert result is None and isinstance(error, ValueError)
+    assert stand_in.hits(path) == parse.MAX_RETRIES + 1
@@ -0,0 +1,80 @@
+import copy
+import json
+import pickle
+
+import pytest
+
+from frozen import FrozenDict, evolve, freeze, share, thaw
+
+RECIPE = {
+    "title": "Toast",
+    "raw_ingredients": ["2 slices bread", "1 tablespoon butter"],
+    "ingredients": [{"name": "bread", "amount": [2, 1]}, {"name": "butter", "amount": [1, 1]}],
+    "steps": [{"step_number": 1, "text": "Toast the bread.", "time": {"duration": None}}],
+}
+
+@pytest.mark.parametrize("mutate", [
+    lambda recipe: recipe.__setitem__("title", "Jam"),
+    lambda recipe: recipe.__delitem__("title"),
+    lambda recipe: recipe.update(title="Jam"),
+    lambda recipe: recipe.setdefault("servings", 2),
+    lambda recipe: recipe.pop("title"),
+    lambda recipe: recipe.popitem(),
+    lambda recipe: recipe.clear(),
+    lambda recipe: recipe["ingredients"][0].__setitem__("name", "rye"),
+    lambda recipe: recipe["steps"][0]["time"].__setitem__("duration", "5 minutes"),
+])
+def test_frozen_recipe_rejects_mutation(mutate):
+    recipe = freeze(RECIPE)
+    with pytest.raises(TypeError):
+        mutate(recipe)
+    assert thaw(recipe) == RECIPE
+
+def test_in_place_or_is_rejected():
+    recipe = freeze(RECIPE)
+    with pytest.raises(TypeError):
+        recipe |= {"title": "Jam"}
+
+def test_lists_become_tuples():
+    recipe = freeze(RECIPE)
+    assert isinstance(recipe["raw_ingredients"], tuple)
+    assert isinstance(recipe["ingredients"][0], FrozenDict)
+    with pytest.raises(AttributeError):
+        recipe["raw_ingredients"].append("jam")
+
+def test_freeze_is_idempotent_and_thaw_copies():
+    recipe = freeze(RECIPE)
+    assert freeze(recipe) is recipe
+    thawed = thaw(recipe)
+    assert thawed == RECIPE and type(thawed) is dict and type(thawed["ingredients"]) is list
+    thawed["ingredients"][0]["name"] = "rye"
+    assert recipe["ingredients"][0]["name"] == "bread"
+
+def test_frozen_recipe_serializes_like_the_plain_one():
+    recipe = freeze(RECIPE)
+    assert json.loads(json.dumps(recipe)) == RECIPE
+    assert pickle.loads(pickle.dumps(recipe)) == recipe
+    assert isinstance(pickle.loads(pickle.dumps(recipe)), FrozenDict)
+    assert copy.copy(recipe) is recipe and copy.deepcopy(recipe) is recipe
+
+def test_evolve_shares_unchanged_parts():
+    recipe = freeze(RECIPE)
+    ingredients = list(recipe["ingredients"])
+    ingredients[1] = dict(ingredients[1], amount=[2, 1])
+    changed = evolve(recipe, dict(recipe, ingredients=ingredients))
+    assert changed["ingredients"][1]["amount"] == (2, 1)
+    assert changed["ingredients"][0] is recipe["ingredients"][0]
+    assert changed["ingredients"][1]["name"] is recipe["ingredients"][1]["name"]
+    for key in ("title", "raw_ingredients", "steps"):
+        assert changed[key] is recipe[key]
+    assert recipe["ingredients"][1]["amount"] == (1, 1)
+
+def test_evolve_without_changes_returns_the_original():
+    recipe = freeze(RECIPE)
+    assert evolve(recipe, dict(recipe)) is recipe
+    assert evolve(recipe, thaw(recipe)) is recipe
+
+def test_share_reuses_unchanged_tuples():
+    items = freeze(["a", "b"])
+    assert share(list(items), items) is items
+    assert share(["a", "c"], items) == ("a", "c")
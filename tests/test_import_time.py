@@ -0,0 +1,46 @@
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# modules a worker or CLI imports before it has any recipe to parse
+MODULES = ["parse", "transformation", "veg_transform", "italian_transform", "speed_transform", "main"]
+
+# top-level packages that must stay off the import path until they are actually used
+HEAVY_PACKAGES = {"spacy", "thinc", "bs4", "requests", "Levenshtein"}
+
+# written to stderr between the imports and the first use, to split the -X importtime output
+MARKER = "--- first use ---"
+
+def imported_packages(code):
+    """
+    Runs code in a fresh interpreter with -X importtime.
+
+    Returns:
+        before, after (sets of strings): top-level names of the modules imported before and
+                                         after the code writes MARKER to stderr.
+    """
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                            cwd=ROOT, capture_output=True, text=True, check=True)
+    before, after = set(), set()
+    imported = before
+    # lines look like: "import time:       123 |        456 |   module.name"
+    for line in result.stderr.splitlines():
+        if line == MARKER:
+            imported = after
+        elif line.startswith("import time:") and line.count("|") == 2:
+            name = line.split("|")[2].strip()
+            if name != "package":  # the header line
+                imported.add(name.split(".")[0])
+    return before, after
+
+def test_transform_modules_import_without_heavy_packages():
+    code = (f"import {', '.join(MODULES)}, sys\n"
+            f"sys.stderr.write({MARKER!r} + '\\n'); sys.stderr.flush()\n"
+            "parse.get_session()\n")
+    before, after = imported_packages(code)
+    assert set(MODULES) <= before
+    assert not HEAVY_PACKAGES & before
+    # and they do load once they are needed
+    assert "requests" in after
@@ -0,0 +1,13 @@
+from rapidfuzz.distance import Indel
+
+from ingredient_matcher import SIMILARITY_CUTOFF, IngredientMatcher
+
+def test_pair_exactly_at_cutoff_matches():
+    assert Indel.normalized_similarity("heavy", "honey") == SIMILARITY_CUTOFF
+    assert IngredientMatcher(["honey"]).match("Whisk in the heavy cream.") == ["honey"]
+
+def test_pair_below_cutoff_does_not_match():
+    assert IngredientMatcher(["honey"]).match("Stir the sauce.") == []
+
+def test_substring_match():
+    assert IngredientMatcher(["Olive Oil", "salt"]).match("Drizzle with olive oil.") == ["Olive Oil"]
@@ -0,0 +1,34 @@
+import pytest
+
+from speed_transform import faster_ingredient
+from veg_transform import from_veg_ingredient, to_veg_ingredient
+
+def ingredient(name):
+    return {"name": name, "quantity": "1", "measurement": "cup", "descriptor": None, "preparation": None,
+            "amount": [1, 1], "unit": "cup"}
+
+@pytest.mark.parametrize("name, expected", [
+    # one substitution per name, for the longest key in it
+    ("cheddar cheese", "vegan cheddar cheese"),
+    ("mozzarella cheese", "vegan mozzarella cheese"),
+    ("cottage cheese", "crumbled tofu"),
+    ("shredded cheese", "shredded vegan cheese"),
+    ("Chicken Breast,", "seitan breast"),
+    ("all-purpose flour", "all-purpose flour"),
+])
+def test_to_vegetarian_names(name, expected):
+    assert to_veg_ingredient(ingredient(name))["name"] == expected
+
+def test_unmatched_ingredient_is_returned_as_is():
+    original = ingredient("all-purpose flour")
+    assert to_veg_ingredient(original) is original
+
+def test_from_vegetarian_name():
+    assert from_veg_ingredient(ingredient("tofurky slices"))["name"] == "turkey slices"
+
+@pytest.mark.parametrize("name, expected", [
+    ("dried black beans", "canned black beans"),
+    ("pork shoulder roast", "pork tenderloin roast"),
+])
+def test_faster_names(name, expected):
+    assert faster_ingredient(ingredient(name))["name"] == expected
@@ -0,0 +1,31 @@
+import glob
+import json
+import os
+
+import parse
+from frozen import FrozenDict, freeze
+from italian_transform import transform_recipe_to_italian
+from transformation import compile_plan
+
+FIXTURES = sorted(glob.glob(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks", "fixtures", "*.json")))
+
+def parsed_recipe():
+    parse.configure_segmenter("rules")
+    with open(FIXTURES[0]) as file:
+        return parse.recipe_to_json(parse.parse_recipe(parse.find_recipe(json.load(file))))
+
+def test_direct_call_returns_frozen_recipe():
+    recipe = parsed_recipe()
+    transformed = transform_recipe_to_italian(recipe)
+    assert isinstance(transformed, FrozenDict)
+    assert isinstance(transformed["steps"], tuple) and isinstance(transformed["steps"][0], FrozenDict)
+    assert transformed == freeze(transform_recipe_to_italian(recipe))
+    assert recipe == parsed_recipe()  # the input is left as it was
+
+def test_shares_unchanged_parts_with_frozen_input():
+    recipe = freeze(parsed_recipe())
+    transformed = transform_recipe_to_italian(recipe)
+    assert transformed["title"].startswith("Italian-Style ")
+    unchanged = [key for key in recipe if transformed[key] == recipe[key]]
+    assert all(transformed[key] is recipe[key] for key in unchanged)
+    assert transformed == compile_plan(("italian",)).run(recipe)
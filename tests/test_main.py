@@ -0,0 +1,23 @@
+import io
+import json
+
+import parse
+from main import stream
+
+def run(lines):
+    parse.configure_segmenter("rules")
+    output = io.StringIO()
+    stream(lines, workers=0, output=output)
+    return [json.loads(line) for line in output.getvalue().splitlines()]
+
+def test_malformed_json_lines_report_the_json_error():
+    records = run(['{"@type": "Recipe", "name": ', "", "[1, 2", "\ufeff{bad", "  {"])
+    assert [record["line"] for record in records] == [1, 3, 4, 5]
+    for record in records:
+        assert record["error"].startswith("JSONDecodeError: "), record
+
+def test_json_ld_after_byte_order_mark_is_parsed():
+    document = {"@type": "Recipe", "name": "Toast", "recipeIngredient": ["1 slice bread"],
+                "recipeInstructions": [{"@type": "HowToStep", "text": "Toast the bread."}]}
+    (record,) = run(["\ufeff" + json.dumps(document)])
+    assert record["recipe"]["title"] == "Toast"
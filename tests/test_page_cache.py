@@ -0,0 +1,81 @@
+import os
+
+import pytest
+import requests
+
+from page_cache import PageCache, normalize_url
+
+PAGE = b"<html><body>recipe</body></html>"
+
+@pytest.fixture
+def session():
+    # no retries, so an upstream error reaches the cache at once
+    with requests.Session() as session:
+        yield session
+
+def test_fresh_page_is_served_from_disk(tmp_path, stand_in, session):
+    stand_in.routes["/recipe/1/a/"] = {"body": PAGE}
+    cache = PageCache(str(tmp_path / "pages.sqlite"))
+    assert cache.get(stand_in.url("/recipe/1/a/"), session) == PAGE
+    # a different spelling of the same URL is the same entry
+    assert cache.get(stand_in.url("/recipe/1/a#reviews"), session) == PAGE
+    assert stand_in.hits("/recipe/1/a/") == 1
+    assert cache.stats()[0] == 1
+
+@pytest.mark.parametrize("validator, header, request_header", [
+    ("etag", '"v1"', "If-None-Match"),
+    ("last_modified", "Wed, 21 Oct 2026 07:28:00 GMT", "If-Modified-Since"),
+])
+def test_expired_page_is_revalidated(tmp_path, stand_in, session, validator, header, request_header):
+    stand_in.routes["/recipe/2/b/"] = {"body": PAGE, validator: header}
+    cache = PageCache(str(tmp_path / "pages.sqlite"), ttl=0)
+    url = stand_in.url("/recipe/2/b/")
+    assert cache.get(url, session) == PAGE
+    assert cache.get(url, session) == PAGE
+    (_, first), (_, second) = stand_in.requests
+    assert request_header not in first
+    assert second[request_header] == header  # answered with a 304 and the cached body
+
+def test_changed_page_replaces_the_entry(tmp_path, stand_in, session):
+    stand_in.routes["/recipe/3/c/"] = {"body": PAGE, "etag": '"v1"'}
+    cache = PageCache(str(tmp_path / "pages.sqlite"), ttl=0)
+    url = stand_in.url("/recipe/3/c/")
+    cache.get(url, session)
+    stand_in.routes["/recipe/3/c/"] = {"body": b"new page", "etag": '"v2"'}
+    assert cache.get(url, session) == b"new page"
+    assert cache.get(url, session) == b"new page"
+    assert stand_in.requests[-1][1]["If-None-Match"] == '"v2"'
+
+def test_stale_page_is_served_after_upstream_error(tmp_path, stand_in, session):
+    stand_in.routes["/recipe/4/d/"] = {"body": PAGE, "etag": '"v1"'}
+    cache = PageCache(str(tmp_path / "pages.sqlite"), ttl=0)
+    url = stand_in.url("/recipe/4/d/")
+    cache.get(url, session)
+    stand_in.routes["/recipe/4/d/"] = {"statuses": [503]}
+    assert cache.get(url, session) == PAGE
+    stand_in.close()  # connection refused
+    assert cache.get(url, session) == PAGE
+    assert cache.stale_served == 2
+
+def test_errors_without_a_cached_page(tmp_path, stand_in, session):
+    stand_in.routes["/recipe/5/e/"] = {"statuses": [503]}
+    cache = PageCache(str(tmp_path / "pages.sqlite"))
+    with pytest.raises(ValueError):
+        cache.get(stand_in.url("/recipe/5/e/"), session)
+    with pytest.raises(ValueError):
+        cache.get(stand_in.url("/missing"), session)
+
+def test_least_recently_used_pages_are_evicted(tmp_path, stand_in, session):
+    for i in range(3):
+        stand_in.routes[f"/recipe/{i}/x/"] = {"body": os.urandom(3000)}
+    cache = PageCache(str(tmp_path / "pages.sqlite"), max_bytes=5000)
+    for i in range(3):
+        cache.get(stand_in.url(f"/recipe/{i}/x/"), session)
+    count, size = cache.stats()
+    assert size <= 5000 and count < 3
+    cache.get(stand_in.url("/recipe/2/x/"), session)
+    assert stand_in.hits("/recipe/2/x/") == 1  # the newest page was kept
+
+def test_normalize_url():
+    assert normalize_url("HTTPS://Www.Allrecipes.com:443/recipe/1/x/?b=2&a=1#top") == \
+        "https://www.allrecipes.com/recipe/1/x?a=1&b=2"
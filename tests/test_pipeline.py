@@ -0,0 +1,82 @@
+import glob
+import json
+import os
+from fractions import Fraction
+from itertools import permutations
+
+import pytest
+
+import parse
+from frozen import FrozenDict, freeze, thaw
+from pipeline import FusedSegment, Plan
+from transformation import TRANSFORMS, ScaleStage, compile_plan
+
+FIXTURES = sorted(glob.glob(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks", "fixtures", "*.json")))
+
+@pytest.fixture(scope="module")
+def recipes():
+    parse.configure_segmenter("rules")
+    parsed = []
+    for path in FIXTURES:
+        with open(path) as file:
+            parsed.append(parse.recipe_to_json(parse.parse_recipe(parse.find_recipe(json.load(file)))))
+    return parsed
+
+def sequential(names, recipe):
+    # each transform on its own, one after the other
+    for name in names:
+        recipe = compile_plan((name,)).run(recipe)
+    return recipe
+
+COMBINATIONS = [
+    ("to vegetarian", "double"),
+    ("double", "to vegetarian"),
+    ("to vegetarian", "to healthy", "faster"),
+    ("from vegetarian", "from healthy", "half"),
+    ("to healthy", "italian", "double"),
+    ("italian", "to vegetarian", "half"),
+    ("faster", "double", "half"),
+    ("to vegetarian", "from vegetarian"),
+] + list(permutations(("to vegetarian", "italian", "faster")))
+
+@pytest.mark.parametrize("names", COMBINATIONS, ids=" + ".join)
+def test_fused_plan_matches_sequential_transforms(recipes, names):
+    changed = False
+    for recipe in recipes:
+        fused = compile_plan(names).run(recipe)
+        assert fused == sequential(names, recipe)
+        changed |= fused != recipe
+    assert changed
+
+def test_every_transform_leaves_its_input_alone(recipes):
+    for name in TRANSFORMS:
+        recipe = recipes[0]
+        before = json.dumps(recipe)
+        compile_plan((name,)).run(recipe)
+        assert json.dumps(recipe) == before
+
+def test_consecutive_scalings_are_merged():
+    plan = compile_plan(("double", "half", "double"))
+    assert plan.labels == ["transform:double+half+double"]
+    [segment] = plan.segments
+    assert isinstance(segment, FusedSegment) and len(segment.stages) == 1
+    assert segment.stages[0].factor == 2
+
+def test_barrier_splits_the_plan():
+    plan = compile_plan(("to vegetarian", "double", "italian", "faster"))
+    assert plan.labels == ["transform:to vegetarian+double", "transform:italian", "transform:faster"]
+
+def test_result_shares_what_the_plan_did_not_change(recipes):
+    recipe = freeze(recipes[0])
+    scaled = Plan([ScaleStage(Fraction(3, 2))]).run(recipe)
+    assert isinstance(scaled, FrozenDict)
+    for key in ("title", "steps", "raw_steps", "tools", "methods"):
+        assert scaled[key] is recipe[key]
+    assert scaled["ingredients"] != recipe["ingredients"]
+    # a plan that changes nothing returns its input
+    assert Plan([ScaleStage(1)]).run(recipe) is recipe
+
+def test_plain_input_gives_the_same_result_as_frozen_input(recipes):
+    names = ("to vegetarian", "double")
+    assert compile_plan(names).run(recipes[0]) == compile_plan(names).run(freeze(recipes[0]))
+    assert thaw(compile_plan(names).run(recipes[0])) == json.loads(json.dumps(compile_plan(names).run(recipes[0])))
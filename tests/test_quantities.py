@@ -0,0 +1,50 @@
+from fractions import Fraction
+
+import pytest
+
+from quantities import amount_from_json, amount_to_json, format_amount, normalize_unit, parse_amount
+
+@pytest.mark.parametrize("quantity, amount", [
+    ("15/16", Fraction(15, 16)),
+    ("10/3", Fraction(10, 3)),
+    ("12/5", Fraction(12, 5)),
+    ("11/2", Fraction(11, 2)),
+    ("1/2", Fraction(1, 2)),
+    ("1 1/2", Fraction(3, 2)),
+    ("2  3/4", Fraction(11, 4)),
+    ("1½", Fraction(3, 2)),
+    ("1 ½", Fraction(3, 2)),
+    ("¾", Fraction(3, 4)),
+    ("0.5", Fraction(1, 2)),
+    ("1.25", Fraction(5, 4)),
+    ("0.333333333333", Fraction(333333333333, 10 ** 12)),
+    ("3", Fraction(3)),
+    (" 12 ", Fraction(12)),
+])
+def test_parse_amount(quantity, amount):
+    assert parse_amount(quantity) == amount
+
+@pytest.mark.parametrize("quantity", [None, "", "to taste", "1/0", "a few"])
+def test_parse_amount_not_a_number(quantity):
+    assert parse_amount(quantity) is None
+
+@pytest.mark.parametrize("amount, written", [
+    (Fraction(3), "3"),
+    (Fraction(1, 2), "1/2"),
+    (Fraction(3, 2), "1 1/2"),
+    (Fraction(15, 16), "15/16"),
+    (Fraction(10, 3), "3 1/3"),
+    (Fraction(1, 3) * 2 / 51, "0.01"),
+])
+def test_format_amount(amount, written):
+    assert format_amount(amount) == written
+
+@pytest.mark.parametrize("amount", [Fraction(n, d) for d in (1, 2, 3, 4, 8, 16) for n in range(1, 40)])
+def test_format_amount_round_trip(amount):
+    assert parse_amount(format_amount(amount)) == amount
+
+def test_units_and_json():
+    assert normalize_unit(" Tbsp ") == "tablespoon"
+    assert normalize_unit("handfuls of") is None
+    assert amount_from_json(amount_to_json(Fraction(7, 3))) == Fraction(7, 3)
+    assert amount_to_json(None) is None and amount_from_json(None) is None
@@ -0,0 +1,127 @@
+import glob
+import json
+import os
+import time
+
+import pytest
+
+import parse
+import recipe_cache
+from recipe_cache import RecipeCache
+
+FIXTURES = sorted(glob.glob(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                         "benchmarks", "fixtures", "*.json")))
+
+def load_recipe(path):
+    with open(path) as file:
+        return parse.find_recipe(json.load(file))
+
+@pytest.fixture
+def parses(monkeypatch):
+    # counts the recipes actually parsed, as opposed to served from the cache
+    parse.configure_segmenter("rules")
+    calls = []
+    parse_recipe = parse.parse_recipe
+
+    def counting_parse_recipe(json_data):
+        calls.append(json_data)
+        return parse_recipe(json_data)
+    monkeypatch.setattr(parse, "parse_recipe", counting_parse_recipe)
+    yield calls
+    parse.configure_segmenter("rules")
+
+def disk_files(directory):
+    return glob.glob(os.path.join(directory, "*", "*.pickle"))
+
+def test_miss_then_hit(tmp_path, parses):
+    json_data = load_recipe(FIXTURES[0])
+    cache = RecipeCache(str(tmp_path))
+    first = cache.parse_recipe(json_data)
+    assert cache.parse_recipe(json_data) is first
+    assert len(parses) == 1
+    assert cache.stats()["misses"] == 1 and cache.stats()["memory_hits"] == 1
+
+    # a new cache over the same directory reads the recipe from disk
+    other = RecipeCache(str(tmp_path))
+    assert parse.recipe_to_json(other.parse_recipe(json_data)) == parse.recipe_to_json(first)
+    assert len(parses) == 1 and other.stats()["disk_hits"] == 1
+
+def test_segmenter_change_invalidates(tmp_path, parses):
+    json_data = load_recipe(FIXTURES[0])
+    cache = RecipeCache(str(tmp_path))
+    cache.parse_recipe(json_data)
+    # the model isn't loaded until the segmenter splits something, and it doesn't get to
+    parse.configure_segmenter("sentencizer")
+    assert cache.get(cache.key(json_data)) is None
+    parse.configure_segmenter("rules")
+    assert cache.get(cache.key(json_data)) is not None
+
+def test_parser_version_change_invalidates(tmp_path, parses, monkeypatch):
+    json_data = load_recipe(FIXTURES[0])
+    RecipeCache(str(tmp_path)).parse_recipe(json_data)
+    monkeypatch.setattr(parse, "PARSER_VERSION", parse.PARSER_VERSION + 1)
+    cache = RecipeCache(str(tmp_path))
+    cache.parse_recipe(json_data)
+    assert len(parses) == 2 and cache.stats()["misses"] == 1
+
+def test_file_with_other_versions_is_ignored(tmp_path, parses):
+    # a file whose recorded versions don't match its key, e.g. copied from another setup
+    json_data = load_recipe(FIXTURES[0])
+    cache = RecipeCache(str(tmp_path))
+    key = cache.key(json_data)
+    recipe = cache.parse_recipe(json_data)
+    [path] = disk_files(str(tmp_path))
+    with open(path, "wb") as file:
+        recipe_cache.pickle.dump((recipe_cache.ENTRY_FORMAT, "parser=0", recipe), file)
+    assert RecipeCache(str(tmp_path)).get(key) is None
+    assert not os.path.exists(path)
+
+def test_old_format_file_is_ignored(tmp_path, parses):
+    json_data = load_recipe(FIXTURES[0])
+    cache = RecipeCache(str(tmp_path))
+    key = cache.key(json_data)
+    recipe = cache.parse_recipe(json_data)
+    [path] = disk_files(str(tmp_path))
+    # the format before entries recorded their versions: the bare recipe
+    with open(path, "wb") as file:
+        recipe_cache.pickle.dump(recipe, file)
+    assert RecipeCache(str(tmp_path)).get(key) is None
+
+def test_expired_file_is_dropped(tmp_path, parses):
+    json_data = load_recipe(FIXTURES[0])
+    RecipeCache(str(tmp_path)).parse_recipe(json_data)
+    [path] = disk_files(str(tmp_path))
+    old = time.time() - 3600
+    os.utime(path, (old, old))
+    cache = RecipeCache(str(tmp_path), max_age=60)
+    assert cache.get(cache.key(json_data)) is None
+    assert not os.path.exists(path)
+
+def test_memory_tier_evicts_least_recently_used(parses):
+    json_data = [load_recipe(path) for path in FIXTURES[:3]]
+    cache = RecipeCache(max_entries=2)
+    cache.parse_recipe(json_data[0])
+    cache.parse_recipe(json_data[1])
+    cache.parse_recipe(json_data[0])
+    cache.parse_recipe(json_data[2])
+    assert cache.get(cache.key(json_data[0])) is not None
+    assert cache.get(cache.key(json_data[1])) is None
+
+def test_disk_tier_evicts_least_recently_used(tmp_path, parses):
+    json_data = [load_recipe(path) for path in FIXTURES[:4]]
+    cache = RecipeCache(str(tmp_path), max_entries=1)
+    keys = [cache.key(data) for data in json_data]
+    now = time.time()
+    for i, data in enumerate(json_data[:3]):
+        cache.parse_recipe(data)
+        # distinct last-used times, oldest first
+        path = cache._path(keys[i])
+        os.utime(path, (now - 100 + i, now - 100 + i))
+    sizes = [os.path.getsize(cache._path(key)) for key in keys[:3]]
+    # room for three files: the fourth pushes out the oldest ones
+    cache.max_bytes = sum(sizes)
+    cache.parse_recipe(json_data[3])
+    kept = [os.path.exists(cache._path(key)) for key in keys]
+    assert kept[0] is False and kept[3] is True
+    assert kept == sorted(kept)
+    assert sum(os.path.getsize(path) for path in disk_files(str(tmp_path))) <= recipe_cache.EVICT_TO * cache.max_bytes
@@ -0,0 +1,79 @@
+import random
+
+import numpy as np
+import pytest
+
+from recipe_index import RecipeIndex, decode_postings, encode_postings, intersect, parse_term, recipe_terms, union
+
+def recipe(title, ingredients, tools=(), methods=()):
+    step = {"step_number": 1, "text": "", "ingredients": list(ingredients), "tools": list(tools),
+            "methods": list(methods), "time": {"duration": None, "condition": None}}
+    return {"title": title, "ingredients": [{"name": name} for name in ingredients],
+            "tools": [], "methods": [], "steps": [step]}
+
+RECIPES = [
+    recipe("Pulled Pork", ["Pork Shoulder", "salt"], ["Dutch  Oven"], ["braise"]),
+    recipe("Pork Chops", ["pork chops", "salt"], ["skillet"], ["sear"]),
+    recipe("Braised Greens", ["collard greens"], ["dutch oven"], ["braise"]),
+    recipe("Toast", ["bread", "butter"], [], []),
+]
+
+@pytest.fixture
+def index():
+    index = RecipeIndex()
+    index.add_many(RECIPES)
+    return index
+
+def test_terms_are_normalized():
+    assert recipe_terms(RECIPES[0]) == {"ingredient:pork shoulder", "ingredient:salt", "tool:dutch oven", "method:braise"}
+    assert parse_term("Tool: Dutch Oven") == "tool:dutch oven"
+    with pytest.raises(ValueError):
+        parse_term("dutch oven")
+    with pytest.raises(ValueError):
+        parse_term("pan:skillet")
+
+def test_queries_match_a_scan(index):
+    assert index.all_of("tool:dutch oven", "method:braise").tolist() == [0, 2]
+    assert index.all_of("ingredient:salt", "tool:skillet").tolist() == [1]
+    assert index.any_of("ingredient:bread", "ingredient:pork chops").tolist() == [1, 3]
+    assert index.query(["method:braise"], ["ingredient:salt", "ingredient:bread"]).tolist() == [0]
+    assert index.all_of("ingredient:tofu").tolist() == []
+    assert index.query().tolist() == []
+    assert [index.keys[i] for i in index.all_of("ingredient:salt")] == ["Pulled Pork", "Pork Chops"]
+
+def test_terms_lookup(index):
+    assert index.terms("tool") == ["tool:dutch oven", "tool:skillet"]
+    assert index.terms(contains="pork") == ["ingredient:pork chops", "ingredient:pork shoulder"]
+
+def test_save_load_and_add_more(index, tmp_path):
+    path = str(tmp_path / "recipes.idx")
+    index.save(path)
+    loaded = RecipeIndex.load(path)
+    assert len(loaded) == 4 and loaded.keys == index.keys
+    assert loaded.terms() == index.terms()
+    for term in index.terms():
+        assert loaded.postings(term).tolist() == index.postings(term).tolist()
+    # recipes added after loading get the next ids and survive another save
+    assert loaded.add(recipe("Pork Stew", ["pork shoulder"], ["dutch oven"], ["braise"])) == 4
+    loaded.save(path)
+    assert RecipeIndex.load(path).all_of("ingredient:pork shoulder", "tool:dutch oven").tolist() == [0, 4]
+
+def test_newer_format_is_rejected(index):
+    data = bytearray(index.to_bytes())
+    data[4] = 99
+    with pytest.raises(ValueError, match="newer"):
+        RecipeIndex.from_bytes(bytes(data))
+
+@pytest.mark.parametrize("ids", [[], [0], [0, 1, 127, 128, 16383, 16384, 2 ** 32 - 1], list(range(0, 10 ** 6, 997))])
+def test_postings_round_trip(ids):
+    assert decode_postings(encode_postings(ids), len(ids)).tolist() == ids
+
+def test_intersect_and_union_match_sets():
+    random.seed(0)
+    long = np.array(sorted(random.sample(range(100000), 20000)), dtype=np.uint32)
+    short = np.array(sorted(random.sample(range(100000), 50)), dtype=np.uint32)
+    middle = np.array(sorted(random.sample(range(100000), 5000)), dtype=np.uint32)
+    # the long list is looked up by binary search, the others merged
+    assert intersect(long, short).tolist() == sorted(set(long.tolist()) & set(short.tolist()))
+    assert intersect(long, middle, short).tolist() == sorted(set(long.tolist()) & set(middle.tolist()) & set(short.tolist()))
+    assert union(short, middle).tolist() == sorted(set(short.tolist()) | set(middle.tolist()))
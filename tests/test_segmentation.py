@@ -0,0 +1,73 @@
+import pytest
+
+import parse
+from segmentation import BACKENDS, RuleSegmenter, Segmenter, SpacySegmenter, create_segmenter
+
+@pytest.fixture(autouse=True)
+def restore_segmenter(monkeypatch):
+    monkeypatch.setattr(parse, "_segmenter", None)
+    monkeypatch.delenv("RECIPE_SEGMENTER", raising=False)
+
+@pytest.mark.parametrize("backend", list(BACKENDS))
+def test_backends_are_created_without_loading_a_pipeline(backend):
+    segmenter = create_segmenter(backend)
+    assert segmenter.name == backend
+    if isinstance(segmenter, SpacySegmenter):
+        assert segmenter._nlp is None
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(ValueError, match="rules"):
+        create_segmenter("punkt")
+
+def test_backend_comes_from_the_environment(monkeypatch):
+    monkeypatch.setenv("RECIPE_SEGMENTER", "sentencizer")
+    assert parse.get_segmenter().name == "sentencizer"
+    assert parse.get_segmenter() is parse.get_segmenter()
+
+def test_configure_segmenter_overrides_the_environment(monkeypatch):
+    monkeypatch.setenv("RECIPE_SEGMENTER", "sentencizer")
+    assert parse.configure_segmenter("rules") is parse.get_segmenter()
+    assert parse.get_segmenter().name == "rules"
+
+def test_default_backend_is_the_model():
+    assert parse.get_segmenter().name == "model"
+
+def test_parse_steps_uses_the_configured_segmenter(monkeypatch):
+    class Splitter(Segmenter):
+        name = "test"
+
+        def __init__(self):
+            self.texts = []
+
+        def split(self, text):
+            self.texts.append(text)
+            return text.split(" | ")
+
+    splitter = Splitter()
+    monkeypatch.setattr(parse, "_segmenter", splitter)
+    json_data = {"recipeInstructions": [{"text": "Boil the water | Add the pasta; stir."}]}
+    raw_steps, steps = parse.parse_steps(json_data, ["pasta"])
+    assert splitter.texts == ["Boil the water | Add the pasta; stir."]
+    assert [step.text for step in steps] == ["Boil the water", "Add the pasta", "stir."]
+
+@pytest.mark.parametrize("text, sentences", [
+    ("Preheat the oven. Bake for 20 minutes.", ["Preheat the oven.", "Bake for 20 minutes."]),
+    ("Add approx. 2 cups. Stir!", ["Add approx. 2 cups.", "Stir!"]),
+    ("Add 1 tsp. Salt and stir.", ["Add 1 tsp. Salt and stir."]),
+    ("Whisk the eggs.\nFold in the flour", ["Whisk the eggs.", "Fold in the flour"]),
+    ("Season (to taste.) Serve hot.", ["Season (to taste.)", "Serve hot."]),
+    ("cook until done. then serve.", ["cook until done. then serve."]),
+    ("", []),
+])
+def test_rule_segmenter(text, sentences):
+    assert RuleSegmenter().split(text) == sentences
+
+def test_split_many_keeps_order():
+    texts = ["One. Two.", "Three."]
+    assert list(RuleSegmenter().split_many(texts)) == [["One.", "Two."], ["Three."]]
+
+def test_sentencizer_splits_without_a_model():
+    pytest.importorskip("spacy")
+    segmenter = create_segmenter("sentencizer")
+    assert segmenter.split("Preheat the oven. Bake for 20 minutes.") == ["Preheat the oven.", "Bake for 20 minutes."]
+    assert list(segmenter.split_many(["One. Two.", "Three."])) == [["One.", "Two."], ["Three."]]
@@ -0,0 +1,56 @@
+import glob
+import json
+import os
+from fractions import Fraction
+
+import pytest
+
+import parse
+from quantities import parse_amount
+from representation import Ingredient, Recipe, Step
+from serialization import SCHEMA_VERSION, decode_recipe, decode_recipes, encode_recipe, encode_recipes, json_to_recipe
+
+FIXTURES = sorted(glob.glob(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks", "fixtures", "*.json")))
+
+@pytest.fixture(scope="module")
+def recipes():
+    parse.configure_segmenter("rules")
+    parsed = []
+    for path in FIXTURES:
+        with open(path) as file:
+            parsed.append(parse.parse_recipe(parse.find_recipe(json.load(file))))
+    return parsed
+
+def make_recipe(quantity):
+    ingredient = Ingredient("sugar", quantity, "cup", None, None, parse_amount(quantity), "cup")
+    step = Step(1, "Add the sugar.", ["sugar"], ["bowl"], ["add"], {"duration": None, "condition": None})
+    return Recipe("Test", [f"{quantity} cup sugar"], [ingredient], ["Add the sugar."], [step])
+
+def test_amount_too_large_for_32_bits_round_trips():
+    recipe = make_recipe("0.333333333333")
+    assert recipe.ingredients[0].amount == Fraction(333333333333, 10 ** 12)
+    decoded = decode_recipe(encode_recipe(recipe))
+    assert decoded.ingredients[0].amount == Fraction(333333333333, 10 ** 12)
+    assert decoded.ingredients[0].quantity == "0.333333333333"
+
+def test_small_amounts_round_trip():
+    decoded = decode_recipes(encode_recipes([make_recipe("1 1/2"), make_recipe("0.333333333333")]))
+    assert [recipe.ingredients[0].amount for recipe in decoded] == [Fraction(3, 2), Fraction(333333333333, 10 ** 12)]
+
+def test_fixtures_round_trip_through_json(recipes):
+    for recipe in recipes:
+        as_json = parse.recipe_to_json(recipe)
+        assert parse.recipe_to_json(json_to_recipe(json.loads(json.dumps(as_json)))) == as_json
+
+def test_fixtures_round_trip_through_the_binary_encoding(recipes):
+    decoded = decode_recipes(encode_recipes(recipes))
+    assert [parse.recipe_to_json(recipe) for recipe in decoded] == [parse.recipe_to_json(recipe) for recipe in recipes]
+    assert parse.recipe_to_json(decode_recipe(encode_recipe(recipes[0]))) == parse.recipe_to_json(recipes[0])
+
+def test_newer_schema_is_rejected(recipes):
+    data = bytearray(encode_recipes(recipes[:1]))
+    data[4:6] = (SCHEMA_VERSION + 1).to_bytes(2, "little")
+    with pytest.raises(ValueError, match="newer"):
+        decode_recipes(bytes(data))
+    with pytest.raises(ValueError):
+        decode_recipes(b"JUNK" + bytes(data[4:]))
@@ -0,0 +1,53 @@
+import asyncio
+import glob
+import os
+
+from aiohttp.test_utils import TestClient, TestServer
+
+import parse
+import service
+
+FIXTURES = sorted(glob.glob(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks", "fixtures", "*.json")))
+
+def post_all(requests):
+    """
+    Runs the (path, keyword arguments) requests against a fresh service; returns [(status, json)].
+    """
+    async def run():
+        # the regex segmenter, so the service starts without a spaCy model
+        parse.configure_segmenter("rules")
+        async with TestClient(TestServer(service.RecipeService().app)) as client:
+            results = []
+            for path, options in requests:
+                response = await client.post(path, **options)
+                results.append((response.status, await response.json()))
+            return results
+    return asyncio.run(run())
+
+def test_invalid_body_is_a_client_error():
+    results = post_all([
+        ("/parse", {"data": b"\xff\xfe not utf-8", "headers": {"Content-Type": "application/json; charset=utf-8"}}),
+        ("/parse", {"data": "{not json"}),
+        ("/transform", {"json": ["a list"]}),
+    ])
+    assert [status for status, _ in results] == [400, 400, 400]
+
+def test_malformed_recipe_is_rejected():
+    results = post_all([
+        ("/transform", {"json": {"recipe": {"title": "x"}, "transformation": "to vegetarian"}}),
+        ("/transform", {"json": {"recipe": "not a recipe", "transformation": "double"}}),
+        ("/transform", {"json": {"recipe": {"title": "x", "raw_ingredients": [], "tools": [], "methods": [], "raw_steps": [],
+                                            "ingredients": [{"name": "salt"}], "steps": []}, "transformation": "double"}}),
+    ])
+    assert [status for status, _ in results] == [422, 422, 422]
+    assert "missing" in results[0][1]["error"]
+
+def test_parsed_recipe_can_be_transformed():
+    with open(FIXTURES[0]) as file:
+        json_ld = file.read()
+    (status, parsed), = post_all([("/parse", {"json": {"json_ld": json_ld}})])
+    assert status == 200
+    service.check_recipe(parsed["recipe"])
+    (status, transformed), = post_all([("/transform", {"json": {"recipe": parsed["recipe"], "transformation": "double"}})])
+    assert status == 200
+    assert transformed["transformations"] == ["double"]
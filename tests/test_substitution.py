@@ -0,0 +1,47 @@
+import pytest
+
+from substitution import SubstitutionTable
+
+CHEESE = {"cheese": "vegan cheese", "cottage cheese": "crumbled tofu", "cheddar": "vegan cheddar"}
+
+def test_longest_key_wins():
+    table = SubstitutionTable(CHEESE)
+    assert table.apply("cottage cheese and cheese") == "crumbled tofu and vegan cheese"
+
+def test_replacements_do_not_cascade():
+    table = SubstitutionTable({"cheese": "vegan cheese", "vegan": "plant-based"})
+    assert table.apply("cheese") == "vegan cheese"
+    assert table.apply("vegan cheese") == "plant-based vegan cheese"
+
+def test_result_does_not_depend_on_key_order():
+    keys = list(CHEESE.items())
+    text = "grated cheddar cheese over cottage cheese"
+    assert SubstitutionTable(dict(keys)).apply(text) == SubstitutionTable(dict(reversed(keys))).apply(text)
+
+def test_first_mapping_wins_for_a_repeated_key():
+    table = SubstitutionTable({"beef": "seitan"}, {"beef": "tofu", "pork": "jackfruit"})
+    assert table.apply("beef and pork") == "seitan and jackfruit"
+
+def test_whole_words_and_case():
+    table = SubstitutionTable({"salt": "herbs"}, whole_words=True, ignore_case=True)
+    assert table.apply("Salt the saltine") == "herbs the saltine"
+    assert SubstitutionTable({"salt": "herbs"}).apply("Salt the saltine") == "Salt the herbsine"
+
+def test_apply_all_and_hits():
+    table = SubstitutionTable(CHEESE)
+    assert table.apply_all(["cheese", "bread"]) == ["vegan cheese", "bread"]
+    assert table.apply_with_hits("cheddar cheese") == ("vegan cheddar vegan cheese", {"cheddar", "cheese"})
+    assert table.apply_with_hits("bread") == ("bread", set())
+
+@pytest.mark.parametrize("text, expected", [
+    ("cheddar cheese", ("vegan cheddar cheese", "cheddar")),
+    ("cottage cheese", ("crumbled tofu", "cottage cheese")),
+    ("bread", ("bread", None)),
+])
+def test_apply_longest_replaces_one_key(text, expected):
+    assert SubstitutionTable(CHEESE).apply_longest(text) == expected
+
+def test_empty_table_leaves_text_alone():
+    table = SubstitutionTable({})
+    assert table.apply("cheese") == "cheese"
+    assert table.apply_longest("cheese") == ("cheese", None)
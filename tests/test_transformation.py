@@ -0,0 +1,9 @@
+from transformation import compile_plan, parse_transformations
+
+def test_same_transform_named_twice_is_applied_once():
+    assert parse_transformations("make it faster and speed it up") == ("faster",)
+    assert parse_transformations("to vegetarian and double and to vegetarian") == ("to vegetarian", "double")
+    assert compile_plan(parse_transformations("speed it up, faster")).labels == ["transform:speed"]
+
+def test_order_and_unknown_names_are_kept():
+    assert parse_transformations(["half", "speed", "unknown", "faster"]) == ("half", "speed", "unknown")
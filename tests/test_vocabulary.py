@@ -0,0 +1,66 @@
+import glob
+import json
+import os
+import re
+
+import pytest
+
+import parse
+from vocabulary import VOCABULARY, VocabularyMatcher, get_matcher, trie_pattern
+
+FIXTURES = sorted(glob.glob(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks", "fixtures", "*.json")))
+
+def findall(terms, text):
+    # the per-list regex the matcher replaces
+    return re.findall(r"\b(" + "|".join(terms) + r")\b", text)
+
+def fixture_texts():
+    texts = []
+    for path in FIXTURES:
+        with open(path) as file:
+            json_data = parse.find_recipe(json.load(file))
+        texts += [line.lower() for line in json_data["recipeIngredient"]]
+        texts += [step["text"].lower() for step in json_data["recipeInstructions"] if isinstance(step, dict)]
+    return texts
+
+@pytest.mark.parametrize("text", [
+    "preheat the oven and whisk in a mixing bowl",
+    "deep-fry or deep fry in a pot; stir with a slotted spoon",
+    "finely chopped, roughly chopped and sliced thinly",
+    "boneless, skinless chicken in a baking pan lined with aluminum foil",
+    "the ovenproof skillet",
+    "",
+])
+def test_matches_the_regexes_it_replaces(text):
+    found = get_matcher().match(text)
+    for kind, terms in VOCABULARY.items():
+        assert found[kind] == findall(terms, text), kind
+
+def test_matches_the_regexes_on_the_fixtures():
+    matcher = get_matcher()
+    texts = fixture_texts()
+    assert texts
+    for text in texts:
+        found = matcher.match(text)
+        for kind, terms in VOCABULARY.items():
+            assert found[kind] == findall(terms, text), (kind, text)
+
+def test_first_listed_term_wins_at_the_same_word():
+    matcher = VocabularyMatcher({"tools": ["bowl", "bowl of water"], "preparations": ["chopped", "chopped fine"]})
+    assert matcher.match("a bowl of water, chopped fine") == {"tools": ["bowl"], "preparations": ["chopped"]}
+
+def test_kinds_match_independently():
+    # "whisk" is both a tool and a method
+    found = get_matcher().match("whisk with a whisk")
+    assert found["tools"] == ["whisk", "whisk"] and found["methods"] == ["whisk", "whisk"]
+
+@pytest.mark.parametrize("words, text, longest", [
+    (["bake", "baking", "baker", "bak"], "bakings", "baking"),
+    (["cup", "cups", "c"], "cupsful", "cups"),
+    (["a.b", "a+b", "(x)"], "a+bc", "a+b"),
+])
+def test_trie_pattern_matches_the_same_words_longest_first(words, text, longest):
+    regex = re.compile(trie_pattern(words))
+    assert all(regex.fullmatch(word) for word in words)
+    assert regex.match(text).group(0) == longest
+    assert not regex.fullmatch("zzz")
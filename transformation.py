@@ -1,165 +1,244 @@
-from italian_transform import transform_recipe_to_italian
-from veg_transform import transform_recipe_to_veg, transform_recipe_from_veg
-from speed_transform import transform_recipe_faster
+from italian_transform import TO_ITALIAN
+from veg_transform import TO_VEG, FROM_VEG
+from speed_transform import FASTER
+from pipeline import Plan, Stage
+from quantities import QUANTITY_PATTERN, amount_from_json, amount_to_json, format_amount, parse_amount
+from substitution import SubstitutionTable
+from fractions import Fraction
+from functools import lru_cache
 import re
 
-# parse user input to get transformation
+# quantity at the start of a raw ingredient line
+LEADING_QUANTITY_REGEX = re.compile(r"(" + QUANTITY_PATTERN + r")")
+
+# healthy substitutions, keyed by lowercase whole words
+to_healthy_ingredients = {
+    'butter': 'unsalted butter',
+    'white sugar': 'honey or maple syrup',
+    'brown sugar': 'honey or maple syrup',
+    'sugar': 'honey or maple syrup',
+    'cream': 'low-fat yogurt',
+    'yogurt': 'low-fat yogurt',
+    'cottage cheese': 'low-fat cottage cheese',
+    'whole milk': 'almond milk or fat-free milk',
+    'white flour': 'whole wheat flour',
+    'flour': 'whole wheat flour',
+    'salt': 'low-sodium salt or herbs',
+    'cheese': 'low-fat cheese',
+    'chocolate': 'dark chocolate',
+    'mayonnaise': 'greek yogurt',
+    'olive oil': 'avocado oil',
+    'bacon': 'turkey bacon or ham',
+    'half-and-half': 'almond or skim milk',
+    'fried': 'baked'
+}
+to_healthy_steps = {
+    'deep fry': 'bake',
+    'fry': 'bake',
+    'cream': 'low-fat yogurt',
+    'boil in cream': 'steam'
+}
+unhealthy_descriptors = ['low-fat', 'fat-free', 'reduced-fat', 'light']
+from_healthy_ingredients = {
+    'greek yogurt': 'mayonnaise',
+    'low-fat yogurt': 'cream',
+    'cottage cheese': 'cream cheese',
+    'fat-free milk': 'whole milk',
+    'almond milk': 'whole milk',
+    'stevia': 'sugar',
+    'honey': 'sugar',
+    'maple syrup': 'sugar',
+    'whole wheat flour': 'white flour',
+    'quinoa': 'white rice',
+    'baked': 'fried',
+    'grilled': 'fried',
+    'olive oil': 'butter',
+    'low-sodium salt': 'salt',
+    'dark chocolate': 'milk chocolate'
+}
+from_healthy_steps = {
+    'bake': 'deep fry',
+    'grill': 'pan fry',
+    'saute in olive oil': 'fry in butter',
+    'steam': 'boil in cream'
+}
+
+TO_HEALTHY_INGREDIENTS = SubstitutionTable(to_healthy_ingredients, whole_words=True, ignore_case=True)
+FROM_HEALTHY_INGREDIENTS = SubstitutionTable(from_healthy_ingredients, whole_words=True, ignore_case=True)
+UNHEALTHY_DESCRIPTOR_REGEX = re.compile(r"\b(?:" + "|".join(map(re.escape, unhealthy_descriptors)) + r")\b\s*", re.IGNORECASE)
+
+@lru_cache(maxsize=64)
+def healthy_step_table(ingredient_hits):
+    """
+    Returns the step table for to_healthy: the step substitutions plus every ingredient substitution
+    that was applied to the ingredient list, compiled into a single table.
+
+    Args:
+        ingredient_hits (frozenset): lowercase ingredient keys that were replaced.
+    """
+    replaced = {key: to_healthy_ingredients[key] for key in ingredient_hits}
+    return SubstitutionTable(to_healthy_steps, replaced, whole_words=True, ignore_case=True)
+
+@lru_cache(maxsize=64)
+def unhealthy_step_table(ingredient_hits):
+    """
+    Returns the step table for from_healthy; see healthy_step_table.
+    """
+    replaced = {key: from_healthy_ingredients[key] for key in ingredient_hits}
+    return SubstitutionTable(from_healthy_steps, replaced, whole_words=True, ignore_case=True)
+
+class HealthyStage(Stage):
+    """
+    Pipeline stage for to_healthy / from_healthy. Steps are rewritten with the step substitutions
+    plus the ingredient substitutions that were applied to this recipe's ingredient lines.
+
+    Args:
+        substitutions (SubstitutionTable): applied to raw ingredient lines.
+        step_table (function): frozenset of ingredient hits -> SubstitutionTable for raw steps.
+        descriptor_regex (re.Pattern or None): descriptors removed from ingredient lines first.
+    """
+    def __init__(self, substitutions, step_table, descriptor_regex=None):
+        self.substitutions = substitutions
+        self.step_table = step_table
+        self.descriptor_regex = descriptor_regex
+        self.hits = set()
+        self.steps = None
+
+    def start(self):
+        return HealthyStage(self.substitutions, self.step_table, self.descriptor_regex)
+
+    def raw_ingredient(self, text):
+        if self.descriptor_regex is not None:
+            text = self.descriptor_regex.sub('', text).strip()
+        text, hits = self.substitutions.apply_with_hits(text)
+        self.hits |= hits
+        return text
+
+    def raw_step(self, text):
+        if self.steps is None:
+            self.steps = self.step_table(frozenset(self.hits))
+        return self.steps.apply(text)
+
+class ScaleStage(Stage):
+    """
+    Pipeline stage that multiplies every ingredient amount by factor and rewrites the leading
+    quantity of the matching raw ingredient line.
+    """
+    def __init__(self, factor):
+        self.factor = Fraction(factor)
+
+    def merge(self, other):
+        if isinstance(other, ScaleStage):
+            return ScaleStage(self.factor * other.factor)
+        return None
+
+    def ingredient_line(self, ingredient, raw_line):
+        if ingredient is None:
+            return ingredient, raw_line
+        original_amount = amount_from_json(ingredient.get('amount'))
+        if original_amount is None:
+            return ingredient, raw_line  # e.g. "to taste"
+        amount = original_amount * self.factor
+        ingredient = dict(ingredient, amount=amount_to_json(amount), quantity=format_amount(amount))
+        # rewrite the leading quantity of the matching raw ingredient line
+        if raw_line is not None:
+            match = LEADING_QUANTITY_REGEX.match(raw_line)
+            if match and parse_amount(match.group(1)) == original_amount:
+                raw_line = ingredient['quantity'] + raw_line[match.end(1):]
+        return ingredient, raw_line
+
+TO_HEALTHY = HealthyStage(TO_HEALTHY_INGREDIENTS, healthy_step_table)
+FROM_HEALTHY = HealthyStage(FROM_HEALTHY_INGREDIENTS, unhealthy_step_table, UNHEALTHY_DESCRIPTOR_REGEX)
+
+# transforms by the name users ask for them with
+TRANSFORMS = {
+    'to vegetarian': TO_VEG,
+    'from vegetarian': FROM_VEG,
+    'to healthy': TO_HEALTHY,
+    'from healthy': FROM_HEALTHY,
+    'italian': TO_ITALIAN,
+    'double': ScaleStage(2),
+    'half': ScaleStage(Fraction(1, 2)),
+    'faster': FASTER,
+    'speed': FASTER,
+}
+TRANSFORM_MESSAGES = {
+    'to vegetarian': "Transforming {title} to vegetarian...",
+    'from vegetarian': "Transforming {title} from vegetarian...",
+    'to healthy': "Transforming {title} to healthy...",
+    'from healthy': "Transforming {title} from healthy...",
+    'italian': "Transforming {title} to Italian...",
+    'double': "Doubling amounts for {title}...",
+    'half': "Halving amounts for {title}...",
+    'faster': "Speeding up Recipe for {title}...",
+    'speed': "Speeding up Recipe for {title}...",
+}
+TRANSFORM_REGEX = re.compile("|".join(re.escape(name) for name in sorted(TRANSFORMS, key=len, reverse=True)))
+
+def parse_transformations(transformation):
+    """
+    Returns the transforms a request asks for, in the order they should be applied.
+
+    Args:
+        transformation (str or list of str): user input such as "to vegetarian and double", or a list of transform names.
+    Returns:
+        names (tuple of str): transform names, keys of TRANSFORMS, each transform only once
+                              ("faster and speed it up" gives ("faster",)).
+    """
+    names = TRANSFORM_REGEX.findall(transformation) if isinstance(transformation, str) else transformation
+    unique = {}
+    for name in names:
+        # names of the same transform (faster, speed) count as one; unknown names are kept for the caller to reject
+        unique.setdefault(TRANSFORMS.get(name, name), name)
+    return tuple(unique.values())
+
+@lru_cache(maxsize=128)
+def compile_plan(names):
+    """
+    Returns the fused Plan for a tuple of transform names; plans are cached per combination.
+    """
+    return Plan([TRANSFORMS[name] for name in names], names)
+
+# parse user input to get transformation(s) and apply them in order
 def transform(transformation, jsn):
-    if 'to vegetarian' in transformation:
-        return to_veg(jsn)
-    elif 'from vegetarian' in transformation:
-        return from_veg(jsn)
-    elif 'to healthy' in transformation:
-        return to_healthy(jsn)
-    elif 'from healthy' in transformation:
-        return from_healthy(jsn)
-    elif 'italian' in transformation:
-        return to_italian(jsn)
-    elif 'double' in transformation:
-        return double_or_half(2, jsn)
-    elif 'half' in transformation:
-        return double_or_half(0.5, jsn)
-    elif 'faster' in transformation or 'speed' in transformation:
-        return faster(jsn)
-    else:
+    names = parse_transformations(transformation)
+    if not names or any(name not in TRANSFORMS for name in names):
         print('Invalid transformation request.')
         return None
+    for name in names:
+        print(TRANSFORM_MESSAGES[name].format(title=jsn['title']))
+    return compile_plan(names).run(jsn)
 
 # make the recipe vegetarian
 def to_veg(recipe):
-    print(f"Transforming {recipe['title']} to vegetarian...")
-    return transform_recipe_to_veg(recipe)
+    return transform(['to vegetarian'], recipe)
 
 # make the recipe non-vegetarian
 def from_veg(recipe):
-    print(f"Transforming {recipe['title']} from vegetarian...")
-    return transform_recipe_from_veg(recipe)
+    return transform(['from vegetarian'], recipe)
 
 # make the recipe healthy
 def to_healthy(recipe):
-    print(f"Transforming {recipe['title']} to healthy...")
-    ing_substitutions = {
-        'butter': 'unsalted butter',
-        'white sugar': 'honey or maple syrup',
-        'brown sugar': 'honey or maple syrup',
-        'sugar': 'honey or maple syrup',
-        'cream': 'low-fat yogurt',
-        'yogurt': 'low-fat yogurt',
-        'cottage cheese': 'low-fat cottage cheese',
-        'whole milk': 'almond milk or fat-free milk',
-        'white flour': 'whole wheat flour',
-        'flour': 'whole wheat flour',
-        'salt': 'low-sodium salt or herbs',
-        'cheese': 'low-fat cheese',
-        'chocolate': 'dark chocolate',
-        'mayonnaise': 'greek yogurt',
-        'olive oil': 'avocado oil',
-        'bacon': 'turkey bacon or ham',
-        'half-and-half': 'almond or skim milk',
-        'fried': 'baked'
-    }
-    step_substitutions = {
-        'deep fry': 'bake',
-        'fry': 'bake',
-        'cream': 'low-fat yogurt',
-        'boil in cream': 'steam'
-    }
-    replacements = {}
-    for i, text in enumerate(recipe['raw_ingredients']):
-        for unhealthy, healthy in ing_substitutions.items():
-            if unhealthy in text.lower():
-                text = re.sub(rf'\b{unhealthy}\b', healthy, text, flags=re.IGNORECASE)
-                replacements[unhealthy] = healthy
-        recipe['raw_ingredients'][i] = text
-    for i, step in enumerate(recipe['raw_steps']):
-        for unhealthy, healthy in step_substitutions.items():
-            if unhealthy in text.lower():
-                step = re.sub(rf'\b{unhealthy}\b', healthy, step, flags=re.IGNORECASE)
-        for unhealthy, healthy in replacements.items():
-            if unhealthy in step.lower():
-                step = re.sub(rf'\b{unhealthy}\b', healthy, step, flags=re.IGNORECASE)
-        recipe['raw_steps'][i] = step
-    return recipe
+    return transform(['to healthy'], recipe)
 
 # make the recipe unhealthy
 def from_healthy(recipe):
-    print(f"Transforming {recipe['title']} from healthy...")
-    descriptors = ['low-fat', 'fat-free', 'reduced-fat', 'light']
-    ing_substitutions = {
-        'greek yogurt': 'mayonnaise',
-        'low-fat yogurt': 'cream',
-        'cottage cheese': 'cream cheese',
-        'fat-free milk': 'whole milk',
-        'almond milk': 'whole milk',
-        'stevia': 'sugar',
-        'honey': 'sugar',
-        'maple syrup': 'sugar',
-        'whole wheat flour': 'white flour',
-        'quinoa': 'white rice',
-        'baked': 'fried',
-        'grilled': 'fried',
-        'olive oil': 'butter',
-        'low-sodium salt': 'salt',
-        'dark chocolate': 'milk chocolate'
-    }
-    step_substitutions = {
-        'bake': 'deep fry',
-        'grill': 'pan fry',
-        'saute in olive oil': 'fry in butter',
-        'steam': 'boil in cream'
-    }
-    replacements = {}
-    for i, text in enumerate(recipe['raw_ingredients']):
-        for descriptor in descriptors:
-            if descriptor in text.lower():
-                text = re.sub(rf'\b{descriptor}\b', '', text, flags=re.IGNORECASE).strip()
-        for healthy, unhealthy in ing_substitutions.items():
-            if healthy in text.lower():
-                text = re.sub(rf'\b{healthy}\b', unhealthy, text, flags=re.IGNORECASE)
-                replacements[healthy] = unhealthy
-        recipe['raw_ingredients'][i] = text
-    for i, step in enumerate(recipe['raw_steps']):
-        for healthy, unhealthy in step_substitutions.items():
-            if healthy in step.lower():
-                step = re.sub(rf'\b{healthy}\b', unhealthy, step, flags=re.IGNORECASE)
-        for healthy, unhealthy in replacements.items():
-            if healthy in step.lower():
-                step = re.sub(rf'\b{healthy}\b', unhealthy, step, flags=re.IGNORECASE)
-        recipe['raw_steps'][i] = step
-    return recipe
+    return transform(['from healthy'], recipe)
 
 # make the recipe italian
 def to_italian(recipe):
-    print(f"Transforming {recipe['title']} to Italian...")
     # assumes recipe is in JSON format
-    return transform_recipe_to_italian(recipe)
-    
+    return transform(['italian'], recipe)
+
 # increase or reduce the recipe size
 def double_or_half(factor, recipe):
+    factor = Fraction(factor)
     if factor == 2:
         print(f"Doubling amounts for {recipe['title']}...")
-        for ingredient in recipe['ingredients']:
-            if ingredient['quantity']:
-                if ingredient['quantity'] not in ['to taste', 'or to taste']:
-                    ingredient['quantity'] = float(ingredient['quantity']) * 2
     else:
         print(f"Halving amounts for {recipe['title']}...")
-        for ingredient in recipe['ingredients']:
-            if ingredient['quantity']:
-                if ingredient['quantity'] not in ['to taste', 'or to taste']:
-                    ingredient['quantity'] = float(ingredient['quantity']) / 2
-    for i, text in enumerate(recipe['raw_ingredients']):
-        ing = recipe['ingredients'][i]
-        match = re.match(r"(\d+/\d+|\d+\.\d+|\d+)", text)
-        if match:
-            original_quantity = float(eval(match.group(1)))
-            if factor == 2 and ing['quantity'] == original_quantity * 2:
-                recipe['raw_ingredients'][i] = text.replace(match.group(1), str(ing['quantity']), 1)
-            elif factor == 0.5 and ing['quantity'] == original_quantity / 2:
-                recipe['raw_ingredients'][i] = text.replace(match.group(1), str(ing['quantity']), 1)
-    return recipe
+    return Plan([ScaleStage(factor)]).run(recipe)
 
 # make the recipe faster
 def faster(recipe):
-    print(f"Speeding up Recipe for {recipe['title']}...")
-    return transform_recipe_faster(recipe)
+    return transform(['faster'], recipe)
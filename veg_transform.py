@@ -1,5 +1,7 @@
 import json
-from parse import fetch_recipe, extract_json_ld, parse_recipe, recipe_to_json
+from pipeline import Plan, Stage
+from substitution import SubstitutionTable
+from parse import fetch_recipe_json, parse_recipe, recipe_to_json
 
 # Ingredient substitution mapping for non-vegetarian to vegetarian
 ingredient_mapping = {
@@ -235,110 +237,94 @@ inv_ingredient_mapping = {
     "zein": "shellac",
 }
 
-def replace_items(strings, mappings):
+# compiled substitution tables for each direction
+to_veg_substitutions = SubstitutionTable(ingredient_mapping)
+from_veg_substitutions = SubstitutionTable(inv_ingredient_mapping)
+
+def to_veg_ingredient(ingredient):
     """
-    Replace all occurrences of items in strings based on given mappings.
-    Intended to be used to update all ingredients, tools, methods referenced in recipe steps with transformed equivalent.
-    
-    Args:
-        strings (list): List of strings to process i.e. recipe steps.
-        mappings (list of dicts): List of dictionaries, where each dictionary contains items to replace as keys and their replacements as values.
-                                  Ex: replace ingredients, methods, tools.
-        
-    Returns:
-        updated_strings: List of strings with replacements applied.
+    Returns the vegetarian version of a parsed ingredient dict (the same dict if nothing matches).
     """
-    updated_strings = []
-    for string in strings:
-        for mapping in mappings:
-            for key, new in mapping.items():
-                string = string.replace(key, new)  # Replace each old item with the new one, non case sensitive
-        updated_strings.append(string)
-    return updated_strings
+    # Clean the ingredient name by removing punctuation and whitespace
+    clean_name = ingredient["name"].lower().strip().rstrip(',.')
 
-def transform_recipe_to_veg(recipe):
+    name, hit = to_veg_substitutions.apply_longest(clean_name)
+    if hit:
+        return {
+            "name": name,
+            "quantity": ingredient["quantity"],
+            "measurement": ingredient["measurement"],
+            "descriptor": ingredient["descriptor"],
+            "preparation": ingredient["preparation"],
+            "amount": ingredient["amount"],
+            "unit": ingredient["unit"]
+        }
+    return ingredient
+
+def from_veg_ingredient(ingredient):
     """
-    Transforms a parsed JSON recipe representation into a vegetarian recipe.
+    Returns the non-vegetarian version of a parsed ingredient dict.
     """
-    transformed_recipe = recipe.copy()
+    # Clean the ingredient name by removing punctuation and whitespace
+    clean_name = ingredient["name"].lower().strip().rstrip(',.')
 
-    # Transform raw_ingredients
-    transformed_recipe["raw_ingredients"] = replace_items(recipe["raw_ingredients"], [ingredient_mapping])
+    name, hit = from_veg_substitutions.apply_longest(clean_name)
+    if hit:
+        name = name.replace('vegan', '').replace('vegetarian', '')
+    else:
+        name = ingredient["name"].replace('vegetarian', '').replace('vegan', '')
+    return {
+        "name": name,
+        "quantity": ingredient["quantity"],
+        "measurement": ingredient["measurement"],
+        "descriptor": ingredient["descriptor"],
+        "preparation": ingredient["preparation"],
+        "amount": ingredient["amount"],
+        "unit": ingredient["unit"]
+    }
 
-    # Transform ingredients
-    transformed_ingredients = []
-    for ingredient in recipe["ingredients"]:
-        # Clean the ingredient name by removing punctuation and whitespace
-        clean_name = ingredient["name"].lower().strip().rstrip(',.')
-        
-        for key in ingredient_mapping:
-            if key in clean_name:
-                transformed_ingredients.append({
-                    "name": clean_name.replace(key, ingredient_mapping[key]),
-                    "quantity": ingredient["quantity"],
-                    "measurement": ingredient["measurement"],
-                    "descriptor": ingredient["descriptor"],
-                    "preparation": ingredient["preparation"]
-                })
-                break
-        else:
-            transformed_ingredients.append(ingredient)
-    transformed_recipe["ingredients"] = transformed_ingredients
+class VegStage(Stage):
+    """
+    Pipeline stage for one direction of the vegetarian transform.
 
-    # Transform raw_steps -> replace ingredients, methods, tools w/ vegetarian equivalents
-    transformed_recipe["raw_steps"] = replace_items(recipe["raw_steps"], [ingredient_mapping])
+    Args:
+        substitutions (SubstitutionTable): applied to ingredient lines, steps and step ingredients.
+        transform_ingredient (function): maps a parsed ingredient dict to its replacement.
+    """
+    def __init__(self, substitutions, transform_ingredient):
+        self.substitutions = substitutions
+        self.transform_ingredient = transform_ingredient
 
-    for i, step in enumerate(transformed_recipe["steps"]):
-        step["text"] = replace_items([step["text"]], [ingredient_mapping])
-        step["ingredients"] = replace_items(step["ingredients"], [ingredient_mapping])
-    
-    return transformed_recipe
+    def raw_ingredient(self, text):
+        return self.substitutions.apply(text)
 
-def transform_recipe_from_veg(recipe):
-    """
-    Transforms a parsed JSON recipe representation from vegetarian to non-vegetarian.
-    """
-    transformed_recipe = recipe.copy()
+    def ingredient(self, ingredient):
+        return self.transform_ingredient(ingredient)
 
-    # Transform raw_ingredients
-    transformed_recipe["raw_ingredients"] = replace_items(recipe["raw_ingredients"], [inv_ingredient_mapping])
+    def raw_step(self, text):
+        return self.substitutions.apply(text)
 
+    def step(self, step):
+        step["text"] = self.substitutions.apply(step["text"])
+        step["ingredients"] = self.substitutions.apply_all(step["ingredients"])
+        return step
 
-    # Transform ingredients
-    transformed_ingredients = []
-    for ingredient in recipe["ingredients"]:
-        # Clean the ingredient name by removing punctuation and whitespace
-        clean_name = ingredient["name"].lower().strip().rstrip(',.')
-        
-        for key in inv_ingredient_mapping:
-            if key in clean_name:
-                transformed_ingredients.append({
-                    "name": clean_name.replace(key, inv_ingredient_mapping[key]).replace('vegan', '').replace('vegetarian', ''),
-                    "quantity": ingredient["quantity"],
-                    "measurement": ingredient["measurement"],
-                    "descriptor": ingredient["descriptor"],
-                    "preparation": ingredient["preparation"]
-                })
-                break
-        else:
-            transformed_ingredients.append({
-                "name": ingredient["name"].replace('vegetarian', '').replace('vegan', ''),
-                "quantity": ingredient["quantity"],
-                "measurement": ingredient["measurement"],
-                "descriptor": ingredient["descriptor"],
-                "preparation": ingredient["preparation"]
-            })
-    transformed_recipe["ingredients"] = transformed_ingredients
+TO_VEG = VegStage(to_veg_substitutions, to_veg_ingredient)
+FROM_VEG = VegStage(from_veg_substitutions, from_veg_ingredient)
+TO_VEG_PLAN = Plan([TO_VEG])
+FROM_VEG_PLAN = Plan([FROM_VEG])
 
-    # Transform raw_steps -> replace ingredients, methods, tools w/ vegetarian equivalents
-    transformed_recipe["raw_steps"] = replace_items(recipe["raw_steps"], [inv_ingredient_mapping])
+def transform_recipe_to_veg(recipe):
+    """
+    Transforms a parsed JSON recipe representation into a vegetarian recipe.
+    """
+    return TO_VEG_PLAN.run(recipe)
 
-    # Transform steps 
-    for i, step in enumerate(transformed_recipe["steps"]):
-        step["text"] = replace_items([step["text"]], [inv_ingredient_mapping])
-        step["ingredients"] = replace_items(step["ingredients"], [inv_ingredient_mapping])
-    
-    return transformed_recipe
+def transform_recipe_from_veg(recipe):
+    """
+    Transforms a parsed JSON recipe representation from vegetarian to non-vegetarian.
+    """
+    return FROM_VEG_PLAN.run(recipe)
 
 def main():
 
@@ -353,8 +339,7 @@ def main():
     url = "https://www.allrecipes.com/recipe/23891/grilled-cheese-sandwich/"
 
     try:
-        soup = fetch_recipe(url)
-        json_data = extract_json_ld(soup)
+        json_data = fetch_recipe_json(url)
         if not json_data:
             print("Could not find a valid recipe in the provided URL.")
             return
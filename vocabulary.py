@@ -0,0 +1,162 @@
+"""
+Cooking vocabulary used by parse.py (tools, methods, descriptors, preparations, measurements).
+
+The tool, method, descriptor and preparation lists are compiled once into a single word-level
+trie, so every term of every list in a sentence is found in one left-to-right pass instead of
+one regex scan per list.
+
+Matches follow the same rules as the regexes they replace, r"\b(word|word|...)\b":
+    - a term only matches whole words;
+    - scanning goes left to right and matches of the same kind never overlap;
+    - when several terms of the same kind match at the same word, the one listed first wins.
+"""
+import re
+
+TOOLS = [
+    "oven", "pot", "skillet", "baking pan", "bowl", "plate", "aluminum foil", "foil", "tray", "sheet",
+    "whisk", "spatula", "strainer", "ladle", "colander", "saucepan", "grater", "microplane", "peeler",
+    "tongs", "mortar", "pestle", "slotted spoon", "mandoline", "rolling pin", "measuring cup",
+    "measuring spoon", "baster", "mixing bowl", "blender", "pressure cooker", "air fryer",
+]
+
+METHODS = [
+    "preheat", "boil", "cook", "stir", "mix", "layer", "bake", "drain", "broil", "poach", "roast",
+    "grill", "steam", "sear", "saute", "braise", "whisk", "knead", "caramelize", "marinate", "simmer",
+    "parboil", "blanch", "whip", "fold", "beat", "blend", "pulse", "scald", "deglaze", "fillet",
+    "infuse", "deep-fry", "deep fry", "score", "smoke",
+]
+
+DESCRIPTORS = [
+    "fresh", "extra-virgin", "dehydrated", "heirloom", "aged", "low-fat", "reduced-fat", "lean",
+    "package", "packages", "packaged", "packed", "box", "boxed", "jar", "jarred", "jars", "ripe", "can",
+    "cans", "canned", "frozen", "organic", "large", "small", "medium", "smoked", "thick-cut", "thinly",
+    "boneless", "skinless", "bone-in",
+]
+
+PREPARATIONS = [
+    "finely chopped", "chopped", "shredded", "divided", "finely shredded", "minced", "sliced", "diced",
+    "grated", "ground", "julienned", "peeled", "squeezed", "dried", "roughly chopped", "roughly diced",
+    "pureed", "smashed", "zested", "beaten", "marinated", "mashed", "sliced thinly", "halved",
+    "quartered", "cut into chunks", "brushed", "trimmed", "cored", "cubed", "butterflied", "crushed",
+]
+
+# units recognised after an ingredient's quantity; order matters as in a regex alternation
+MEASUREMENTS = [
+    "cup", "cups", "teaspoon", "teaspoons", "tbsp", "tablespoon", "tablespoons", "oz", "ounce", "ounces",
+    "pound", "pounds", "g", "grams", "kg", "kilograms", "ml", "milliliters", "l", "liters", "handful",
+    "pinch", "pinches", "dash", "dashes", "slice", "slices", "clove", "cloves", "package", "packages",
+    "piece", "pieces", "milligrams", "tsp", "quart", "quarts", "pint", "pints", "fluid ounce",
+    "fluid ounces", "gal", "gallon", "gallons", "dl",
+]
+
+VOCABULARY = {
+    "tools": TOOLS,
+    "methods": METHODS,
+    "descriptors": DESCRIPTORS,
+    "preparations": PREPARATIONS,
+}
+
+# a "word" is what \b delimits in the original patterns
+WORD_PATTERN = re.compile(r"\w+")
+
+def trie_pattern(words):
+    """
+    Builds a regex that matches any of the given words, with common prefixes folded into a
+    character trie (e.g. "bake", "baking" -> "bak(?:e|ing)") so the regex engine checks one
+    branch per distinct next character instead of trying every word in turn.
+    """
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def build(node):
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        pattern = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        # a word ends here too: the rest is optional (greedy, so longer words are tried first)
+        return "(?:" + pattern + ")?" if "" in node else pattern
+
+    return build(trie)
+
+class VocabularyMatcher:
+    """
+    Word-level trie over several named term lists.
+
+    Each trie node is a dict mapping (separator, word) to the next node, where separator is
+    the exact text between the previous word and this one ("" for the first word of a term,
+    " " or "-" inside multi-word terms). A node's terms are stored under the None key as a
+    dict of {kind: (priority, term)}. Positions where a term can start are found with one
+    compiled regex over the first words of all terms, so only those positions walk the trie.
+    """
+    def __init__(self, vocabulary):
+        self.kinds = list(vocabulary)
+        self.root = {}
+        for kind, terms in vocabulary.items():
+            for priority, term in enumerate(terms):
+                self._add(kind, priority, term)
+        self.start_regex = re.compile(r"\b(?:" + trie_pattern({word for _, word in self.root}) + r")\b")
+
+    def _add(self, kind, priority, term):
+        node = self.root
+        position = 0
+        for match in WORD_PATTERN.finditer(term):
+            separator = term[position:match.start()]
+            node = node.setdefault((separator, match.group(0)), {})
+            position = match.end()
+        terms = node.setdefault(None, {})
+        # a term listed twice keeps its first (highest) priority
+        if kind not in terms:
+            terms[kind] = (priority, term)
+
+    def match(self, text):
+        """
+        Finds every term of every kind in a (lowercased) text.
+
+        Returns:
+            found (dict): maps each kind to the list of terms found, in order of appearance,
+                          like re.findall would return them.
+        """
+        found = {kind: [] for kind in self.kinds}
+        # position each kind may match from again, so matches of a kind never overlap
+        resume = {}
+        root = self.root
+        word_search = WORD_PATTERN.search
+        for start in self.start_regex.finditer(text):
+            position = start.start()
+            end = start.end()
+            node = root[("", start.group(0))]
+            best = {}
+            while True:
+                terms = node.get(None)
+                if terms:
+                    for kind, (priority, term) in terms.items():
+                        if resume.get(kind, 0) <= position and (kind not in best or priority < best[kind][0]):
+                            best[kind] = (priority, term, end)
+                if len(node) == (1 if terms else 0):
+                    break  # no longer terms continue from here
+                word = word_search(text, end)
+                if word is None:
+                    break
+                node = node.get((text[end:word.start()], word.group(0)))
+                if node is None:
+                    break
+                end = word.end()
+            for kind, (_, term, term_end) in best.items():
+                found[kind].append(term)
+                resume[kind] = term_end
+        return found
+
+_matcher = None
+
+def get_matcher():
+    """
+    Returns the VocabularyMatcher for VOCABULARY, compiling it the first time it is needed.
+    """
+    global _matcher
+    if _matcher is None:
+        _matcher = VocabularyMatcher(VOCABULARY)
+    return _matcher